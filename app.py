@@ -2,62 +2,132 @@
 ML API for CRM - Render Deployment
 تطبيق Flask لتوفير خدمات Machine Learning للـCRM على Render
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import joblib
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 import os
 
+from ml_engine.bulk_scoring import (
+    OUTPUT_FIELDS as LEAD_OUTPUT_FIELDS, MEDIA_TYPES, STREAM_READ_BYTES, input_format, output_format,
+    score_line_chunk, score_rows, stream_scores
+)
+from ml_engine.capture import TrafficRecorder, WSGICapture
+from ml_engine.columnar import (
+    COLUMNAR_MEDIA_TYPE, accepts_columnar, columns_to_results, forecast_columns, is_columnar, pack_columns,
+    results_to_columns, scenario_columns, score_lead_columns, segment_columns, unpack_columns
+)
+from ml_engine.forecast_cache import ForecastCache
+from ml_engine.forecasting import (
+    forecast_response, forecast_sales, forecast_scenarios, scenario_list, scenarios_response, transactions_value
+)
+from ml_engine.metrics import (
+    OTHER_ENDPOINT, PROMETHEUS_CONTENT_TYPE, finish_request, metrics, register_models, stage, start_request
+)
+from ml_engine.model_loader import MODEL_LOADING, ModelLoader
+from ml_engine.preload import MODEL_PRELOAD, preload_models
+from ml_engine.registry import ModelRegistry, reload_allowed
+from ml_engine.sales_history import SalesHistory
+from ml_engine.score_cache import ScoreCache
+from ml_engine.score_store import ScoreStore
+from ml_engine.segmentation import (
+    OUTPUT_FIELDS as SEGMENT_OUTPUT_FIELDS, segment_line_chunk, segment_rows
+)
+from ml_engine.serialization import dumps, loads
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify و request.json عبر orjson (JSON_SERIALIZER) بدل json القياسي"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        with stage('parse'):
+            return loads(s)
+
+    def response(self, *args, **kwargs):
+        # bytes مباشرة بدون المرور بـ str
+        obj = self._prepare_response_obj(args, kwargs)
+        with stage('serialize'):
+            body = dumps(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)  # للسماح بالطلبات من أي مصدر
 
+# TRAFFIC_CAPTURE_FILE: تسجيل الطلبات كـ JSONL لإعادة تشغيلها (benchmarks/replay.py)
+traffic_recorder = TrafficRecorder.from_env()
+if traffic_recorder is not None:
+    app.wsgi_app = WSGICapture(app.wsgi_app, traffic_recorder)
+
 # مسارات النماذج - Render يستخدم مسار ثابت
 MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# تحميل النماذج
-lead_scoring_model = None
-lead_scoring_le_source = None
-lead_scoring_le_agent = None
-sales_forecasting_model = None
-customer_segmentation_model = None
-customer_segmentation_scaler = None
-
-def load_models():
-    """تحميل جميع النماذج"""
-    global lead_scoring_model, lead_scoring_le_source, lead_scoring_le_agent
-    global sales_forecasting_model, customer_segmentation_model, customer_segmentation_scaler
-    
-    try:
-        # Lead Scoring
-        lead_model_path = os.path.join(MODELS_DIR, 'Lead_scoring', 'lead_scoring_model.pkl')
-        if os.path.exists(lead_model_path):
-            lead_scoring_model = joblib.load(lead_model_path)
-            lead_scoring_le_source = joblib.load(os.path.join(MODELS_DIR, 'Lead_scoring', 'le_source.pkl'))
-            lead_scoring_le_agent = joblib.load(os.path.join(MODELS_DIR, 'Lead_scoring', 'le_agent.pkl'))
-            print("✅ تم تحميل Lead Scoring Model")
-    except Exception as e:
-        print(f"⚠️  تحذير: لم يتم تحميل Lead Scoring Model: {e}")
-    
-    try:
-        # Sales Forecasting
-        sales_model_path = os.path.join(MODELS_DIR, 'Sales_forecasting', 'sales_forecasting_model.pkl')
-        if os.path.exists(sales_model_path):
-            sales_forecasting_model = joblib.load(sales_model_path)
-            print("✅ تم تحميل Sales Forecasting Model")
-    except Exception as e:
-        print(f"⚠️  تحذير: لم يتم تحميل Sales Forecasting Model: {e}")
-    
-    try:
-        # Customer Segmentation
-        seg_model_path = os.path.join(MODELS_DIR, 'Customer_segmentation', 'customer_segmentation_model.pkl')
-        if os.path.exists(seg_model_path):
-            customer_segmentation_model = joblib.load(seg_model_path)
-            customer_segmentation_scaler = joblib.load(os.path.join(MODELS_DIR, 'Customer_segmentation', 'customer_segmentation_scaler.pkl'))
-            print("✅ تم تحميل Customer Segmentation Model")
-    except Exception as e:
-        print(f"⚠️  تحذير: لم يتم تحميل Customer Segmentation Model: {e}")
+# سجل النماذج: النسخة الفعالة لكل نموذج تُستبدل كمرجع واحد عند إعادة التحميل
+registry = ModelRegistry(MODELS_DIR)
+# crm_ml_model_load_seconds في /metrics
+register_models(registry)
+
+# كاش نتائج التنبؤ بالمبيعات (مرتبط بنسخة النموذج الفعالة)
+sales_forecast_cache = ForecastCache()
+# كاش درجات العملاء حسب الميزات المرمّزة (يُمسح عند تغير اليوم أو النموذج)
+lead_score_cache = ScoreCache()
+# LEAD_SCORE_STORE: درجات كل العملاء محسوبة مسبقاً بالمعرّف (python -m ml_engine.score_store build)
+lead_score_store = ScoreStore.from_env()
+# المبيعات اليومية الفعلية (POST /api/sales-history) - نوافذ 7 و 30 يوماً للتنبؤ بالمبيعات
+sales_history = SalesHistory.from_env()
+
+@registry.on_swap
+def _on_model_swap(version, previous):
+    """كل نسخة جديدة تبدأ بكاش فارغ"""
+    if version.name == 'lead_scoring':
+        lead_score_cache.bind(version.backend)
+        if lead_score_store is not None:
+            lead_score_store.bind(version)
+    elif version.name == 'sales_forecasting':
+        sales_forecast_cache.bind(version.backend)
+
+# كل نموذج يُحمّل مستقلاً - الطلب ينتظر النموذج الذي يحتاجه فقط
+model_loader = ModelLoader()
+registry.attach(model_loader)
+
+def load_models(mode=MODEL_LOADING):
+    """تحميل جميع النماذج (eager: قبل الخدمة، background: بالتوازي في الخلفية، lazy: عند أول طلب)"""
+    model_loader.start(mode)
+
+@app.before_request
+def _start_model_watch():
+    # MODEL_WATCH_SECONDS: خيط فحص الملفات في كل عامل (بعد fork في وضع preload)
+    registry.watch()
+
+@app.before_request
+def _start_request_metrics():
+    # قالب المسار (url_rule) كـ label - المسارات غير المعروفة 'other'
+    endpoint = request.url_rule.rule if request.url_rule else OTHER_ENDPOINT
+    request.environ['crm_ml.metrics'] = (endpoint, start_request(endpoint))
+
+@app.after_request
+def _finish_request_metrics(response):
+    # الـ streams: التسجيل بعد آخر جزء (call_on_close) وليس عند بداية الإرسال
+    endpoint, started = request.environ.get('crm_ml.metrics', (OTHER_ENDPOINT, None))
+    if started is None:
+        return response
+    method, status = request.method, response.status_code
+    if response.is_streamed:
+        response.call_on_close(lambda: finish_request(endpoint, method, status, started))
+    else:
+        finish_request(endpoint, method, status, started)
+    return response
+
+def _wants_columnar():
+    """Accept: application/vnd.crm.columns -> استجابة ثنائية عمودية بدل JSON"""
+    return accepts_columnar(request.headers.get('Accept'))
+
+def _columnar_response(columns, meta=None):
+    return Response(pack_columns(columns, meta), content_type=COLUMNAR_MEDIA_TYPE)
 
 @app.route('/', methods=['GET'])
 def index():
@@ -69,69 +139,103 @@ def index():
             'health': '/api/health',
             'lead_scoring': '/api/lead-scoring',
             'sales_forecast': '/api/sales-forecast',
+            'sales_forecast_scenarios': '/api/sales-forecast/scenarios',
+            'sales_history': '/api/sales-history',
             'customer_segment': '/api/customer-segment',
-            'batch_lead_scoring': '/api/batch-lead-scoring'
+            'batch_lead_scoring': '/api/batch-lead-scoring',
+            'batch_lead_scoring_stream': '/api/batch-lead-scoring/stream',
+            'batch_customer_segment': '/api/batch-customer-segment',
+            'batch_customer_segment_stream': '/api/batch-customer-segment/stream',
+            'models': '/api/models',
+            'models_reload': '/api/models/reload',
+            'metrics': '/metrics'
         }
     })
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """فحص حالة API"""
+    scoring = registry.get('lead_scoring')
+    forecasting = registry.get('sales_forecasting')
+    segmentation = registry.get('customer_segmentation')
     return jsonify({
         'status': 'ok',
         'timestamp': datetime.now().isoformat(),
         'models_loaded': {
-            'lead_scoring': lead_scoring_model is not None,
-            'sales_forecasting': sales_forecasting_model is not None,
-            'customer_segmentation': customer_segmentation_model is not None
-        }
+            'lead_scoring': scoring is not None,
+            'sales_forecasting': forecasting is not None,
+            'customer_segmentation': segmentation is not None
+        },
+        'models': model_loader.status(),
+        'model_versions': {
+            'lead_scoring': scoring.version if scoring else None,
+            'sales_forecasting': forecasting.version if forecasting else None,
+            'customer_segmentation': segmentation.version if segmentation else None
+        },
+        'inference_backends': {
+            'lead_scoring': scoring.backend.name if scoring else None,
+            'sales_forecasting': forecasting.backend.name if forecasting else None,
+            'customer_segmentation': segmentation.segmenter.name if segmentation else None
+        },
+        'encoders': {
+            'source': scoring.source_encoder.stats() if scoring else None,
+            'agent': scoring.agent_encoder.stats() if scoring else None
+        },
+        'forecast_cache': sales_forecast_cache.stats(),
+        'score_cache': lead_score_cache.stats(),
+        'score_store': lead_score_store.stats() if lead_score_store else None,
+        'sales_history': sales_history.stats(),
+        'traffic_capture': traffic_recorder.stats() if traffic_recorder else None
     })
 
+@app.route('/api/models', methods=['GET'])
+def list_models():
+    """النسخة الفعالة والنسخ المتاحة لكل نموذج وحالة آخر إعادة تحميل"""
+    return jsonify(registry.status())
+
+@app.route('/api/models/reload', methods=['POST'])
+def reload_models():
+    """إعادة تحميل نموذج (أو كل النماذج) في الخلفية: {"model": "lead_scoring", "version": "v2"}"""
+    if not reload_allowed(request.headers.get('X-Reload-Token')):
+        return jsonify({'error': 'invalid or missing reload token'}), 403
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        # التحميل والتحقق في خيط خلفي - الطلبات تستمر على النسخة الحالية حتى الاستبدال
+        reloading = registry.reload_many(data.get('model'), data.get('version'))
+        return jsonify({'success': True, 'reloading': reloading}), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """مقاييس هذه العملية بصيغة Prometheus (ml_engine.metrics)"""
+    return Response(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.route('/api/lead-scoring', methods=['POST'])
 def predict_lead_score():
     """التنبؤ بدرجة العميل"""
-    if lead_scoring_model is None:
+    model_loader.wait('lead_scoring')
+    scoring = registry.get('lead_scoring')
+    if scoring is None:
         return jsonify({'error': 'Lead Scoring model not loaded'}), 500
     
     try:
         data = request.json
         lead = data.get('lead', {})
         
-        # تحضير البيانات
-        source = lead.get('source', 'الموقع الإلكتروني')
-        agent = lead.get('agent', 'غير محدد')
-        tags = lead.get('tags', [])
-        createdAt = lead.get('createdAt', datetime.now().strftime('%Y-%m-%d'))
-        budget = lead.get('budget', 0)
-        
-        # حساب الأيام منذ الإنشاء
-        try:
-            created_date = pd.to_datetime(createdAt)
-            days_since_created = (pd.Timestamp.now() - created_date).days
-        except:
-            days_since_created = 0
-        
-        # ترميز
-        try:
-            source_encoded = lead_scoring_le_source.transform([source])[0]
-        except:
-            source_encoded = 0
-        
-        try:
-            agent_encoded = lead_scoring_le_agent.transform([agent])[0]
-        except:
-            agent_encoded = 0
-        
-        tags_count = len(tags) if isinstance(tags, list) else 0
-        
-        # التنبؤ
-        features = np.array([[source_encoded, agent_encoded, tags_count, days_since_created, float(budget)]])
-        score = lead_scoring_model.predict_proba(features)[0][1] * 100
+        # نفس مسار الميزات المتجه لكل endpoints التقييم (ml_engine/features.py) بصف واحد
+        result = score_rows(
+            scoring.backend, [lead], scoring.source_encoder, scoring.agent_encoder,
+            cache=lead_score_cache, endpoint='lead-scoring', store=lead_score_store
+        )[0]
+        if 'error' in result:
+            raise ValueError(result['error'])
         
         return jsonify({
             'success': True,
-            'lead_score': round(score, 2),
-            'priority': 'High' if score > 70 else 'Medium' if score > 40 else 'Low'
+            'lead_score': result['lead_score'],
+            'priority': result['priority']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -139,81 +243,99 @@ def predict_lead_score():
 @app.route('/api/sales-forecast', methods=['POST'])
 def predict_sales():
     """التنبؤ بالمبيعات"""
-    if sales_forecasting_model is None:
+    model_loader.wait('sales_forecasting')
+    forecasting = registry.get('sales_forecasting')
+    if forecasting is None:
         return jsonify({'error': 'Sales Forecasting model not loaded'}), 500
     
     try:
         data = request.json
+        avg_transactions = transactions_value(data.get('avg_transactions', 5))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
         start_date = data.get('start_date', (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d'))
         end_date = data.get('end_date', (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d'))
-        avg_transactions = data.get('avg_transactions', 5)
-        
-        dates = pd.date_range(start=start_date, end=end_date, freq='D')
-        predictions = []
         
-        for date in dates:
-            features = pd.DataFrame({
-                'year': [date.year],
-                'month': [date.month],
-                'day': [date.day],
-                'week': [date.isocalendar().week],
-                'weekday': [date.weekday()],
-                'quarter': [date.quarter],
-                'transaction_count': [avg_transactions],
-                'sales_7day_avg': [0],
-                'sales_30day_avg': [0]
-            })
-            
-            pred = sales_forecasting_model.predict(features)[0]
-            predictions.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'predicted_sales': round(max(0, pred), 2)
-            })
-        
-        total_forecast = sum(p['predicted_sales'] for p in predictions)
+        # كل الأيام في مصفوفة ميزات واحدة واستدعاء predict واحد (بعد آخر يوم في تاريخ المبيعات: يوم بيوم)
+        dates, predictions = forecast_sales(
+            forecasting.backend, start_date, end_date, avg_transactions, cache=sales_forecast_cache,
+            history=sales_history.snapshot()
+        )
+        if _wants_columnar():
+            return _columnar_response(*forecast_columns(dates, predictions))
+        return jsonify(forecast_response(dates, predictions))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sales-forecast/scenarios', methods=['POST'])
+def predict_sales_scenarios():
+    """التنبؤ بالمبيعات لعدة سيناريوهات (فترات و/أو شبكة avg_transactions) باستدعاء predict واحد"""
+    model_loader.wait('sales_forecasting')
+    forecasting = registry.get('sales_forecasting')
+    if forecasting is None:
+        return jsonify({'error': 'Sales Forecasting model not loaded'}), 500
+    
+    try:
+        data = request.json
+        scenarios = scenario_list(
+            data,
+            (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d'),
+            (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+        )
+        aggregate = data.get('aggregate', 'day')
         
-        return jsonify({
-            'success': True,
-            'predictions': predictions,
-            'total_forecast': round(total_forecast, 2),
-            'average_daily': round(total_forecast / len(predictions), 2)
-        })
+        # كل السيناريوهات في مصفوفة ميزات واحدة مكدسة - التجميع الأسبوعي/الشهري بـ NumPy
+        dates, offsets, predictions = forecast_scenarios(
+            forecasting.backend, scenarios, history=sales_history.snapshot()
+        )
+        if _wants_columnar():
+            return _columnar_response(*scenario_columns(scenarios, dates, offsets, predictions, aggregate))
+        return jsonify(scenarios_response(
+            scenarios, dates, offsets, predictions, aggregate, bool(data.get('include_daily', True))
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sales-history', methods=['GET', 'POST'])
+def sales_history_days():
+    """إضافة المبيعات اليومية الفعلية: {"days": [{"date": "2025-11-30", "sales": 152340.5}]} - GET للحالة"""
+    if request.method == 'GET':
+        return jsonify(sales_history.stats())
+    
+    try:
+        data = request.json
+        # append-only: الأيام الأقدم من آخر يوم مسجل مرفوضة، ومبيعات آخر يوم تُجمع
+        return jsonify({'success': True, 'history': sales_history.ingest(data.get('days'))})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/customer-segment', methods=['POST'])
 def predict_segment():
     """التنبؤ بقسم العميل"""
-    if customer_segmentation_model is None:
+    model_loader.wait('customer_segmentation')
+    segmentation = registry.get('customer_segmentation')
+    if segmentation is None:
         return jsonify({'error': 'Customer Segmentation model not loaded'}), 500
     
     try:
         data = request.json
         customer = data.get('customer', {})
         
-        # استخراج الميزات
-        recency = customer.get('recency', 30)
-        frequency = customer.get('frequency', 1)
-        monetary = customer.get('monetary', 0)
-        lead_count = customer.get('lead_count', 1)
-        avg_budget = customer.get('avg_budget', 0)
-        
-        features = np.array([[recency, frequency, monetary, lead_count, avg_budget]])
-        features_scaled = customer_segmentation_scaler.transform(features)
-        
-        segment = customer_segmentation_model.predict(features_scaled)[0]
-        
-        segment_names = {
-            0: 'Bronze',
-            1: 'Silver',
-            2: 'Gold',
-            3: 'Platinum'
-        }
+        # الميزات الغائبة تأخذ القيم الافتراضية (total_deal_value و avg_probability: متوسط التدريب)
+        result = segment_rows(segmentation.segmenter, [customer])[0]
+        if 'error' in result:
+            raise ValueError(result['error'])
         
         return jsonify({
             'success': True,
-            'segment': int(segment),
-            'segment_name': segment_names.get(int(segment), 'Unknown')
+            'segment': result['segment'],
+            'segment_name': result['segment_name']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -221,70 +343,139 @@ def predict_segment():
 @app.route('/api/batch-lead-scoring', methods=['POST'])
 def batch_lead_scoring():
     """التنبؤ بدرجة عدة عملاء دفعة واحدة"""
-    if lead_scoring_model is None:
+    model_loader.wait('lead_scoring')
+    scoring = registry.get('lead_scoring')
+    if scoring is None:
         return jsonify({'error': 'Lead Scoring model not loaded'}), 500
     
     try:
-        data = request.json
-        leads = data.get('leads', [])
+        if is_columnar(request.content_type):
+            # أعمدة ثنائية: views على جسم الطلب مباشرة بدون تحليل JSON لكل عميل
+            columns, _ = unpack_columns(request.get_data())
+            result_columns = score_lead_columns(
+                scoring.backend, columns, scoring.source_encoder, scoring.agent_encoder,
+                cache=lead_score_cache, endpoint='batch-lead-scoring', store=lead_score_store
+            )
+            if _wants_columnar():
+                return _columnar_response(result_columns)
+            results = columns_to_results(result_columns, 'lead_id')
+        else:
+            data = request.json
+            leads = data.get('leads', [])
+            
+            # بناء مصفوفة ميزات واحدة لكل الدفعة - العملاء غير الموجودين في المخزن أو الكاش فقط يمرون على النموذج
+            results = score_rows(
+                scoring.backend, leads, scoring.source_encoder, scoring.agent_encoder,
+                cache=lead_score_cache, endpoint='batch-lead-scoring', store=lead_score_store
+            )
+            if _wants_columnar():
+                return _columnar_response(results_to_columns(results, LEAD_OUTPUT_FIELDS))
         
-        results = []
-        for lead in leads:
-            try:
-                source = lead.get('source', 'الموقع الإلكتروني')
-                agent = lead.get('agent', 'غير محدد')
-                tags = lead.get('tags', [])
-                createdAt = lead.get('createdAt', datetime.now().strftime('%Y-%m-%d'))
-                budget = lead.get('budget', 0)
-                
-                try:
-                    created_date = pd.to_datetime(createdAt)
-                    days_since_created = (pd.Timestamp.now() - created_date).days
-                except:
-                    days_since_created = 0
-                
-                try:
-                    source_encoded = lead_scoring_le_source.transform([source])[0]
-                except:
-                    source_encoded = 0
-                
-                try:
-                    agent_encoded = lead_scoring_le_agent.transform([agent])[0]
-                except:
-                    agent_encoded = 0
-                
-                tags_count = len(tags) if isinstance(tags, list) else 0
-                
-                features = np.array([[source_encoded, agent_encoded, tags_count, days_since_created, float(budget)]])
-                score = lead_scoring_model.predict_proba(features)[0][1] * 100
-                
-                results.append({
-                    'lead_id': lead.get('id'),
-                    'name': lead.get('name'),
-                    'lead_score': round(score, 2),
-                    'priority': 'High' if score > 70 else 'Medium' if score > 40 else 'Low'
-                })
-            except Exception as e:
-                results.append({
-                    'lead_id': lead.get('id'),
-                    'name': lead.get('name'),
-                    'error': str(e)
-                })
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except ValueError as e:
+        # جسم ثنائي غير صالح (header أو أعمدة)
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/batch-lead-scoring/stream', methods=['POST'])
+def stream_lead_scoring():
+    """تقييم ملف NDJSON/CSV كبير على شكل stream - الذاكرة ثابتة مهما كان حجم الملف"""
+    model_loader.wait('lead_scoring')
+    scoring = registry.get('lead_scoring')
+    if scoring is None:
+        return jsonify({'error': 'Lead Scoring model not loaded'}), 500
+    
+    # Content-Type: text/csv أو application/x-ndjson | Accept: text/csv أو application/x-ndjson
+    in_format = input_format(request.content_type)
+    out_format = output_format(request.headers.get('Accept'))
+    backend, source_encoder, agent_encoder = (
+        scoring.backend, scoring.source_encoder, scoring.agent_encoder
+    )
+    
+    def score_chunk(lines, header, now):
+        return score_line_chunk(
+            backend, source_encoder, agent_encoder, lines, in_format, out_format, header, now,
+            lead_score_cache, 'batch-lead-scoring/stream'
+        )
+    
+    body = iter(lambda: request.stream.read(STREAM_READ_BYTES), b'')
+    return Response(
+        stream_with_context(stream_scores(body, in_format, out_format, score_chunk)),
+        content_type=MEDIA_TYPES[out_format]
+    )
+
+@app.route('/api/batch-customer-segment', methods=['POST'])
+def batch_customer_segment():
+    """تصنيف عدة عملاء دفعة واحدة (include_distance: المسافة لمركز القسم كمؤشر ثقة)"""
+    model_loader.wait('customer_segmentation')
+    segmentation = registry.get('customer_segmentation')
+    if segmentation is None:
+        return jsonify({'error': 'Customer Segmentation model not loaded'}), 500
+    
+    try:
+        if is_columnar(request.content_type):
+            # include_distance يُمرَّر في meta داخل الـ header
+            columns, meta = unpack_columns(request.get_data())
+            result_columns = segment_columns(
+                segmentation.segmenter, columns, bool(meta.get('include_distance', False))
+            )
+            if _wants_columnar():
+                return _columnar_response(result_columns)
+            results = columns_to_results(result_columns, 'customer_id')
+        else:
+            data = request.json
+            results = segment_rows(
+                segmentation.segmenter, data.get('customers', []), bool(data.get('include_distance', False))
+            )
+            if _wants_columnar():
+                return _columnar_response(results_to_columns(results, SEGMENT_OUTPUT_FIELDS))
         
         return jsonify({
             'success': True,
             'results': results
         })
+    except ValueError as e:
+        # جسم ثنائي غير صالح (header أو أعمدة)
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/batch-customer-segment/stream', methods=['POST'])
+def stream_customer_segment():
+    """تصنيف ملف NDJSON/CSV كبير على شكل stream (?include_distance=true)"""
+    model_loader.wait('customer_segmentation')
+    segmentation = registry.get('customer_segmentation')
+    if segmentation is None:
+        return jsonify({'error': 'Customer Segmentation model not loaded'}), 500
+    
+    in_format = input_format(request.content_type)
+    out_format = output_format(request.headers.get('Accept'))
+    include_distance = request.args.get('include_distance', '').lower() in ('1', 'true', 'yes')
+    segmenter = segmentation.segmenter
+    
+    def segment_chunk(lines, header, now):
+        return segment_line_chunk(segmenter, lines, in_format, out_format, header, include_distance)
+    
+    body = iter(lambda: request.stream.read(STREAM_READ_BYTES), b'')
+    return Response(
+        stream_with_context(stream_scores(body, in_format, out_format, segment_chunk, fields=SEGMENT_OUTPUT_FIELDS)),
+        content_type=MEDIA_TYPES[out_format]
+    )
+
 # تحميل النماذج عند بدء التطبيق
 # ملاحظة: في الخطة المجانية، قد يستغرق التحميل 10-15 ثانية عند Spin-up
 if __name__ == '__main__':
     print("🚀 جارٍ تحميل النماذج...")
     print("⏱️  هذا قد يستغرق 10-15 ثانية في الخطة المجانية (Spin-up)")
     load_models()
-    print("\n✅ API جاهز! جميع النماذج محملة في الذاكرة.")
+    if model_loader.mode == 'eager':
+        print("\n✅ API جاهز! جميع النماذج محملة في الذاكرة.")
+    else:
+        print(f"\n✅ API جاهز! النماذج تُحمّل ({model_loader.mode}) - الحالة في /api/health")
     print("💾 حجم النماذج: ~350 KB - مناسب تماماً للخطة المجانية (512MB RAM)")
     
     # على Render، سيستخدم PORT environment variable
@@ -293,6 +484,11 @@ if __name__ == '__main__':
 else:
     # عند استخدام gunicorn على Render
     print("🚀 جارٍ تحميل النماذج (Render)...")
-    load_models()
-    print("✅ النماذج محملة!")
+    if MODEL_PRELOAD:
+        # gunicorn --preload: تحميل واحد في العملية الرئيسية يتشاركه كل العمال
+        preload_models(model_loader)
+    else:
+        load_models()
+    if model_loader.mode == 'eager':
+        print("✅ النماذج محملة!")
 
@@ -2,20 +2,58 @@
 ML API for CRM - Render Deployment (FastAPI Version)
 تطبيق FastAPI لتوفير خدمات Machine Learning للـCRM على Render
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List, Dict
-import joblib
-import pandas as pd
-import numpy as np
+from pydantic import BaseModel, ValidationError
+from typing import Optional, List, Dict, Literal
 from datetime import datetime, timedelta
 import os
 
+from ml_engine.batching import MicroBatcher
+from ml_engine.bulk_scoring import (
+    OUTPUT_FIELDS as LEAD_OUTPUT_FIELDS, MEDIA_TYPES, astream_scores, input_format, output_format, score_line_chunk
+)
+from ml_engine.capture import ASGICapture, TrafficRecorder
+from ml_engine.columnar import (
+    COLUMNAR_MEDIA_TYPE, accepts_columnar, columns_to_results, forecast_columns, is_columnar, pack_columns,
+    results_to_columns, scenario_columns, score_lead_columns, segment_columns, unpack_columns
+)
+from ml_engine.executor import ExecutorBusy, InferenceExecutor
+from ml_engine.forecast_cache import ForecastCache
+from ml_engine.forecasting import (
+    forecast_response, forecast_sales, forecast_scenarios, scenario_list, scenarios_response, transactions_value
+)
+from ml_engine.features import ID_ONLY_FIELDS
+from ml_engine.lead_scoring import DEFAULT_AGENT, DEFAULT_SOURCE, lead_results, score_leads
+from ml_engine.metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, metrics, register_models, stage
+from ml_engine.model_loader import MODEL_LOADING, ModelLoader
+from ml_engine.preload import MODEL_PRELOAD, preload_models
+from ml_engine.registry import ModelRegistry, reload_allowed
+from ml_engine.sales_history import SalesHistory
+from ml_engine.score_cache import ScoreCache
+from ml_engine.score_store import ScoreStore
+from ml_engine.segmentation import (
+    OUTPUT_FIELDS as SEGMENT_OUTPUT_FIELDS, SEGMENT_NAMES, segment_line_chunk, segment_rows
+)
+from ml_engine.serialization import dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse عبر orjson (JSON_SERIALIZER) - يدعم أنواع NumPy مباشرة"""
+
+    def render(self, content):
+        with stage("serialize"):
+            return dumps(content)
+
+
 app = FastAPI(
     title="Sawaed CRM ML API",
     description="Machine Learning API للـ CRM",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # السماح بالـ CORS للطلبات من أي مصدر
@@ -26,52 +64,182 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# عدد الطلبات وزمنها لكل endpoint في /metrics (الخارجي: يشمل CORS)
+app.add_middleware(MetricsMiddleware, paths=lambda: [route.path for route in app.routes])
+# TRAFFIC_CAPTURE_FILE: تسجيل الطلبات كـ JSONL لإعادة تشغيلها (benchmarks/replay.py)
+traffic_recorder = TrafficRecorder.from_env()
+if traffic_recorder is not None:
+    app.add_middleware(ASGICapture, recorder=traffic_recorder)
 
 # مسارات النماذج - Render يستخدم مسار ثابت
 MODELS_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# تحميل النماذج
-lead_scoring_model = None
-lead_scoring_le_source = None
-lead_scoring_le_agent = None
-sales_forecasting_model = None
-customer_segmentation_model = None
-customer_segmentation_scaler = None
-
-def load_models():
-    """تحميل جميع النماذج"""
-    global lead_scoring_model, lead_scoring_le_source, lead_scoring_le_agent
-    global sales_forecasting_model, customer_segmentation_model, customer_segmentation_scaler
-    
-    try:
-        # Lead Scoring
-        lead_model_path = os.path.join(MODELS_DIR, 'Lead_scoring', 'lead_scoring_model.pkl')
-        if os.path.exists(lead_model_path):
-            lead_scoring_model = joblib.load(lead_model_path)
-            lead_scoring_le_source = joblib.load(os.path.join(MODELS_DIR, 'Lead_scoring', 'le_source.pkl'))
-            lead_scoring_le_agent = joblib.load(os.path.join(MODELS_DIR, 'Lead_scoring', 'le_agent.pkl'))
-            print("✅ تم تحميل Lead Scoring Model")
-    except Exception as e:
-        print(f"⚠️  تحذير: لم يتم تحميل Lead Scoring Model: {e}")
-    
-    try:
-        # Sales Forecasting
-        sales_model_path = os.path.join(MODELS_DIR, 'Sales_forecasting', 'sales_forecasting_model.pkl')
-        if os.path.exists(sales_model_path):
-            sales_forecasting_model = joblib.load(sales_model_path)
-            print("✅ تم تحميل Sales Forecasting Model")
-    except Exception as e:
-        print(f"⚠️  تحذير: لم يتم تحميل Sales Forecasting Model: {e}")
-    
-    try:
-        # Customer Segmentation
-        seg_model_path = os.path.join(MODELS_DIR, 'Customer_segmentation', 'customer_segmentation_model.pkl')
-        if os.path.exists(seg_model_path):
-            customer_segmentation_model = joblib.load(seg_model_path)
-            customer_segmentation_scaler = joblib.load(os.path.join(MODELS_DIR, 'Customer_segmentation', 'customer_segmentation_scaler.pkl'))
-            print("✅ تم تحميل Customer Segmentation Model")
-    except Exception as e:
-        print(f"⚠️  تحذير: لم يتم تحميل Customer Segmentation Model: {e}")
+# سجل النماذج: النسخة الفعالة لكل نموذج تُستبدل كمرجع واحد عند إعادة التحميل
+registry = ModelRegistry(MODELS_DIR)
+# crm_ml_model_load_seconds في /metrics
+register_models(registry)
+
+# كاش نتائج التنبؤ بالمبيعات (مرتبط بنسخة النموذج الفعالة)
+sales_forecast_cache = ForecastCache()
+# كاش درجات العملاء حسب الميزات المرمّزة (يُمسح عند تغير اليوم أو النموذج)
+lead_score_cache = ScoreCache()
+# LEAD_SCORE_STORE: درجات كل العملاء محسوبة مسبقاً بالمعرّف (python -m ml_engine.score_store build)
+lead_score_store = ScoreStore.from_env()
+# المبيعات اليومية الفعلية (POST /api/sales-history) - نوافذ 7 و 30 يوماً للتنبؤ بالمبيعات
+sales_history = SalesHistory.from_env()
+
+@registry.on_swap
+def _on_model_swap(version, previous):
+    """كل نسخة جديدة تبدأ بكاش فارغ، وعمليات process pool تُستبدل لترى النسخة الجديدة"""
+    if version.name == 'lead_scoring':
+        lead_score_cache.bind(version.backend)
+        if lead_score_store is not None:
+            lead_score_store.bind(version)
+    elif version.name == 'sales_forecasting':
+        sales_forecast_cache.bind(version.backend)
+    # العمليات الحالية تكمل مهامها الجارية على النسخة القديمة ثم تُغلق
+    if previous is not None and inference_executor.kind == 'process':
+        inference_executor.restart()
+
+# كل نموذج يُحمّل مستقلاً - الطلب ينتظر النموذج الذي يحتاجه فقط
+model_loader = ModelLoader()
+registry.attach(model_loader)
+
+def load_models(mode=MODEL_LOADING):
+    """تحميل جميع النماذج (eager: قبل الخدمة، background: بالتوازي في الخلفية، lazy: عند أول طلب)"""
+    model_loader.start(mode)
+
+async def _wait_for_model(name):
+    """انتظار النموذج المطلوب فقط دون حجز الـ event loop"""
+    if not model_loader.is_ready(name):
+        await run_in_threadpool(model_loader.wait, name)
+
+def _score_leads(scoring, leads, endpoint):
+    """درجات قائمة من Lead (pydantic) مع خطأ كل صف - العملاء غير الموجودين في المخزن أو الكاش فقط يمرون على النموذج"""
+    columns = {
+        "source": [lead.source or DEFAULT_SOURCE for lead in leads],
+        "agent": [lead.agent or DEFAULT_AGENT for lead in leads],
+        "tags": [lead.tags or [] for lead in leads],
+        "created_at": [lead.createdAt for lead in leads],
+        "budget": [lead.budget or 0 for lead in leads]
+    }
+    # {"id": 42} فقط: الميزات من مخزن الدرجات
+    id_only = None
+    if lead_score_store is not None:
+        id_only = [lead.id is not None and lead.model_fields_set <= ID_ONLY_FIELDS for lead in leads]
+    return score_leads(
+        scoring.backend, columns, scoring.source_encoder, scoring.agent_encoder,
+        cache=lead_score_cache, endpoint=endpoint,
+        store=lead_score_store, ids=[lead.id for lead in leads], id_only=id_only
+    )
+
+def _score_lead_batch(leads):
+    """تقييم دفعة من طلبات /api/lead-scoring المتزامنة - خطأ كل صف يعود لصاحبه فقط"""
+    # النسخة الفعالة وقت تنفيذ الدفعة
+    scores, errors = _score_leads(registry.get("lead_scoring"), leads, "lead-scoring")
+    return [float(score) if error is None else ValueError(error) for score, error in zip(scores, errors)]
+
+def _segment_batch(customers):
+    """تصنيف دفعة من طلبات /api/customer-segment المتزامنة"""
+    segmenter = registry.get("customer_segmentation").segmenter
+    results = segment_rows(segmenter, [c.model_dump() for c in customers])
+    return [ValueError(r['error']) if 'error' in r else r['segment'] for r in results]
+
+def _results_body(results):
+    """جسم JSON كامل كـ bytes داخل الـ executor - الـ event loop يرسله فقط"""
+    with stage("serialize"):
+        return dumps({"success": True, "results": results})
+
+def _segment_customers(segmentation, customers, include_distance, columnar_response=False):
+    """نتائج /api/batch-customer-segment"""
+    results = segment_rows(segmentation.segmenter, [c.model_dump() for c in customers], include_distance)
+    if columnar_response:
+        return pack_columns(results_to_columns(results, SEGMENT_OUTPUT_FIELDS))
+    return _results_body(results)
+
+def _segment_columns(segmentation, body, columnar_response):
+    """/api/batch-customer-segment بجسم ثنائي عمودي (include_distance في meta)"""
+    columns, meta = unpack_columns(body)
+    result = segment_columns(segmentation.segmenter, columns, bool(meta.get("include_distance", False)))
+    return pack_columns(result) if columnar_response else _results_body(columns_to_results(result, "customer_id"))
+
+def _segment_stream_chunk(segmentation, lines, in_format, out_format, header, include_distance):
+    """جزء واحد من /api/batch-customer-segment/stream"""
+    return segment_line_chunk(segmentation.segmenter, lines, in_format, out_format, header, include_distance)
+
+def _batch_results(scoring, leads, columnar_response=False):
+    """نتائج /api/batch-lead-scoring: درجة أو خطأ لكل عميل"""
+    scores, errors = _score_leads(scoring, leads, "batch-lead-scoring")
+    results = lead_results([lead.id for lead in leads], [lead.name for lead in leads], scores, errors)
+    if columnar_response:
+        return pack_columns(results_to_columns(results, LEAD_OUTPUT_FIELDS))
+    return _results_body(results)
+
+def _lead_columns(scoring, body, columnar_response):
+    """/api/batch-lead-scoring بجسم ثنائي عمودي: views على الجسم مباشرة بدون تحليل JSON لكل عميل"""
+    columns, _ = unpack_columns(body)
+    result = score_lead_columns(
+        scoring.backend, columns, scoring.source_encoder, scoring.agent_encoder,
+        cache=lead_score_cache, endpoint="batch-lead-scoring", store=lead_score_store
+    )
+    return pack_columns(result) if columnar_response else _results_body(columns_to_results(result, "lead_id"))
+
+def _score_stream_chunk(scoring, lines, in_format, out_format, header, now):
+    """جزء واحد من /api/batch-lead-scoring/stream (دالة على مستوى الموديول لتعمل في وضع process)"""
+    return score_line_chunk(
+        scoring.backend, scoring.source_encoder, scoring.agent_encoder,
+        lines, in_format, out_format, header, now, lead_score_cache, "batch-lead-scoring/stream"
+    )
+
+def _forecast(forecasting, start_date, end_date, avg_transactions, columnar_response=False, history=None):
+    """استجابة /api/sales-forecast كاملة (history: نسخة تاريخ المبيعات تُمرر لعمليات الـ executor)"""
+    dates, predictions = forecast_sales(
+        forecasting.backend, start_date, end_date, avg_transactions, cache=sales_forecast_cache, history=history
+    )
+    if columnar_response:
+        return pack_columns(*forecast_columns(dates, predictions))
+    with stage("serialize"):
+        return dumps(forecast_response(dates, predictions))
+
+def _forecast_scenarios(forecasting, scenarios, aggregate, include_daily, columnar_response=False, history=None):
+    """استجابة /api/sales-forecast/scenarios كاملة"""
+    dates, offsets, predictions = forecast_scenarios(forecasting.backend, scenarios, history=history)
+    if columnar_response:
+        return pack_columns(*scenario_columns(scenarios, dates, offsets, predictions, aggregate))
+    with stage("serialize"):
+        return dumps(scenarios_response(scenarios, dates, offsets, predictions, aggregate, include_daily))
+
+# كل استدعاءات النماذج تمر عبر هذا الـ executor (INFERENCE_EXECUTOR: thread / process / inline)
+# في وضع process يتم fork بعد اكتمال تحميل النماذج لتتشاركها العمليات (copy-on-write)
+inference_executor = InferenceExecutor(before_start=lambda: model_loader.wait_all())
+
+# نافذة التجميع BATCH_WINDOW_MS وحجم الدفعة BATCH_MAX_SIZE (القيمة 1 تلغي التجميع)
+lead_scoring_batcher = MicroBatcher("lead_scoring", _score_lead_batch, executor=inference_executor)
+customer_segment_batcher = MicroBatcher("customer_segment", _segment_batch, executor=inference_executor)
+
+@app.exception_handler(ExecutorBusy)
+async def executor_busy_handler(request: Request, exc: ExecutorBusy):
+    """الطابور ممتلئ: 503 مع Retry-After بدل تكديس الطلبات"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    inference_executor.shutdown()
+
+class RequestStreamingResponse(StreamingResponse):
+    """StreamingResponse يقرأ جسم الطلب أثناء الإرسال
+
+    listen_for_disconnect في Starlette يستهلك رسائل http.request فيضيع جزء من جسم الطلب؛
+    هنا انقطاع الاتصال يظهر من request.stream() نفسه (ClientDisconnect).
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
 
 # === Pydantic Models للـ Request/Response ===
 
@@ -92,12 +260,36 @@ class SalesForecastRequest(BaseModel):
     end_date: str
     avg_transactions: Optional[int] = 5
 
+class ForecastScenario(BaseModel):
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    avg_transactions: Optional[float] = 5
+
+class SalesForecastScenariosRequest(BaseModel):
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    scenarios: Optional[List[ForecastScenario]] = None
+    avg_transactions_grid: Optional[List[float]] = None
+    aggregate: Literal["day", "week", "month"] = "day"
+    include_daily: Optional[bool] = True
+
+class SalesDay(BaseModel):
+    date: str
+    sales: float
+
+class SalesHistoryRequest(BaseModel):
+    days: List[SalesDay]
+
 class Customer(BaseModel):
+    id: Optional[int] = None
     recency: Optional[int] = 30
     frequency: Optional[int] = 1
     monetary: Optional[float] = 0
     lead_count: Optional[int] = 1
     avg_budget: Optional[float] = 0
+    # غير موجودة في الطلبات القديمة - القيمة الافتراضية متوسط التدريب
+    total_deal_value: Optional[float] = None
+    avg_probability: Optional[float] = None
 
 class CustomerSegmentRequest(BaseModel):
     customer: Customer
@@ -105,6 +297,36 @@ class CustomerSegmentRequest(BaseModel):
 class BatchLeadScoringRequest(BaseModel):
     leads: List[Lead]
 
+class BatchCustomerSegmentRequest(BaseModel):
+    customers: List[Customer]
+    include_distance: Optional[bool] = False
+
+class ModelReloadRequest(BaseModel):
+    model: Optional[str] = None
+    version: Optional[str] = None
+
+def _validate_body(model, body):
+    """التحقق من جسم JSON يدوياً (الـ endpoint يقبل أيضاً أعمدة ثنائية) - نفس خطأ 422 المعتاد"""
+    try:
+        with stage("parse"):
+            return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+
+def _columnar_body(model):
+    """توثيق /docs: JSON كالمعتاد أو application/vnd.crm.columns"""
+    schema = model.model_json_schema(ref_template="#/components/schemas/{model}")
+    schema.pop("$defs", None)
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": schema},
+                COLUMNAR_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+
 # === API Endpoints ===
 
 @app.get("/")
@@ -118,221 +340,325 @@ async def home():
             "docs": "/docs",
             "lead_scoring": "/api/lead-scoring",
             "sales_forecast": "/api/sales-forecast",
+            "sales_forecast_scenarios": "/api/sales-forecast/scenarios",
+            "sales_history": "/api/sales-history",
             "customer_segment": "/api/customer-segment",
-            "batch_lead_scoring": "/api/batch-lead-scoring"
+            "batch_lead_scoring": "/api/batch-lead-scoring",
+            "batch_lead_scoring_stream": "/api/batch-lead-scoring/stream",
+            "batch_customer_segment": "/api/batch-customer-segment",
+            "batch_customer_segment_stream": "/api/batch-customer-segment/stream",
+            "models": "/api/models",
+            "models_reload": "/api/models/reload",
+            "metrics": "/metrics"
         }
     }
 
 @app.get("/api/health")
 async def health_check():
     """فحص حالة API"""
+    scoring = registry.get("lead_scoring")
+    forecasting = registry.get("sales_forecasting")
+    segmentation = registry.get("customer_segmentation")
     return {
         "status": "ok",
         "timestamp": datetime.now().isoformat(),
         "models_loaded": {
-            "lead_scoring": lead_scoring_model is not None,
-            "sales_forecasting": sales_forecasting_model is not None,
-            "customer_segmentation": customer_segmentation_model is not None
+            "lead_scoring": scoring is not None,
+            "sales_forecasting": forecasting is not None,
+            "customer_segmentation": segmentation is not None
+        },
+        "models": model_loader.status(),
+        "model_versions": {
+            "lead_scoring": scoring.version if scoring else None,
+            "sales_forecasting": forecasting.version if forecasting else None,
+            "customer_segmentation": segmentation.version if segmentation else None
+        },
+        "inference_backends": {
+            "lead_scoring": scoring.backend.name if scoring else None,
+            "sales_forecasting": forecasting.backend.name if forecasting else None,
+            "customer_segmentation": segmentation.segmenter.name if segmentation else None
+        },
+        "encoders": {
+            "source": scoring.source_encoder.stats() if scoring else None,
+            "agent": scoring.agent_encoder.stats() if scoring else None
+        },
+        "forecast_cache": sales_forecast_cache.stats(),
+        "score_cache": lead_score_cache.stats(),
+        "score_store": lead_score_store.stats() if lead_score_store else None,
+        "sales_history": sales_history.stats(),
+        "traffic_capture": traffic_recorder.stats() if traffic_recorder else None,
+        "executor": inference_executor.stats(),
+        "batching": {
+            "lead_scoring": lead_scoring_batcher.stats(),
+            "customer_segment": customer_segment_batcher.stats()
         }
     }
 
+@app.get("/api/models")
+async def list_models():
+    """النسخة الفعالة والنسخ المتاحة لكل نموذج وحالة آخر إعادة تحميل"""
+    return registry.status()
+
+@app.post("/api/models/reload", status_code=202)
+async def reload_models(http_request: Request, request: Optional[ModelReloadRequest] = None):
+    """إعادة تحميل نموذج (أو كل النماذج) في الخلفية: {"model": "lead_scoring", "version": "v2"}"""
+    if not reload_allowed(http_request.headers.get("x-reload-token")):
+        raise HTTPException(status_code=403, detail="invalid or missing reload token")
+    
+    request = request or ModelReloadRequest()
+    try:
+        # التحميل والتحقق في خيط خلفي - الطلبات تستمر على النسخة الحالية حتى الاستبدال
+        reloading = registry.reload_many(request.model, request.version)
+        return {"success": True, "reloading": reloading}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """مقاييس هذه العملية بصيغة Prometheus (ml_engine.metrics)"""
+    # Content-Type كما هو (media_type يضيف charset مرة ثانية)
+    return Response(metrics.render(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
+
 @app.post("/api/lead-scoring")
 async def predict_lead_score(request: LeadScoringRequest):
     """التنبؤ بدرجة العميل"""
-    if lead_scoring_model is None:
+    await _wait_for_model("lead_scoring")
+    if registry.get("lead_scoring") is None:
         raise HTTPException(status_code=500, detail="Lead Scoring model not loaded")
     
     try:
-        lead = request.lead
-        
-        # تحضير البيانات
-        source = lead.source or "الموقع الإلكتروني"
-        agent = lead.agent or "غير محدد"
-        tags = lead.tags or []
-        createdAt = lead.createdAt or datetime.now().strftime('%Y-%m-%d')
-        budget = lead.budget or 0
-        
-        # حساب الأيام منذ الإنشاء
-        try:
-            created_date = pd.to_datetime(createdAt)
-            days_since_created = (pd.Timestamp.now() - created_date).days
-        except:
-            days_since_created = 0
-        
-        # ترميز
-        try:
-            source_encoded = lead_scoring_le_source.transform([source])[0]
-        except:
-            source_encoded = 0
-        
-        try:
-            agent_encoded = lead_scoring_le_agent.transform([agent])[0]
-        except:
-            agent_encoded = 0
-        
-        tags_count = len(tags) if isinstance(tags, list) else 0
-        
-        # التنبؤ
-        features = np.array([[source_encoded, agent_encoded, tags_count, days_since_created, float(budget)]])
-        score = lead_scoring_model.predict_proba(features)[0][1] * 100
+        # الطلبات المتزامنة تُجمع في دفعة واحدة (micro-batching)
+        score = await lead_scoring_batcher.submit(request.lead)
         
         return {
             "success": True,
             "lead_score": round(score, 2),
             "priority": "High" if score > 70 else "Medium" if score > 40 else "Low"
         }
+    except ExecutorBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/sales-forecast")
-async def predict_sales(request: SalesForecastRequest):
+async def predict_sales(request: SalesForecastRequest, http_request: Request):
     """التنبؤ بالمبيعات"""
-    if sales_forecasting_model is None:
+    await _wait_for_model("sales_forecasting")
+    forecasting = registry.get("sales_forecasting")
+    if forecasting is None:
         raise HTTPException(status_code=500, detail="Sales Forecasting model not loaded")
     
+    try:
+        avg_transactions = transactions_value(request.avg_transactions or 5)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
         start_date = request.start_date or (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
         end_date = request.end_date or (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
-        avg_transactions = request.avg_transactions or 5
-        
-        dates = pd.date_range(start=start_date, end=end_date, freq='D')
-        predictions = []
-        
-        for date in dates:
-            features = pd.DataFrame({
-                'year': [date.year],
-                'month': [date.month],
-                'day': [date.day],
-                'week': [date.isocalendar().week],
-                'weekday': [date.weekday()],
-                'quarter': [date.quarter],
-                'transaction_count': [avg_transactions],
-                'sales_7day_avg': [0],
-                'sales_30day_avg': [0]
-            })
-            
-            pred = sales_forecasting_model.predict(features)[0]
-            predictions.append({
-                "date": date.strftime('%Y-%m-%d'),
-                "predicted_sales": round(max(0, pred), 2)
-            })
         
-        total_forecast = sum(p['predicted_sales'] for p in predictions)
+        # كل الأيام في مصفوفة ميزات واحدة واستدعاء predict واحد (خارج الـ event loop)
+        columnar_response = accepts_columnar(http_request.headers.get("accept"))
+        result = await inference_executor.run(
+            _forecast, forecasting, start_date, end_date, avg_transactions, columnar_response, sales_history.snapshot()
+        )
+        return Response(result, media_type=COLUMNAR_MEDIA_TYPE if columnar_response else "application/json")
+    except ExecutorBusy:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/sales-forecast/scenarios")
+async def predict_sales_scenarios(request: SalesForecastScenariosRequest, http_request: Request):
+    """التنبؤ بالمبيعات لعدة سيناريوهات (فترات و/أو شبكة avg_transactions) باستدعاء predict واحد"""
+    await _wait_for_model("sales_forecasting")
+    forecasting = registry.get("sales_forecasting")
+    if forecasting is None:
+        raise HTTPException(status_code=500, detail="Sales Forecasting model not loaded")
+    
+    try:
+        scenarios = scenario_list(
+            request.model_dump(exclude_none=True),
+            (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d'),
+            (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+        )
         
-        return {
-            "success": True,
-            "predictions": predictions,
-            "total_forecast": round(total_forecast, 2),
-            "average_daily": round(total_forecast / len(predictions), 2)
-        }
+        # كل السيناريوهات في مصفوفة ميزات واحدة مكدسة (خارج الـ event loop)
+        columnar_response = accepts_columnar(http_request.headers.get("accept"))
+        result = await inference_executor.run(
+            _forecast_scenarios, forecasting, scenarios, request.aggregate, request.include_daily is not False,
+            columnar_response, sales_history.snapshot()
+        )
+        return Response(result, media_type=COLUMNAR_MEDIA_TYPE if columnar_response else "application/json")
+    except ExecutorBusy:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/sales-history")
+async def sales_history_status():
+    """عدد الأيام المسجلة وآخر يوم والنوافذ كما ستدخل التنبؤ التالي"""
+    return await run_in_threadpool(sales_history.stats)
+
+@app.post("/api/sales-history")
+async def add_sales_history(request: SalesHistoryRequest):
+    """إضافة المبيعات اليومية الفعلية: {"days": [{"date": "2025-11-30", "sales": 152340.5}]}"""
+    try:
+        # append-only: الأيام الأقدم من آخر يوم مسجل مرفوضة، ومبيعات آخر يوم تُجمع
+        history = await run_in_threadpool(sales_history.ingest, [day.model_dump() for day in request.days])
+        return {"success": True, "history": history}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/api/customer-segment")
 async def predict_segment(request: CustomerSegmentRequest):
     """التنبؤ بقسم العميل"""
-    if customer_segmentation_model is None:
+    await _wait_for_model("customer_segmentation")
+    if registry.get("customer_segmentation") is None:
         raise HTTPException(status_code=500, detail="Customer Segmentation model not loaded")
     
     try:
-        customer = request.customer
-        
-        # استخراج الميزات
-        recency = customer.recency or 30
-        frequency = customer.frequency or 1
-        monetary = customer.monetary or 0
-        lead_count = customer.lead_count or 1
-        avg_budget = customer.avg_budget or 0
-        
-        features = np.array([[recency, frequency, monetary, lead_count, avg_budget]])
-        features_scaled = customer_segmentation_scaler.transform(features)
-        
-        segment = customer_segmentation_model.predict(features_scaled)[0]
-        
-        segment_names = {
-            0: "Bronze",
-            1: "Silver",
-            2: "Gold",
-            3: "Platinum"
-        }
+        # الطلبات المتزامنة تُجمع في دفعة واحدة (micro-batching)
+        segment = await customer_segment_batcher.submit(request.customer)
         
         return {
             "success": True,
             "segment": int(segment),
-            "segment_name": segment_names.get(int(segment), "Unknown")
+            "segment_name": SEGMENT_NAMES.get(int(segment), "Unknown")
         }
+    except ExecutorBusy:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/batch-lead-scoring")
-async def batch_lead_scoring(request: BatchLeadScoringRequest):
-    """التنبؤ بدرجة عدة عملاء دفعة واحدة"""
-    if lead_scoring_model is None:
+@app.post("/api/batch-lead-scoring", openapi_extra=_columnar_body(BatchLeadScoringRequest))
+async def batch_lead_scoring(request: Request):
+    """التنبؤ بدرجة عدة عملاء دفعة واحدة (JSON أو أعمدة ثنائية حسب Content-Type/Accept)"""
+    await _wait_for_model("lead_scoring")
+    scoring = registry.get("lead_scoring")
+    if scoring is None:
         raise HTTPException(status_code=500, detail="Lead Scoring model not loaded")
     
+    body = await request.body()
+    columnar_response = accepts_columnar(request.headers.get("accept"))
+    if is_columnar(request.headers.get("content-type")):
+        job = (_lead_columns, scoring, body, columnar_response)
+    else:
+        job = (_batch_results, scoring, _validate_body(BatchLeadScoringRequest, body).leads, columnar_response)
+    
     try:
-        leads = request.leads
-        results = []
-        
-        for lead in leads:
-            try:
-                source = lead.source or "الموقع الإلكتروني"
-                agent = lead.agent or "غير محدد"
-                tags = lead.tags or []
-                createdAt = lead.createdAt or datetime.now().strftime('%Y-%m-%d')
-                budget = lead.budget or 0
-                
-                try:
-                    created_date = pd.to_datetime(createdAt)
-                    days_since_created = (pd.Timestamp.now() - created_date).days
-                except:
-                    days_since_created = 0
-                
-                try:
-                    source_encoded = lead_scoring_le_source.transform([source])[0]
-                except:
-                    source_encoded = 0
-                
-                try:
-                    agent_encoded = lead_scoring_le_agent.transform([agent])[0]
-                except:
-                    agent_encoded = 0
-                
-                tags_count = len(tags) if isinstance(tags, list) else 0
-                
-                features = np.array([[source_encoded, agent_encoded, tags_count, days_since_created, float(budget)]])
-                score = lead_scoring_model.predict_proba(features)[0][1] * 100
-                
-                results.append({
-                    "lead_id": lead.id,
-                    "name": lead.name,
-                    "lead_score": round(score, 2),
-                    "priority": "High" if score > 70 else "Medium" if score > 40 else "Low"
-                })
-            except Exception as e:
-                results.append({
-                    "lead_id": lead.id,
-                    "name": lead.name,
-                    "error": str(e)
-                })
-        
-        return {
-            "success": True,
-            "results": results
-        }
+        # بناء مصفوفة ميزات واحدة لكل الدفعة واستدعاء النموذج مرة واحدة (خارج الـ event loop)
+        # الـ executor يرجع الجسم جاهزاً (bytes): لا jsonable_encoder ولا تحويل في الـ event loop
+        body = await inference_executor.run(*job)
+        return Response(body, media_type=COLUMNAR_MEDIA_TYPE if columnar_response else "application/json")
+    except ExecutorBusy:
+        raise
+    except ValueError as e:
+        # جسم ثنائي غير صالح (header أو أعمدة)
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/batch-lead-scoring/stream")
+async def stream_lead_scoring(request: Request):
+    """تقييم ملف NDJSON/CSV كبير على شكل stream - الذاكرة ثابتة مهما كان حجم الملف"""
+    await _wait_for_model("lead_scoring")
+    # الـ stream كله على نفس النسخة حتى لو استُبدل النموذج أثناءه
+    scoring = registry.get("lead_scoring")
+    if scoring is None:
+        raise HTTPException(status_code=500, detail="Lead Scoring model not loaded")
+    # بعد بدء الإرسال لا يمكن إرجاع 503 - نرفض الآن إذا كان الطابور ممتلئاً
+    if inference_executor.busy:
+        raise ExecutorBusy(inference_executor.retry_after)
+    
+    # Content-Type: text/csv أو application/x-ndjson | Accept: text/csv أو application/x-ndjson
+    in_format = input_format(request.headers.get("content-type"))
+    out_format = output_format(request.headers.get("accept"))
+    
+    async def score_chunk(lines, header, now):
+        # قراءة الجزء التالي من الطلب تنتظر حتى يُرسل هذا الجزء (backpressure)
+        return await inference_executor.run(
+            _score_stream_chunk, scoring, lines, in_format, out_format, header, now, wait=True
+        )
+    
+    return RequestStreamingResponse(
+        astream_scores(request.stream(), in_format, out_format, score_chunk),
+        media_type=MEDIA_TYPES[out_format]
+    )
+
+@app.post("/api/batch-customer-segment", openapi_extra=_columnar_body(BatchCustomerSegmentRequest))
+async def batch_customer_segment(request: Request):
+    """تصنيف عدة عملاء دفعة واحدة (include_distance: المسافة لمركز القسم كمؤشر ثقة)"""
+    await _wait_for_model("customer_segmentation")
+    segmentation = registry.get("customer_segmentation")
+    if segmentation is None:
+        raise HTTPException(status_code=500, detail="Customer Segmentation model not loaded")
+    
+    body = await request.body()
+    columnar_response = accepts_columnar(request.headers.get("accept"))
+    if is_columnar(request.headers.get("content-type")):
+        job = (_segment_columns, segmentation, body, columnar_response)
+    else:
+        payload = _validate_body(BatchCustomerSegmentRequest, body)
+        job = (_segment_customers, segmentation, payload.customers, payload.include_distance, columnar_response)
+    
+    try:
+        # الـ executor يرجع الجسم جاهزاً (bytes): لا jsonable_encoder ولا تحويل في الـ event loop
+        body = await inference_executor.run(*job)
+        return Response(body, media_type=COLUMNAR_MEDIA_TYPE if columnar_response else "application/json")
+    except ExecutorBusy:
+        raise
+    except ValueError as e:
+        # جسم ثنائي غير صالح (header أو أعمدة)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/batch-customer-segment/stream")
+async def stream_customer_segment(request: Request, include_distance: bool = False):
+    """تصنيف ملف NDJSON/CSV كبير على شكل stream (?include_distance=true)"""
+    await _wait_for_model("customer_segmentation")
+    segmentation = registry.get("customer_segmentation")
+    if segmentation is None:
+        raise HTTPException(status_code=500, detail="Customer Segmentation model not loaded")
+    if inference_executor.busy:
+        raise ExecutorBusy(inference_executor.retry_after)
+    
+    in_format = input_format(request.headers.get("content-type"))
+    out_format = output_format(request.headers.get("accept"))
+    
+    async def segment_chunk(lines, header, now):
+        return await inference_executor.run(
+            _segment_stream_chunk, segmentation, lines, in_format, out_format, header, include_distance, wait=True
+        )
+    
+    return RequestStreamingResponse(
+        astream_scores(request.stream(), in_format, out_format, segment_chunk, fields=SEGMENT_OUTPUT_FIELDS),
+        media_type=MEDIA_TYPES[out_format]
+    )
+
 # تحميل النماذج عند بدء التطبيق
 # ملاحظة: في الخطة المجانية، قد يستغرق التحميل 10-15 ثانية عند Spin-up
 @app.on_event("startup")
 async def startup_event():
     print("🚀 جارٍ تحميل النماذج...")
     print("⏱️  هذا قد يستغرق 10-15 ثانية في الخطة المجانية (Spin-up)")
-    load_models()
-    print("✅ API جاهز! جميع النماذج محملة في الذاكرة.")
+    if not MODEL_PRELOAD:
+        load_models()
+    # MODEL_WATCH_SECONDS: إعادة التحميل تلقائياً عند تغير ملفات النماذج
+    registry.watch()
+    if model_loader.mode == 'eager':
+        print("✅ API جاهز! جميع النماذج محملة في الذاكرة.")
+    else:
+        print(f"✅ API جاهز! النماذج تُحمّل ({model_loader.mode}) - الحالة في /api/health")
     print(f"💾 حجم النماذج: ~350 KB - مناسب تماماً للخطة المجانية (512MB RAM)")
 
+if MODEL_PRELOAD:
+    # gunicorn --preload: تحميل واحد في العملية الرئيسية قبل fork (startup_event في كل عامل يجد النماذج جاهزة)
+    preload_models(model_loader)
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 8000))
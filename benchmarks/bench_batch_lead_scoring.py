@@ -0,0 +1,118 @@
+"""
+Benchmark: batch lead scoring - per-lead loop vs vectorized engine
+مقارنة عدد العملاء في الثانية بين الحلقة القديمة والمحرك المتجه
+
+python benchmarks/bench_batch_lead_scoring.py --sizes 100 1000 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import warnings
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from ml_engine.encoders import CategoricalEncoder  # noqa: E402
+from ml_engine.features import record_columns  # noqa: E402
+from ml_engine.inference import make_backend  # noqa: E402
+from ml_engine.lead_scoring import DEFAULT_AGENT, DEFAULT_SOURCE, score_leads  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def make_leads(n, seed=42):
+    """بيانات عملاء اصطناعية بأشكال مختلفة تشمل صفوفاً غير صالحة"""
+    rng = random.Random(seed)
+    sources = ['Kaggle Dataset', DEFAULT_SOURCE, 'Facebook', 'Referral']
+    agents = ['Auto Import', DEFAULT_AGENT, 'Ahmed']
+    today = datetime.now()
+    leads = []
+    for i in range(n):
+        created = today - timedelta(days=rng.randint(0, 400))
+        leads.append({
+            'id': i,
+            'name': f'lead-{i}',
+            'source': rng.choice(sources),
+            'agent': rng.choice(agents),
+            'tags': ['VIP'] * rng.randint(0, 3),
+            'createdAt': created.strftime('%Y-%m-%d') if i % 10 else created.isoformat(),
+            'budget': 'n/a' if i % 97 == 0 else rng.randint(0, 5_000_000)
+        })
+    return leads
+
+
+def legacy_loop(model, le_source, le_agent, leads):
+    """نسخة مرجعية من الحلقة القديمة (عميل واحد في كل استدعاء)"""
+    results = []
+    for lead in leads:
+        try:
+            try:
+                days = (pd.Timestamp.now() - pd.to_datetime(lead.get('createdAt'))).days
+            except Exception:
+                days = 0
+            try:
+                source_encoded = le_source.transform([lead.get('source', DEFAULT_SOURCE)])[0]
+            except Exception:
+                source_encoded = 0
+            try:
+                agent_encoded = le_agent.transform([lead.get('agent', DEFAULT_AGENT)])[0]
+            except Exception:
+                agent_encoded = 0
+            tags = lead.get('tags', [])
+            tags_count = len(tags) if isinstance(tags, list) else 0
+            features = np.array([[source_encoded, agent_encoded, tags_count, days, float(lead.get('budget', 0))]])
+            results.append(model.predict_proba(features)[0][1] * 100)
+        except Exception:
+            results.append(np.nan)
+    return np.array(results)
+
+
+def vectorized(model, le_source, le_agent, leads):
+    scores, _ = score_leads(
+        make_backend(model),
+        record_columns(leads),
+        CategoricalEncoder.from_label_encoder(le_source, 'source'),
+        CategoricalEncoder.from_label_encoder(le_agent, 'agent')
+    )
+    return scores
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--legacy-max', type=int, default=10000,
+                        help='تخطي الحلقة القديمة للأحجام الأكبر من هذا الرقم')
+    args = parser.parse_args()
+
+    lead_dir = os.path.join(ROOT_DIR, 'Lead_scoring')
+    model = joblib.load(os.path.join(lead_dir, 'lead_scoring_model.pkl'))
+    le_source = joblib.load(os.path.join(lead_dir, 'le_source.pkl'))
+    le_agent = joblib.load(os.path.join(lead_dir, 'le_agent.pkl'))
+
+    print(f"{'leads':>8} {'loop leads/s':>14} {'vector leads/s':>16} {'speedup':>9}")
+    for n in args.sizes:
+        leads = make_leads(n)
+        new_scores, new_time = timed(vectorized, model, le_source, le_agent, leads)
+        if n <= args.legacy_max:
+            old_scores, old_time = timed(legacy_loop, model, le_source, le_agent, leads)
+            assert np.allclose(old_scores, new_scores, equal_nan=True), 'score mismatch'
+            print(f'{n:>8} {n / old_time:>14,.0f} {n / new_time:>16,.0f} {old_time / new_time:>8.1f}x')
+        else:
+            print(f"{n:>8} {'-':>14} {n / new_time:>16,.0f} {'-':>9}")
+
+
+if __name__ == '__main__':
+    main()
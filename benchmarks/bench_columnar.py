@@ -0,0 +1,136 @@
+"""
+Benchmark: JSON vs packed columns (application/vnd.crm.columns) on the bulk endpoints
+مقارنة حجم البيانات على الشبكة ووقت CPU لكل 10 آلاف صف بين JSON والصيغة العمودية الثنائية
+
+python benchmarks/bench_columnar.py --rows 10000 --apps flask fastapi
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault('MODEL_LOADING', 'eager')
+warnings.filterwarnings('ignore')
+
+from benchmarks.bench_batch_lead_scoring import make_leads  # noqa: E402
+from ml_engine.columnar import COLUMNAR_MEDIA_TYPE, Categorical, pack_columns, unpack_columns  # noqa: E402
+
+
+def lead_payloads(n):
+    leads = make_leads(n)
+    for lead in leads:
+        # FastAPI يتحقق من budget كرقم
+        if isinstance(lead['budget'], str):
+            lead['budget'] = 0
+    json_body = json.dumps({'leads': leads}, ensure_ascii=False).encode('utf-8')
+    columns_body = pack_columns({
+        'id': np.array([lead['id'] for lead in leads], dtype=np.int64),
+        'name': Categorical.from_values([lead['name'] for lead in leads]),
+        'source': Categorical.from_values([lead['source'] for lead in leads]),
+        'agent': Categorical.from_values([lead['agent'] for lead in leads]),
+        'tags_count': np.array([len(lead['tags']) for lead in leads], dtype=np.int16),
+        'created_at': pd.to_datetime(pd.Series([lead['createdAt'] for lead in leads]), format='mixed').values,
+        'budget': np.array([lead['budget'] for lead in leads], dtype=np.float64)
+    })
+    return json_body, columns_body
+
+
+def customer_payloads(n, seed=0):
+    rng = np.random.default_rng(seed)
+    fields = {
+        'recency': rng.integers(0, 365, n),
+        'frequency': rng.integers(0, 20, n),
+        'monetary': rng.uniform(0, 1e6, n).round(2),
+        'lead_count': rng.integers(0, 50, n),
+        'avg_budget': rng.uniform(0, 5e6, n).round(2)
+    }
+    customers = [
+        dict(id=i, **{name: values[i].item() for name, values in fields.items()}) for i in range(n)
+    ]
+    json_body = json.dumps({'customers': customers, 'include_distance': True}).encode('utf-8')
+    columns_body = pack_columns(dict(id=np.arange(n), **fields), meta={'include_distance': True})
+    return json_body, columns_body
+
+
+def forecast_payload(n):
+    start = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    end = start + pd.Timedelta(days=n - 1)
+    body = {'start_date': start.strftime('%Y-%m-%d'), 'end_date': end.strftime('%Y-%m-%d'), 'avg_transactions': 5}
+    return json.dumps(body).encode('utf-8')
+
+
+def make_client(app_name, stack):
+    if app_name == 'flask':
+        import app as flask_app
+        flask_app.model_loader.wait_all()
+        client = flask_app.app.test_client()
+        return lambda path, body, headers: client.post(path, data=body, headers=headers).data
+    from fastapi.testclient import TestClient
+    import app_fastapi
+    client = stack.enter_context(TestClient(app_fastapi.app))
+    app_fastapi.model_loader.wait_all()
+    return lambda path, body, headers: client.post(path, content=body, headers=headers).content
+
+
+def measure(post, path, body, headers, repeat):
+    """أقل زمن CPU للعملية (ms) وحجم الاستجابة"""
+    response = post(path, body, headers)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.process_time()
+        post(path, body, headers)
+        best = min(best, time.process_time() - start)
+    return best * 1000, response
+
+
+def run_cases(post, app_name, cases, args):
+    print(f'\n[{app_name}] {args.rows} rows')
+    for path, fmt, body, headers in cases:
+        cpu_ms, response = measure(post, path, body, headers, args.repeat)
+        if fmt == 'columns':
+            columns, _ = unpack_columns(response)
+            rows = len(next(iter(columns.values())))
+        else:
+            payload = json.loads(response)
+            rows = len(payload.get('results', payload.get('predictions', [])))
+        assert rows == args.rows, f'{path} {fmt}: {rows} rows'
+        print(f'  {path:30s} {fmt:8s} request {len(body) / 1024:8.1f} KiB  response {len(response) / 1024:8.1f} KiB  '
+              f'CPU {cpu_ms:8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--apps', nargs='+', default=['flask', 'fastapi'])
+    args = parser.parse_args()
+
+    json_headers = {'Content-Type': 'application/json'}
+    columns_headers = {'Content-Type': COLUMNAR_MEDIA_TYPE, 'Accept': COLUMNAR_MEDIA_TYPE}
+    lead_json, lead_columns = lead_payloads(args.rows)
+    customer_json, customer_columns = customer_payloads(args.rows)
+    forecast_json = forecast_payload(args.rows)
+    cases = [
+        ('/api/batch-lead-scoring', 'json', lead_json, json_headers),
+        ('/api/batch-lead-scoring', 'columns', lead_columns, columns_headers),
+        ('/api/batch-customer-segment', 'json', customer_json, json_headers),
+        ('/api/batch-customer-segment', 'columns', customer_columns, columns_headers),
+        ('/api/sales-forecast', 'json', forecast_json, json_headers),
+        ('/api/sales-forecast', 'columns', forecast_json, {**json_headers, 'Accept': COLUMNAR_MEDIA_TYPE}),
+    ]
+
+    for app_name in args.apps:
+        with contextlib.ExitStack() as stack:
+            run_cases(make_client(app_name, stack), app_name, cases, args)
+
+
+if __name__ == '__main__':
+    main()
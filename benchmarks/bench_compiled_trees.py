@@ -0,0 +1,82 @@
+"""
+Benchmark: compiled tree ensembles vs sklearn / XGBoost
+زمن الصف الواحد (p50/p99) والدفعات - التطابق مع النماذج الأصلية في tests/test_compiled_trees.py
+
+    python benchmarks/bench_compiled_trees.py --rows 2000 --batch 10000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from ml_engine.compiled_trees import compile_model, probe_features  # noqa: E402
+from ml_engine.forecasting import FEATURE_COLUMNS  # noqa: E402
+from ml_engine.inference import make_backend  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def load(relative_path):
+    return joblib.load(os.path.join(ROOT_DIR, relative_path))
+
+
+def latencies(fn, rows, repeat):
+    fn(rows[0])
+    samples = np.empty(repeat)
+    for i in range(repeat):
+        row = rows[i % len(rows)]
+        start = time.perf_counter()
+        fn(row)
+        samples[i] = time.perf_counter() - start
+    return np.percentile(samples, 50) * 1e6, np.percentile(samples, 99) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000, help='عدد قياسات الصف الواحد')
+    parser.add_argument('--batch', type=int, default=10000, help='حجم الدفعة لقياس الإنتاجية')
+    args = parser.parse_args()
+
+    lead_model = load('Lead_scoring/lead_scoring_model.pkl')
+    sales_model = load('Sales_forecasting/sales_forecasting_model.pkl')
+    lead_compiled = compile_model(lead_model)
+    sales_compiled = compile_model(sales_model)
+
+    engines = {
+        'lead_scoring': [
+            ('sklearn predict_proba', lambda x: lead_model.predict_proba(x)),
+            ('native backend', make_backend(lead_model, 'native').predict_positive_proba),
+            ('compiled', lead_compiled.predict_positive_proba),
+            ('compiled backend', make_backend(lead_model, 'compiled').predict_positive_proba),
+        ],
+        'sales_forecasting': [
+            ('XGBRegressor.predict', lambda x: sales_model.predict(pd.DataFrame(x, columns=FEATURE_COLUMNS))),
+            ('native backend', make_backend(sales_model, 'native').predict),
+            ('compiled', sales_compiled.predict),
+            ('compiled backend', make_backend(sales_model, 'compiled').predict),
+        ],
+    }
+    probes = {'lead_scoring': probe_features(lead_compiled, args.batch), 'sales_forecasting': probe_features(sales_compiled, args.batch)}
+
+    print(f"{'model':<18} {'engine':<22} {'p50 µs':>9} {'p99 µs':>9} {'batch rows/s':>14}")
+    for model_name, variants in engines.items():
+        X = probes[model_name]
+        rows = [X[i:i + 1] for i in range(min(len(X), 1000))]
+        for engine_name, fn in variants:
+            p50, p99 = latencies(fn, rows, args.rows)
+            start = time.perf_counter()
+            fn(X)
+            throughput = len(X) / (time.perf_counter() - start)
+            print(f'{model_name:<18} {engine_name:<22} {p50:>9.1f} {p99:>9.1f} {throughput:>14,.0f}')
+
+
+if __name__ == '__main__':
+    main()
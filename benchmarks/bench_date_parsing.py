@@ -0,0 +1,109 @@
+"""
+Benchmark: createdAt parsing - flexible pd.to_datetime vs the ISO-8601 fast path (ml_engine.dates)
+مقارنة زمن حساب days_since_created لعمود تواريخ بصيغ مختلطة، مع التحقق من تطابق النتائج:
+
+    iso-dates   YYYY-MM-DD فقط
+    mixed       60% YYYY-MM-DD، 25% isoformat بالكسور، 5% dd/mm/yyyy، 5% YYYY-MM-DD HH:MM، 3% None، 2% نص خاطئ
+    mixed+tz    نفس mixed مع 5% '...Z' (المسار السابق يرجع لتحليل كل قيمة على حدة)
+
+python benchmarks/bench_date_parsing.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import warnings
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from ml_engine.dates import days_since  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+NOW = pd.Timestamp('2026-03-15 13:45:10')
+
+
+def make_dates(n, mix, seed=42):
+    rng = random.Random(seed)
+    formats = {
+        'iso-dates': [(1.0, lambda d: d.strftime('%Y-%m-%d'))],
+        'mixed': [
+            (0.60, lambda d: d.strftime('%Y-%m-%d')),
+            (0.25, lambda d: d.isoformat(timespec='microseconds')),
+            (0.05, lambda d: d.strftime('%d/%m/%Y')),
+            (0.05, lambda d: d.strftime('%Y-%m-%d %H:%M')),
+            (0.03, lambda d: None),
+            (0.02, lambda d: 'not a date'),
+        ],
+    }
+    formats['mixed+tz'] = formats['mixed'][:-1] + [
+        (0.05, lambda d: d.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z')
+    ]
+    weights, makers = zip(*formats[mix])
+    values = []
+    for maker in rng.choices(makers, weights, k=n):
+        day = NOW - timedelta(days=rng.randint(-30, 900), seconds=rng.randint(0, 86399),
+                              microseconds=rng.randint(0, 999999))
+        values.append(maker(day))
+    return values
+
+
+def legacy_days(values, now):
+    """days_since_created السابق كما هو (pd.to_datetime format='mixed' ثم كل قيمة على حدة عند الفشل)"""
+    def scalar(value):
+        try:
+            days = (now - pd.to_datetime(value)).days
+        except Exception:
+            return 0
+        return 0 if pd.isna(days) else days
+    try:
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='mixed')
+        return (now - parsed).dt.days.fillna(0).to_numpy(dtype=np.float64)
+    except Exception:
+        return np.array([scalar(v) for v in values], dtype=np.float64)
+
+
+def expected_days(values, legacy):
+    """الفرق المقصود: '...Z' كان يعطي 0 (naive - aware) - الآن يُحسب بعد التحويل إلى UTC"""
+    expected = legacy.copy()
+    for i, value in enumerate(values):
+        if isinstance(value, str) and value.endswith('Z'):
+            expected[i] = (NOW - pd.Timestamp(value).tz_convert('UTC').tz_localize(None)).days
+    return expected
+
+
+def timed(fn, *args, repeat=1):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--mixes', nargs='+', default=['iso-dates', 'mixed', 'mixed+tz'])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'mix':>10} {'rows':>8} {'previous ms':>12} {'fast path ms':>13} {'speedup':>9}")
+    for mix in args.mixes:
+        values = make_dates(args.rows, mix)
+        # المسار السابق بطيء جداً مع المناطق الزمنية المختلطة: مرة واحدة فقط
+        legacy, old_time = timed(legacy_days, values, NOW, repeat=1 if mix == 'mixed+tz' else args.repeat)
+        days, new_time = timed(days_since, values, NOW, repeat=args.repeat)
+        assert np.array_equal(days, expected_days(values, legacy)), f'{mix}: days mismatch'
+        print(f'{mix:>10} {args.rows:>8} {old_time * 1000:>12.1f} {new_time * 1000:>13.1f} '
+              f'{old_time / new_time:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
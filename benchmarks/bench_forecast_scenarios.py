@@ -0,0 +1,66 @@
+"""
+Benchmark: what-if scenarios - one stacked predict vs one /api/sales-forecast call per scenario
+شبكة avg_transactions على نفس الفترة: forecast_sales لكل قيمة مقابل forecast_scenarios باستدعاء predict واحد
+
+python benchmarks/bench_forecast_scenarios.py --days 30 90 365 --grid 10 50
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from ml_engine.forecasting import forecast_sales, forecast_scenarios, scenarios_response  # noqa: E402
+from ml_engine.inference import make_backend  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def best_ms(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 90, 365])
+    parser.add_argument('--grid', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    backend = make_backend(joblib.load(os.path.join(ROOT_DIR, 'Sales_forecasting/sales_forecasting_model.pkl')))
+    start = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    print(f'sales_forecasting ({backend.name})')
+    for days in args.days:
+        end = (start + pd.Timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        for size in args.grid:
+            scenarios = [(start.strftime('%Y-%m-%d'), end, float(tx)) for tx in np.linspace(1, 50, size)]
+
+            def per_scenario():
+                return [forecast_sales(backend, *scenario)[1] for scenario in scenarios]
+
+            dates, offsets, predictions = forecast_scenarios(backend, scenarios)
+            expected = per_scenario()
+            assert all(np.array_equal(p, predictions[offsets[i]:offsets[i + 1]]) for i, p in enumerate(expected))
+
+            looped = best_ms(per_scenario, args.repeat)
+            stacked = best_ms(lambda: forecast_scenarios(backend, scenarios), args.repeat)
+            weekly = best_ms(lambda: scenarios_response(scenarios, *forecast_scenarios(backend, scenarios), 'week'),
+                             args.repeat)
+            print(f'  {days:4d} days x {size:3d} scenarios   per scenario {looped:8.2f} ms   '
+                  f'stacked {stacked:7.2f} ms ({looped / stacked:4.1f}x)   + weekly JSON {weekly:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
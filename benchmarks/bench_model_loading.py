@@ -0,0 +1,83 @@
+"""
+Benchmark: model loading time per model and per file
+زمن تحميل كل نموذج (وكل ملف) في أوضاع التحميل المختلفة
+
+كل وضع يُقاس في عملية منفصلة حتى لا يؤثر الكاش بين القياسات:
+    python benchmarks/bench_model_loading.py --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (الاسم، MODEL_LOADING، MODEL_MMAP_MODE، استخدام الصيغة الأصلية لـ XGBoost)
+SCENARIOS = [
+    ('eager pickle', 'eager', '', False),
+    ('eager mmap', 'eager', 'r', False),
+    ('eager native xgb', 'eager', '', True),
+    ('background pickle', 'background', '', False),
+    ('background native xgb', 'background', '', True),
+]
+
+CHILD = r'''
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+sys.path.insert(0, {root!r})
+import joblib, numpy, pandas, sklearn, xgboost  # الاستيراد خارج القياس
+from ml_engine import model_loader as ml
+from ml_engine.model_loader import ModelLoader, load_customer_segmentation, load_lead_scoring, load_sales_forecasting
+loader = ModelLoader()
+loader.register('lead_scoring', lambda slot: load_lead_scoring({root!r}, slot))
+loader.register('sales_forecasting', lambda slot: load_sales_forecasting({root!r}, slot))
+loader.register('customer_segmentation', lambda slot: load_customer_segmentation({root!r}, slot))
+start = time.perf_counter()
+loader.start({mode!r})
+loader.wait_all()
+print(json.dumps({{'wall': time.perf_counter() - start, 'models': loader.status()}}))
+'''
+
+
+def run_scenario(mode, mmap_mode, native):
+    env = dict(os.environ, MODEL_MMAP_MODE=mmap_mode)
+    code = CHILD.format(root=ROOT_DIR, mode=mode)
+    out = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    from ml_engine.model_loader import export_native, native_path  # noqa: E402
+    sales_pkl = os.path.join(ROOT_DIR, 'Sales_forecasting', 'sales_forecasting_model.pkl')
+    native = native_path(sales_pkl)
+    had_native = os.path.exists(native)
+
+    try:
+        for name, mode, mmap_mode, use_native in SCENARIOS:
+            if use_native and not os.path.exists(native):
+                export_native(ROOT_DIR)
+            if not use_native and os.path.exists(native) and not had_native:
+                os.remove(native)
+            if not use_native and had_native:
+                print(f'{name}: skipped ({native} exists)')
+                continue
+
+            runs = [run_scenario(mode, mmap_mode, use_native) for _ in range(args.repeat)]
+            best = min(runs, key=lambda r: r['wall'])
+            print(f"\n{name}: wall {best['wall'] * 1000:.1f} ms (best of {args.repeat})")
+            for model, status in best['models'].items():
+                files = ', '.join(f'{f} {s * 1000:.1f} ms' for f, s in status['files'].items())
+                print(f"  {model:<24} {status['state']:<8} {status['seconds'] * 1000:>8.1f} ms  [{files}]")
+    finally:
+        if not had_native and os.path.exists(native):
+            os.remove(native)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, ROOT_DIR)
+    main()
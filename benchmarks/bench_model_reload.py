@@ -0,0 +1,182 @@
+"""
+Benchmark: hot model reload under load - zero failed requests during the swap
+إعادة تحميل النماذج أثناء ضغط طلبات مستمر على Flask و FastAPI:
+نسخة جديدة عبر POST /api/models/reload، نسخة تالفة (يجب أن تُرفض دون استبدال)،
+ثم الرجوع للنسخة base بكتابة ملف CURRENT ومراقبة الملفات (MODEL_WATCH_SECONDS).
+
+python benchmarks/bench_model_reload.py --threads 4 --apps flask fastapi
+INFERENCE_EXECUTOR=process python benchmarks/bench_model_reload.py --apps fastapi
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ['MODEL_LOADING'] = 'eager'
+os.environ.setdefault('MODEL_RELOAD_OPEN', '1')
+warnings.filterwarnings('ignore')
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+MODEL_DIRS = ('Lead_scoring', 'Sales_forecasting', 'Customer_segmentation')
+LEAD = {'id': 1, 'source': 'Facebook', 'agent': 'Ahmed', 'tags': ['VIP'], 'createdAt': '2025-01-01', 'budget': 250000}
+REQUESTS = (
+    ('/api/lead-scoring', {'lead': LEAD}),
+    ('/api/batch-lead-scoring', {'leads': [dict(LEAD, id=i, budget=i * 1000) for i in range(200)]}),
+    ('/api/sales-forecast', {'start_date': '2025-01-01', 'end_date': '2025-01-30', 'avg_transactions': 5}),
+    ('/api/customer-segment', {'customer': {'recency': 10}}),
+)
+
+
+def make_models_dir():
+    """نسخة من مجلدات النماذج + Lead_scoring/versions/v2 (نفس الملفات) و versions/v0-broken (ملف تالف)"""
+    models_dir = tempfile.mkdtemp(prefix='models-')
+    for name in MODEL_DIRS:
+        shutil.copytree(os.path.join(ROOT_DIR, name), os.path.join(models_dir, name))
+    lead_dir = os.path.join(models_dir, 'Lead_scoring')
+    shutil.copytree(os.path.join(ROOT_DIR, 'Lead_scoring'), os.path.join(lead_dir, 'versions', 'v2'))
+    broken = os.path.join(lead_dir, 'versions', 'v0-broken')
+    shutil.copytree(os.path.join(ROOT_DIR, 'Lead_scoring'), broken)
+    with open(os.path.join(broken, 'lead_scoring_model.pkl'), 'wb') as f:
+        f.write(b'not a pickle')
+    return models_dir
+
+
+class Load:
+    """خيوط ترسل الطلبات باستمرار وتسجل كل استجابة ليست 200"""
+
+    def __init__(self, make_client, threads):
+        self.make_client = make_client
+        self.threads = threads
+        self.stop = threading.Event()
+        self.count = 0
+        self.failures = []
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def _run(self, worker):
+        client = self.make_client()
+        i = worker
+        while not self.stop.is_set():
+            url, body = REQUESTS[i % len(REQUESTS)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = client.post(url, json=body)
+                status = response.status_code
+            except Exception as e:
+                status = repr(e)
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self.count += 1
+                self.max_ms = max(self.max_ms, elapsed)
+                if status != 200:
+                    self.failures.append((url, status))
+
+    def __enter__(self):
+        self._workers = [threading.Thread(target=self._run, args=(i,), daemon=True) for i in range(self.threads)]
+        for worker in self._workers:
+            worker.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        for worker in self._workers:
+            worker.join()
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise RuntimeError('timed out waiting for reload')
+        time.sleep(0.02)
+
+
+def run_scenario(module, client, make_client, models_dir, threads, settle):
+    registry = module.registry
+    registry.models_dir = models_dir
+    current = lambda: registry.get('lead_scoring')  # noqa: E731
+    invalidations = module.lead_score_cache.stats()['invalidations']
+    steps = []
+
+    with Load(make_client, threads) as load:
+        time.sleep(settle)
+
+        # 1) نسخة جديدة عبر الـ endpoint
+        start = time.perf_counter()
+        response = client.post('/api/models/reload', json={'model': 'lead_scoring', 'version': 'v2'})
+        assert response.status_code == 202, response.text
+        wait_for(lambda: current().version == 'v2')
+        steps.append(('reload v2 (endpoint)', time.perf_counter() - start, current().version))
+        time.sleep(settle)
+
+        # 2) نسخة تالفة: التحميل يفشل والنسخة الفعالة لا تتغير
+        start = time.perf_counter()
+        response = client.post('/api/models/reload', json={'model': 'lead_scoring', 'version': 'v0-broken'})
+        assert response.status_code == 202, response.text
+        wait_for(lambda: registry.status()['lead_scoring']['reload']['state'] == 'failed')
+        assert current().version == 'v2'
+        steps.append(('reload v0-broken (rejected)', time.perf_counter() - start, current().version))
+        time.sleep(settle)
+
+        # 3) النموذجان الآخران معاً
+        generations = {name: registry.get(name).generation for name in registry.specs}
+        start = time.perf_counter()
+        assert client.post('/api/models/reload', json={'model': 'sales_forecasting'}).status_code == 202
+        assert client.post('/api/models/reload', json={'model': 'customer_segmentation'}).status_code == 202
+        wait_for(lambda: all(registry.get(name).generation != generations[name]
+                             for name in ('sales_forecasting', 'customer_segmentation')))
+        steps.append(('reload forecast + segments', time.perf_counter() - start, current().version))
+        time.sleep(settle)
+
+        # 4) ملف CURRENT + مراقبة الملفات
+        start = time.perf_counter()
+        with open(os.path.join(models_dir, 'Lead_scoring', 'CURRENT'), 'w') as f:
+            f.write('base\n')
+        registry.watch(0.1)
+        wait_for(lambda: current().version == 'base')
+        steps.append(('CURRENT=base (watch)', time.perf_counter() - start, current().version))
+        time.sleep(settle)
+
+    for label, seconds, version in steps:
+        print(f'  {label:30s} {seconds * 1000:8.1f} ms  -> {version}')
+    invalidated = module.lead_score_cache.stats()['invalidations'] - invalidations
+    print(f'  requests {load.count}, failed {len(load.failures)}, max latency {load.max_ms:.1f} ms, '
+          f'score cache invalidations +{invalidated}')
+    assert not load.failures, load.failures[:10]
+    assert invalidated == 2, invalidated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--settle', type=float, default=0.5, help='ثوانٍ من الضغط بين كل خطوة')
+    parser.add_argument('--apps', nargs='+', default=['flask', 'fastapi'])
+    args = parser.parse_args()
+
+    for app_name in args.apps:
+        models_dir = make_models_dir()
+        try:
+            print(f"{app_name} (INFERENCE_EXECUTOR={os.environ.get('INFERENCE_EXECUTOR', 'thread')})")
+            if app_name == 'flask':
+                import app as module
+                run_scenario(module, module.app.test_client(), module.app.test_client,
+                             models_dir, args.threads, args.settle)
+            else:
+                import app_fastapi as module
+                with TestClient(module.app) as client:
+                    module.model_loader.wait_all()
+                    run_scenario(module, client, lambda: client, models_dir, args.threads, args.settle)
+        finally:
+            shutil.rmtree(models_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
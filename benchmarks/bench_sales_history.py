@@ -0,0 +1,93 @@
+"""
+Benchmark: sales history - ingest cost per day and rolling-window forecasts vs a per-day DataFrame loop
+زمن إضافة يوم لتاريخ المبيعات، والتنبؤ التكراري بنوافذ 7 و 30 يوماً مقابل حلقة تبني DataFrame لكل يوم
+
+python benchmarks/bench_sales_history.py --history 730 --days 30 90 365 --grid 10
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from ml_engine.forecasting import FEATURE_COLUMNS, forecast_sales, forecast_scenarios  # noqa: E402
+from ml_engine.inference import make_backend  # noqa: E402
+from ml_engine.sales_history import SalesHistory, day_labels  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def best_ms(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def dataframe_forecast(model, series, days, avg_transactions):
+    """الطريقة المباشرة: النوافذ بـ pandas و DataFrame لكل يوم، والتنبؤ يُضاف للسلسلة"""
+    series = series.copy()
+    predictions = []
+    for date in pd.date_range(series.index[-1] + pd.Timedelta(days=1), periods=days):
+        row = {
+            'year': date.year, 'month': date.month, 'day': date.day, 'week': date.isocalendar()[1],
+            'weekday': date.weekday(), 'quarter': date.quarter, 'transaction_count': avg_transactions,
+            'sales_7day_avg': series.iloc[-7:].mean(), 'sales_30day_avg': series.iloc[-30:].mean()
+        }
+        value = round(max(float(model.predict(pd.DataFrame([row])[FEATURE_COLUMNS].astype(np.float32))[0]), 0), 2)
+        series[date] = value
+        predictions.append(value)
+    return np.array(predictions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--history', type=int, default=730)
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 90, 365])
+    parser.add_argument('--grid', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    model = joblib.load(os.path.join(ROOT_DIR, 'Sales_forecasting/sales_forecasting_model.pkl'))
+    backend = make_backend(model)
+    rng = np.random.default_rng(0)
+    today = int(pd.Timestamp.now().normalize().to_datetime64().astype('datetime64[D]').astype(np.int64))
+    days = np.arange(today - args.history + 1, today + 1)
+    sales = rng.uniform(2e5, 9e5, len(days)).round(2)
+    records = [{'date': label, 'sales': value} for label, value in zip(day_labels(days), sales.tolist())]
+
+    history = SalesHistory()
+    start = time.perf_counter()
+    for record in records:
+        history.ingest([record])
+    per_day = (time.perf_counter() - start) / len(records) * 1e6
+    snapshot = history.snapshot()
+    print(f'sales_forecasting ({backend.name}), history {args.history} days')
+    print(f'  ingest one day       {per_day:8.1f} µs   snapshot {best_ms(history.snapshot, 20) * 1000:7.1f} µs')
+
+    series = pd.Series(sales, index=pd.DatetimeIndex(days.astype('datetime64[D]')))
+    first = day_labels([today + 1])[0]
+    for n in args.days:
+        last = day_labels([today + n])[0]
+        expected = dataframe_forecast(model, series, n, 5)
+        assert np.array_equal(forecast_sales(backend, first, last, 5, history=snapshot)[1], expected)
+        loop = best_ms(lambda: dataframe_forecast(model, series, n, 5), 1)
+        recursive = best_ms(lambda: forecast_sales(backend, first, last, 5, history=snapshot), args.repeat)
+        plain = best_ms(lambda: forecast_sales(backend, first, last, 5), args.repeat)
+        scenarios = [(first, last, float(tx)) for tx in np.linspace(1, 50, args.grid)]
+        grid = best_ms(lambda: forecast_scenarios(backend, scenarios, history=snapshot), args.repeat)
+        print(f'  {n:4d} days   DataFrame loop {loop:8.1f} ms   recursive {recursive:7.2f} ms ({loop / recursive:5.1f}x)'
+              f'   without history {plain:6.2f} ms   {args.grid} scenarios {grid:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
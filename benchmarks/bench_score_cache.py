@@ -0,0 +1,91 @@
+"""
+Benchmark: lead score cache - cold vs repeated batches
+زمن batch-lead-scoring بدون كاش، مع كاش فارغ، ومع إعادة إرسال نفس العملاء (بعضهم تغير)
+
+python benchmarks/bench_score_cache.py --rows 10000 --changed 0 0.1 0.5
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.bench_batch_lead_scoring import make_leads  # noqa: E402
+from ml_engine.bulk_scoring import score_rows  # noqa: E402
+from ml_engine.encoders import CategoricalEncoder  # noqa: E402
+from ml_engine.inference import make_backend  # noqa: E402
+from ml_engine.score_cache import ScoreCache  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def best_ms(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def changed_leads(leads, fraction, seed=1):
+    """نسخة من الدفعة مع تغيير الميزانية لنسبة من العملاء"""
+    rng = np.random.default_rng(seed)
+    changed = [dict(lead) for lead in leads]
+    for i in rng.choice(len(leads), int(len(leads) * fraction), replace=False):
+        changed[i]['budget'] = int(rng.integers(0, 5_000_000))
+    return changed
+
+
+def primed_cache(run, leads):
+    """كاش جديد يحوي درجات الدفعة الأصلية"""
+    cache = ScoreCache()
+    run(leads, cache)
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--changed', type=float, nargs='+', default=[0, 0.1, 0.5])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    lead_dir = os.path.join(ROOT_DIR, 'Lead_scoring')
+    backend = make_backend(joblib.load(os.path.join(lead_dir, 'lead_scoring_model.pkl')))
+    source_encoder = CategoricalEncoder.from_label_encoder(joblib.load(os.path.join(lead_dir, 'le_source.pkl')), 'source')
+    agent_encoder = CategoricalEncoder.from_label_encoder(joblib.load(os.path.join(lead_dir, 'le_agent.pkl')), 'agent')
+    leads = make_leads(args.rows)
+
+    def run(rows, cache=None):
+        return score_rows(backend, rows, source_encoder, agent_encoder, cache=cache, endpoint='bench')
+
+    uncached = best_ms(lambda: run(leads), args.repeat)
+    cold = best_ms(lambda: run(leads, ScoreCache()), args.repeat)
+    print(f'{args.rows} leads ({backend.name})')
+    print(f'  no cache          {uncached:8.1f} ms')
+    print(f'  empty cache       {cold:8.1f} ms')
+
+    for fraction in args.changed:
+        batch = changed_leads(leads, fraction)
+        assert run(batch, primed_cache(run, leads)) == run(batch), 'cached results differ'
+        best, ratio = float('inf'), 0
+        for _ in range(args.repeat):
+            # كاش يحوي الدفعة الأصلية فقط، ثم إعادة إرسالها بعد التغيير
+            cache = primed_cache(run, leads)
+            start = time.perf_counter()
+            run(batch, cache)
+            best = min(best, (time.perf_counter() - start) * 1000)
+            counters = cache.stats()['endpoints']['bench']
+            ratio = counters['hits'] / len(batch)
+        print(f'  resend {fraction:4.0%} changed {best:8.1f} ms   hit ratio {ratio:.2f}   x{uncached / best:4.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: precomputed score store - build/refresh/roll time and batch latency with and without the store
+زمن بناء المخزن وتحديثه ويوم جديد، وزمن batch-lead-scoring بدون مخزن / بنفس الميزات / بالمعرّف فقط
+
+python benchmarks/bench_score_store.py --leads 200000 --batch 1 100 10000 --changed 0.01
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.bench_batch_lead_scoring import make_leads  # noqa: E402
+from ml_engine import score_store  # noqa: E402
+from ml_engine.bulk_scoring import score_rows  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def best_ms(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return value, (time.perf_counter() - start) * 1000
+
+
+def write_ndjson(path, leads):
+    with open(path, 'w', encoding='utf-8') as f:
+        for lead in leads:
+            f.write(json.dumps(lead, ensure_ascii=False) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--leads', type=int, default=200000)
+    parser.add_argument('--batch', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--changed', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    version = score_store._load_lead_scoring()
+    leads = make_leads(args.leads)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, 'store')
+        write_ndjson(os.path.join(tmp, 'leads.ndjson'), leads)
+        # المخزن مبني أمس ثم roll لليوم - كما في job يومي
+        yesterday = pd.Timestamp.now() - pd.Timedelta(days=1)
+        summary, build_ms = timed(score_store.build_store, store_path, version, [os.path.join(tmp, 'leads.ndjson')],
+                                  None, yesterday)
+        print(f"{summary['rows']} leads ({version.backend.name})")
+        print(f'  build             {build_ms:9.1f} ms')
+
+        changed = [dict(lead, budget=lead['id'] * 7) for lead in leads[:int(len(leads) * args.changed)]]
+        write_ndjson(os.path.join(tmp, 'changed.ndjson'), changed)
+        summary, refresh_ms = timed(score_store.refresh_store, store_path, version,
+                                    [os.path.join(tmp, 'changed.ndjson')], None, yesterday)
+        print(f"  refresh {args.changed:4.0%}     {refresh_ms:9.1f} ms   rescored {summary['rescored']}")
+        summary, roll_ms = timed(score_store.roll_store, store_path, version)
+        print(f"  roll (+1 day)     {roll_ms:9.1f} ms   rescored {summary['rescored']}")
+
+        store = score_store.ScoreStore(store_path)
+        store.bind(version)
+        current = changed + leads[len(changed):]
+        rng = np.random.default_rng(1)
+        for size in args.batch:
+            batch = [current[i] for i in rng.choice(len(current), size, replace=False)]
+            ids_only = [{'id': lead['id'], 'name': lead['name']} for lead in batch]
+
+            def run(rows, store=None):
+                return score_rows(version.backend, rows, version.source_encoder, version.agent_encoder, store=store)
+
+            assert run(batch, store) == run(batch), 'store results differ'
+            live = best_ms(lambda: run(batch), args.repeat)
+            full = best_ms(lambda: run(batch, store), args.repeat)
+            by_id = best_ms(lambda: run(ids_only, store), args.repeat)
+            print(f'  batch {size:6d}      live {live:8.2f} ms   store {full:8.2f} ms   id only {by_id:8.2f} ms')
+
+        keys = score_store.id_keys([lead['id'] for lead in current[:10000]])
+        generation = store.generation()
+        lookup = best_ms(lambda: generation.rows(keys), args.repeat)
+        print(f'  lookup 10000 ids  {lookup:9.2f} ms   ({lookup / 10:.2f} µs/id)')
+
+
+if __name__ == '__main__':
+    main()
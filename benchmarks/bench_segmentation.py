@@ -0,0 +1,64 @@
+"""
+Benchmark: customer segmentation - fused scaler/KMeans vs scaler.transform + predict
+مقارنة عدد العملاء في الثانية والتحقق من تطابق الأقسام والمسافات
+
+python benchmarks/bench_segmentation.py --sizes 1 1000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from ml_engine.segmentation import FusedSegmenter, PipelineSegmenter  # noqa: E402
+
+warnings.filterwarnings('ignore')
+
+
+def make_customers(scaler, n, seed=0):
+    """بيانات RFM اصطناعية موجبة حول متوسطات التدريب"""
+    rng = np.random.default_rng(seed)
+    return rng.lognormal(mean=np.log(scaler.mean_ + 1), sigma=2, size=(n, len(scaler.mean_)))
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 100000, 1000000])
+    args = parser.parse_args()
+
+    seg_dir = os.path.join(ROOT_DIR, 'Customer_segmentation')
+    model = joblib.load(os.path.join(seg_dir, 'customer_segmentation_model.pkl'))
+    scaler = joblib.load(os.path.join(seg_dir, 'customer_segmentation_scaler.pkl'))
+    fused = FusedSegmenter(model, scaler)
+    pipeline = PipelineSegmenter(model, scaler)
+
+    for n in args.sizes:
+        features = make_customers(scaler, n)
+        repeat = 3 if n >= 100000 else 50
+        fused_seconds, (fused_labels, fused_distances) = timed(lambda: fused.assign(features, True), repeat)
+        pipeline_seconds, (labels, distances) = timed(lambda: pipeline.assign(features, True), repeat)
+
+        assert np.array_equal(fused_labels, labels), 'segments differ'
+        max_error = float(np.abs(fused_distances - distances).max())
+        print(f'{n:8d} customers  fused {fused_seconds * 1000:9.2f} ms ({n / fused_seconds:12.0f}/s)  '
+              f'sklearn {pipeline_seconds * 1000:9.2f} ms ({n / pipeline_seconds:12.0f}/s)  '
+              f'x{pipeline_seconds / fused_seconds:5.1f}  max |Δdistance| {max_error:.1e}')
+
+
+if __name__ == '__main__':
+    main()
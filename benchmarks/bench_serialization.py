@@ -0,0 +1,113 @@
+"""
+Benchmark: stdlib json vs orjson for the large responses
+مقارنة وقت تحويل الاستجابات الكبيرة إلى JSON (10 آلاف نتيجة، 10 آلاف يوم توقع) ووقت CPU لكل endpoint
+
+python benchmarks/bench_serialization.py --rows 10000 --apps flask fastapi
+كل قيمة لـ JSON_SERIALIZER تعمل في عملية منفصلة (المكتبة تُختار عند الاستيراد).
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault('MODEL_LOADING', 'eager')
+warnings.filterwarnings('ignore')
+
+from benchmarks.bench_columnar import customer_payloads, forecast_payload, lead_payloads, make_client  # noqa: E402
+
+SERIALIZERS = ('json', 'orjson')
+
+
+def best_ms(fn, repeat):
+    fn()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def sample_responses(n):
+    """نفس شكل استجابات batch-lead-scoring و sales-forecast"""
+    from ml_engine.forecasting import forecast_response
+    from ml_engine.lead_scoring import lead_results
+
+    rng = np.random.default_rng(0)
+    scores = rng.uniform(0, 100, n)
+    errors = [None if i % 50 else 'budget must be a finite number' for i in range(n)]
+    leads = {'success': True, 'results': lead_results(list(range(n)), [f'lead-{i}' for i in range(n)], scores, errors)}
+    dates = pd.date_range('2025-01-01', periods=n, freq='D')
+    forecast = forecast_response(dates, rng.uniform(0, 5000, n).astype(np.float32).astype(np.float64))
+    return {'batch-lead-scoring': leads, 'sales-forecast': forecast}
+
+
+def run_serializers(args):
+    """dumps فقط: json.dumps القياسي (كما في jsonify/JSONResponse سابقاً) مقابل ml_engine.serialization"""
+    from ml_engine.serialization import JSON_SERIALIZER, dumps
+
+    print(f'\n[serializer] {args.rows} rows (JSON_SERIALIZER={JSON_SERIALIZER})')
+    for name, response in sample_responses(args.rows).items():
+        stdlib = best_ms(lambda: json.dumps(response).encode('utf-8'), args.repeat)
+        fast = best_ms(lambda: dumps(response), args.repeat)
+        assert json.loads(dumps(response)) == json.loads(json.dumps(response))
+        print(f'  {name:22s} json.dumps {stdlib:7.1f} ms   dumps {fast:7.1f} ms   x{stdlib / fast:5.1f}')
+
+
+def run_endpoints(args):
+    from benchmarks.bench_columnar import measure
+    from ml_engine.serialization import JSON_SERIALIZER
+
+    headers = {'Content-Type': 'application/json'}
+    lead_json, _ = lead_payloads(args.rows)
+    customer_json, _ = customer_payloads(args.rows)
+    cases = [
+        ('/api/batch-lead-scoring', lead_json),
+        ('/api/batch-customer-segment', customer_json),
+        ('/api/sales-forecast', forecast_payload(args.rows)),
+    ]
+    for app_name in args.apps:
+        print(f'\n[{app_name}] {args.rows} rows (JSON_SERIALIZER={JSON_SERIALIZER})')
+        with contextlib.ExitStack() as stack:
+            post = make_client(app_name, stack)
+            for path, body in cases:
+                cpu_ms, response = measure(post, path, body, headers, args.repeat)
+                payload = json.loads(response)
+                rows = len(payload.get('results', payload.get('predictions', [])))
+                assert rows == args.rows, f'{path}: {rows} rows'
+                print(f'  {path:30s} response {len(response) / 1024:8.1f} KiB  CPU {cpu_ms:8.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--apps', nargs='+', default=['flask', 'fastapi'])
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_endpoints(args)
+        return
+
+    run_serializers(args)
+    for serializer in SERIALIZERS:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', '--rows', str(args.rows),
+             '--repeat', str(args.repeat), '--apps', *args.apps],
+            env={**os.environ, 'JSON_SERIALIZER': serializer},
+            check=True
+        )
+
+
+if __name__ == '__main__':
+    main()
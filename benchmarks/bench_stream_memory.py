@@ -0,0 +1,173 @@
+"""
+Benchmark: peak server memory - streaming NDJSON/CSV endpoint vs JSON batch endpoint
+قياس أقصى RSS للسيرفر عند تقييم عدد كبير من العملاء: /api/batch-lead-scoring/stream مقابل /api/batch-lead-scoring
+
+python benchmarks/bench_stream_memory.py --sizes 10000 50000 200000 --apps fastapi flask
+"""
+import argparse
+import csv
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.bench_batch_lead_scoring import make_leads  # noqa: E402
+from benchmarks.load_test_event_loop import free_port  # noqa: E402
+
+CSV_FIELDS = ['id', 'name', 'source', 'agent', 'tags', 'createdAt', 'budget']
+
+
+def start_server(app, port):
+    env = dict(os.environ, MODEL_LOADING='eager', PYTHONWARNINGS='ignore')
+    if app == 'fastapi':
+        command = [sys.executable, '-m', 'uvicorn', 'app_fastapi:app', '--port', str(port), '--log-level', 'warning']
+    else:
+        command = ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}', '--workers', '1', '--timeout', '300']
+    return subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def server_pid(server, app):
+    """gunicorn: العملية التي تخدم الطلبات هي الـ worker وليس الـ master"""
+    if app == 'fastapi':
+        return server.pid
+    children = subprocess.run(['pgrep', '-P', str(server.pid)], capture_output=True, text=True).stdout.split()
+    return int(children[0])
+
+
+def peak_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def wait_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get('/api/health').json()['models_loaded']['lead_scoring']:
+                return
+        except (httpx.TransportError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('server did not become ready')
+
+
+def generate_leads(n, block=1000):
+    """العملاء يُولَّدون على أجزاء حتى لا يكون الملف كاملاً في ذاكرة العميل أيضاً"""
+    for start in range(0, n, block):
+        leads = make_leads(min(block, n - start), seed=start)
+        for i, lead in enumerate(leads):
+            lead['id'] = start + i
+        yield leads
+
+
+def ndjson_body(n):
+    for leads in generate_leads(n):
+        yield ''.join(json.dumps(lead, ensure_ascii=False) + '\n' for lead in leads).encode('utf-8')
+
+
+def csv_body(n):
+    yield (','.join(CSV_FIELDS) + '\r\n').encode('utf-8')
+    for leads in generate_leads(n):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for lead in leads:
+            writer.writerow([lead['id'], lead['name'], lead['source'], lead['agent'],
+                             '|'.join(lead['tags']), lead['createdAt'], lead['budget']])
+        yield buffer.getvalue().encode('utf-8')
+
+
+def duplex_post(port, path, content_type, body):
+    """POST بـ chunked encoding مع قراءة الاستجابة أثناء الرفع
+
+    السيرفر يتوقف عن القراءة عندما لا يقرأ العميل النتائج (backpressure)، لذلك العملاء
+    الذين يرسلون الجسم كاملاً قبل قراءة الاستجابة (مثل httpx المتزامن) يتوقفون مع الملفات الكبيرة.
+    """
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(
+        f'POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: {content_type}\r\n'
+        f'Accept: {content_type}\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n'.encode('ascii')
+    )
+
+    def write():
+        for part in body:
+            sock.sendall(b'%x\r\n' % len(part) + part + b'\r\n')
+        sock.sendall(b'0\r\n\r\n')
+
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    response = http.client.HTTPResponse(sock, method='POST')
+    response.begin()
+    if response.status != 200:
+        raise RuntimeError(f'HTTP {response.status}: {response.read()[:200]!r}')
+    lines = sum(1 for _ in response)
+    writer.join()
+    sock.close()
+    return lines
+
+
+def run_stream(port, n, fmt):
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    body = csv_body(n) if fmt == 'csv' else ndjson_body(n)
+    lines = duplex_post(port, '/api/batch-lead-scoring/stream', content_type, body)
+    return lines - (1 if fmt == 'csv' else 0)
+
+
+def run_batch(client, n):
+    leads = [lead for block in generate_leads(n) for lead in block]
+    for lead in leads:
+        # FastAPI يتحقق من budget كرقم
+        if isinstance(lead['budget'], str):
+            lead['budget'] = 0
+    response = client.post('/api/batch-lead-scoring', json={'leads': leads})
+    response.raise_for_status()
+    return len(response.json()['results'])
+
+
+def measure(app, mode, n):
+    port = free_port()
+    server = start_server(app, port)
+    try:
+        with httpx.Client(base_url=f'http://127.0.0.1:{port}', timeout=600) as client:
+            wait_ready(client)
+            pid = server_pid(server, app)
+            idle = peak_rss_mb(pid)
+            start = time.perf_counter()
+            rows = run_batch(client, n) if mode == 'json-batch' else run_stream(port, n, mode)
+            seconds = time.perf_counter() - start
+            peak = peak_rss_mb(pid)
+        assert rows == n, f'expected {n} results, got {rows}'
+        print(f'{app:8s} {mode:10s} {n:8d} leads  {seconds:7.2f} s  {n / seconds:9.0f} leads/s  '
+              f'peak RSS {peak:7.1f} MB (idle {idle:6.1f} MB, +{peak - idle:6.1f} MB)')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 200000])
+    parser.add_argument('--apps', nargs='+', default=['fastapi', 'flask'])
+    parser.add_argument('--modes', nargs='+', default=['ndjson', 'csv', 'json-batch'])
+    args = parser.parse_args()
+
+    for app in args.apps:
+        for mode in args.modes:
+            for n in args.sizes:
+                measure(app, mode, n)
+
+
+if __name__ == '__main__':
+    main()
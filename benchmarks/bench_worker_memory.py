@@ -0,0 +1,113 @@
+"""
+Benchmark: memory per gunicorn worker with and without MODEL_PRELOAD
+قياس ذاكرة كل عامل: USS (صفحات خاصة بالعامل فقط) و PSS (الصفحات المشتركة مقسومة على من يتشاركها)
+
+python benchmarks/bench_worker_memory.py --workers 4 --apps flask fastapi
+يتطلب Linux (/proc/<pid>/smaps_rollup) و gunicorn.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.load_test_event_loop import free_port  # noqa: E402
+
+APPS = {
+    'flask': ['app:app'],
+    'fastapi': ['app_fastapi:app', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+LEAD = {'source': 'Facebook', 'agent': 'Ahmed', 'tags': ['VIP'], 'createdAt': '2025-01-01', 'budget': 250000}
+
+
+def memory_kib(pid):
+    """Rss و Pss و USS (Private_Clean + Private_Dirty) بالـ KiB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': values['Rss'],
+        'pss': values['Pss'],
+        'uss': values['Private_Clean'] + values['Private_Dirty']
+    }
+
+
+def worker_pids(master_pid):
+    with open(f'/proc/{master_pid}/task/{master_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def start_server(app_name, port, workers, preload):
+    env = dict(
+        os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), MODEL_PRELOAD='1' if preload else '0',
+        MODEL_LOADING='eager', PYTHONWARNINGS='ignore'
+    )
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *APPS[app_name], '-c', os.path.join(ROOT_DIR, 'gunicorn.conf.py')],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def warm_up(port, workers, timeout=120):
+    """انتظار جاهزية كل العمال ثم طلبات على كل endpoint حتى تُلمس النماذج في كل عامل"""
+    deadline = time.monotonic() + timeout
+    with httpx.Client(base_url=f'http://127.0.0.1:{port}', timeout=30) as client:
+        while True:
+            try:
+                if all(client.get('/api/health').json()['models_loaded'].values()):
+                    break
+            except (httpx.HTTPError, ValueError, KeyError):
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError('server did not become ready')
+            time.sleep(0.2)
+        for _ in range(workers * 10):
+            client.post('/api/lead-scoring', json={'lead': LEAD})
+            client.post('/api/batch-lead-scoring', json={'leads': [LEAD] * 200})
+            client.post('/api/sales-forecast', json={'avg_transactions': 5})
+            client.post('/api/customer-segment', json={'customer': {'recency': 10}})
+
+
+def measure(app_name, workers, preload):
+    port = free_port()
+    server = start_server(app_name, port, workers, preload)
+    try:
+        warm_up(port, workers)
+        time.sleep(0.5)
+        master = memory_kib(server.pid)
+        children = [memory_kib(pid) for pid in worker_pids(server.pid)]
+    finally:
+        server.terminate()
+        server.wait(30)
+    return master, children
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--apps', nargs='+', default=['flask', 'fastapi'])
+    args = parser.parse_args()
+
+    print(f"{'app':8s} {'preload':8s} {'workers':>7s} {'worker USS MiB':>15s} {'worker PSS MiB':>15s} "
+          f"{'total PSS MiB':>14s} {'sum RSS MiB':>12s}")
+    for app_name in args.apps:
+        for preload in (False, True):
+            master, children = measure(app_name, args.workers, preload)
+            uss = sum(c['uss'] for c in children) / len(children) / 1024
+            pss = sum(c['pss'] for c in children) / len(children) / 1024
+            total_pss = (master['pss'] + sum(c['pss'] for c in children)) / 1024
+            total_rss = (master['rss'] + sum(c['rss'] for c in children)) / 1024
+            print(f'{app_name:8s} {str(preload):8s} {len(children):7d} {uss:15.1f} {pss:15.1f} '
+                  f'{total_pss:14.1f} {total_rss:12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+"""
+Load / regression suite: throughput and latency for every endpoint on Flask (gunicorn) and FastAPI (uvicorn)
+تشغيل كل تطبيق كما في الإنتاج (Procfile) وقياس:
+
+    cold start      من بدء العملية حتى أول استجابة من /api/health وحتى تحميل كل النماذج
+    لكل سيناريو     عدد الطلبات والصفوف في الثانية، p50/p95/p99/max لكل concurrency و batch size
+    الذاكرة         RSS للعملية وكل عمالها بعد الجاهزية، وبعد الضغط، وأقصى RSS (VmHWM)
+
+البيانات اصطناعية لكن متنوعة (مجموعة من --distinct جسم مختلف لكل سيناريو) حتى لا يقيس الاختبار الكاش فقط.
+النتائج في ملف JSON، و --baseline يقارنها بنتائج سابقة ويخرج بـ exit code 1 عند تراجع الأداء:
+
+    python benchmarks/load_suite.py --output results/base.json
+    python benchmarks/load_suite.py --output results/new.json --baseline results/base.json
+    python benchmarks/load_suite.py --compare results/new.json --baseline results/base.json   # بدون تشغيل
+    python benchmarks/load_suite.py --apps fastapi --scenarios batch-lead-scoring --batch-sizes 1000 --concurrency 8
+
+العميل والخادم على نفس الجهاز: قارن النتائج على نفس الجهاز فقط.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.bench_batch_lead_scoring import make_leads  # noqa: E402
+from benchmarks.load_test_event_loop import free_port  # noqa: E402
+
+SERVERS = {
+    'flask': lambda port: [sys.executable, '-m', 'gunicorn', 'app:app', '-c', os.path.join(ROOT_DIR, 'gunicorn.conf.py')],
+    'fastapi': lambda port: [sys.executable, '-m', 'uvicorn', 'app_fastapi:app', '--host', '127.0.0.1',
+                             '--port', str(port), '--log-level', 'warning'],
+}
+
+# الحدود الافتراضية للتراجع المسموح قبل الفشل (نسبة من القيمة السابقة)
+THRESHOLDS = {'latency': 0.25, 'throughput': 0.20, 'rss': 0.20, 'cold_start': 0.50}
+
+
+# === البيانات الاصطناعية ===
+
+def lead_pool(distinct, seed):
+    """عملاء صالحون فقط: FastAPI يرفض الدفعة كاملة (422) عند ميزانية غير رقمية"""
+    leads = make_leads(distinct, seed)
+    return [dict(lead, budget=0 if isinstance(lead['budget'], str) else lead['budget']) for lead in leads]
+
+
+def customer_pool(distinct, seed):
+    rng = random.Random(seed)
+    return [{
+        'id': i,
+        'recency': rng.randint(0, 365),
+        'frequency': rng.randint(1, 40),
+        'monetary': round(rng.lognormvariate(9, 1.5), 2),
+        'lead_count': rng.randint(1, 20),
+        'avg_budget': round(rng.lognormvariate(11, 1), 2)
+    } for i in range(distinct)]
+
+
+def forecast_body(rng, days):
+    start = datetime(2025, 1, 1) + timedelta(days=rng.randint(0, 365))
+    return {
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': (start + timedelta(days=days - 1)).strftime('%Y-%m-%d'),
+        'avg_transactions': rng.randint(1, 20)
+    }
+
+
+def _sample(rng, pool, k):
+    return [pool[rng.randrange(len(pool))] for _ in range(k)]
+
+
+# سيناريو -> (المسار، batched، دالة تبني جسم الطلب من (rng، leads، customers، batch size))
+SCENARIOS = {
+    'lead-scoring': ('/api/lead-scoring', False, lambda rng, leads, customers, n: {'lead': rng.choice(leads)}),
+    'batch-lead-scoring': ('/api/batch-lead-scoring', True,
+                           lambda rng, leads, customers, n: {'leads': _sample(rng, leads, n)}),
+    'sales-forecast': ('/api/sales-forecast', False, lambda rng, leads, customers, n: forecast_body(rng, 30)),
+    'customer-segment': ('/api/customer-segment', False,
+                         lambda rng, leads, customers, n: {'customer': rng.choice(customers)}),
+    'batch-customer-segment': ('/api/batch-customer-segment', True,
+                               lambda rng, leads, customers, n: {'customers': _sample(rng, customers, n)}),
+}
+
+
+def make_bodies(scenario, batch_size, distinct, seed=42):
+    """أجسام JSON جاهزة كـ bytes (التحويل خارج زمن القياس)"""
+    rng = random.Random(seed)
+    leads, customers = lead_pool(max(distinct, batch_size), seed), customer_pool(max(distinct, batch_size), seed)
+    build = SCENARIOS[scenario][2]
+    return [json.dumps(build(rng, leads, customers, batch_size)).encode('utf-8') for _ in range(distinct)]
+
+
+# === الخادم: cold start و RSS ===
+
+def process_tree(pid):
+    """العملية وكل أبنائها (عمال gunicorn، عمليات process pool)"""
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        try:
+            with open(f'/proc/{current}/task/{current}/children') as f:
+                stack.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def memory_mib(pid):
+    """(مجموع VmRSS، مجموع VmHWM) بالـ MiB لكل العمليات - None خارج Linux"""
+    totals = {'VmRSS': 0, 'VmHWM': 0}
+    try:
+        for child in process_tree(pid):
+            with open(f'/proc/{child}/status') as f:
+                for line in f:
+                    key = line.split(':', 1)[0]
+                    if key in totals:
+                        totals[key] += int(line.split()[1])
+    except (OSError, ValueError):
+        return None, None
+    return round(totals['VmRSS'] / 1024, 1), round(totals['VmHWM'] / 1024, 1)
+
+
+def start_server(app_name, port, workers):
+    env = dict(os.environ, PORT=str(port), PYTHONWARNINGS='ignore')
+    if workers:
+        env['WEB_CONCURRENCY'] = str(workers)
+    return subprocess.Popen(SERVERS[app_name](port), cwd=ROOT_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(port, started, timeout):
+    """(ثوانٍ حتى أول استجابة، ثوانٍ حتى تحميل كل النماذج)"""
+    listening = None
+    deadline = started + timeout
+    with httpx.Client(base_url=f'http://127.0.0.1:{port}', timeout=10) as client:
+        while time.perf_counter() < deadline:
+            try:
+                health = client.get('/api/health').json()
+                listening = listening or time.perf_counter() - started
+                if all(health['models_loaded'].values()):
+                    return round(listening, 3), round(time.perf_counter() - started, 3)
+            except (httpx.HTTPError, ValueError, KeyError):
+                pass
+            time.sleep(0.05)
+    raise RuntimeError('server did not become ready')
+
+
+# === الضغط ===
+
+async def run_load(client, path, bodies, concurrency, duration, warmup):
+    """concurrency عميل متزامن (closed loop) لمدة duration ثانية - (زمن كل طلب ناجح، عدد الأخطاء، المدة)"""
+    headers = {'Content-Type': 'application/json'}
+    for body in bodies[:warmup]:
+        await client.post(path, content=body, headers=headers)
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                r = await client.post(path, content=bodies[i % len(bodies)], headers=headers)
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            (latencies if ok else errors).append(time.perf_counter() - start)
+            i += concurrency
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(k) for k in range(concurrency)))
+    return np.array(latencies), len(errors), time.perf_counter() - started
+
+
+def summarize(app_name, scenario, batch_size, concurrency, latencies, errors, elapsed):
+    ms = latencies * 1000 if len(latencies) else np.zeros(1)
+    return {
+        'app': app_name,
+        'scenario': scenario,
+        'batch_size': batch_size,
+        'concurrency': concurrency,
+        'requests': int(len(latencies)),
+        'errors': errors,
+        'duration_s': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 2),
+        'rows_per_s': round(len(latencies) * batch_size / elapsed, 1),
+        'latency_ms': {
+            'mean': round(float(ms.mean()), 3),
+            'p50': round(float(np.percentile(ms, 50)), 3),
+            'p95': round(float(np.percentile(ms, 95)), 3),
+            'p99': round(float(np.percentile(ms, 99)), 3),
+            'max': round(float(ms.max()), 3)
+        }
+    }
+
+
+async def run_scenarios(app_name, port, args):
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=args.timeout, limits=limits) as client:
+        for scenario in args.scenarios:
+            path, batched = SCENARIOS[scenario][:2]
+            for batch_size in (args.batch_sizes if batched else [1]):
+                bodies = make_bodies(scenario, batch_size, args.distinct)
+                for concurrency in args.concurrency:
+                    latencies, errors, elapsed = await run_load(
+                        client, path, bodies, concurrency, args.duration, args.warmup
+                    )
+                    result = summarize(app_name, scenario, batch_size, concurrency, latencies, errors, elapsed)
+                    results.append(result)
+                    latency = result['latency_ms']
+                    print(f"{app_name:8s} {scenario:24s} {batch_size:>6d} {concurrency:>4d} {result['rps']:>9.1f} "
+                          f"{result['rows_per_s']:>11.0f} {latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+                          f"{latency['p99']:>8.2f} {errors:>6d}", flush=True)
+    return results
+
+
+def run_app(app_name, args):
+    port = free_port()
+    started = time.perf_counter()
+    server = start_server(app_name, port, args.workers)
+    try:
+        listening, ready = wait_ready(port, started, args.ready_timeout)
+        time.sleep(0.5)
+        rss_ready, _ = memory_mib(server.pid)
+        results = asyncio.run(run_scenarios(app_name, port, args))
+        rss_loaded, rss_peak = memory_mib(server.pid)
+    finally:
+        server.terminate()
+        server.wait(30)
+    server_info = {
+        'cold_start_listen_s': listening,
+        'cold_start_ready_s': ready,
+        'rss_ready_mib': rss_ready,
+        'rss_after_load_mib': rss_loaded,
+        'rss_peak_mib': rss_peak
+    }
+    print(f'{app_name:8s} cold start: listening {listening:.2f}s, models ready {ready:.2f}s | '
+          f'RSS ready {rss_ready} MiB, after load {rss_loaded} MiB, peak {rss_peak} MiB')
+    return server_info, results
+
+
+# === المقارنة مع نتائج سابقة ===
+
+def _key(result):
+    return result['app'], result['scenario'], result['batch_size'], result['concurrency']
+
+
+def _regressed(name, current, previous, tolerance, higher_is_worse=True):
+    if current is None or not previous:
+        return None
+    change = (current - previous) / previous
+    if (change if higher_is_worse else -change) > tolerance:
+        return f'{name}: {previous:g} -> {current:g} ({change:+.0%}, allowed {tolerance:.0%})'
+    return None
+
+
+def find_regressions(current, baseline, thresholds):
+    """قائمة رسائل لكل تراجع أكبر من الحد المسموح (وكل طلب فشل)"""
+    problems = []
+    previous = {_key(result): result for result in baseline['results']}
+    for result in current['results']:
+        label = '{} {} batch={} concurrency={}'.format(*_key(result))
+        if result['errors']:
+            problems.append(f"{label} - errors: {result['errors']} failed requests")
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        checks = [
+            _regressed('p95 ms', result['latency_ms']['p95'], before['latency_ms']['p95'], thresholds['latency']),
+            # p99 أكثر تذبذباً من p95: ضعف الحد
+            _regressed('p99 ms', result['latency_ms']['p99'], before['latency_ms']['p99'], thresholds['latency'] * 2),
+            _regressed('req/s', result['rps'], before['rps'], thresholds['throughput'], higher_is_worse=False),
+        ]
+        problems.extend(f'{label} - {check}' for check in checks if check)
+
+    for app_name, server in current['servers'].items():
+        before = baseline['servers'].get(app_name, {})
+        checks = [
+            _regressed('cold start s', server['cold_start_ready_s'], before.get('cold_start_ready_s'),
+                       thresholds['cold_start']),
+            _regressed('RSS MiB', server['rss_after_load_mib'], before.get('rss_after_load_mib'), thresholds['rss']),
+        ]
+        problems.extend(f'{app_name} - {check}' for check in checks if check)
+    return problems
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', nargs='+', default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[10, 100, 1000])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--duration', type=float, default=3.0, help='ثوانٍ لكل تركيبة')
+    parser.add_argument('--warmup', type=int, default=5, help='طلبات قبل القياس لكل تركيبة')
+    parser.add_argument('--distinct', type=int, default=256, help='عدد الأجسام المختلفة لكل سيناريو')
+    parser.add_argument('--workers', type=int, help='WEB_CONCURRENCY لـ gunicorn (الافتراضي من gunicorn.conf.py)')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--ready-timeout', type=float, default=180)
+    parser.add_argument('--output', help='ملف JSON للنتائج')
+    parser.add_argument('--baseline', help='نتائج سابقة للمقارنة (exit code 1 عند التراجع)')
+    parser.add_argument('--compare', help='مقارنة ملف نتائج موجود مع --baseline بدون تشغيل')
+    for name, default in THRESHOLDS.items():
+        parser.add_argument(f"--max-{name.replace('_', '-')}-regression", type=float, default=default)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare) as f:
+            current = json.load(f)
+    else:
+        current = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'env': {k: v for k, v in os.environ.items() if k in (
+                    'MODEL_LOADING', 'MODEL_PRELOAD', 'INFERENCE_EXECUTOR', 'INFERENCE_ENGINE', 'JSON_SERIALIZER'
+                )},
+                'args': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'compare')}
+            },
+            'servers': {},
+            'results': []
+        }
+        print(f"{'app':8s} {'scenario':24s} {'batch':>6s} {'conc':>4s} {'req/s':>9s} {'rows/s':>11s} "
+              f"{'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>6s}")
+        for app_name in args.apps:
+            current['servers'][app_name], results = run_app(app_name, args)
+            current['results'].extend(results)
+        if args.output:
+            os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+            with open(args.output, 'w') as f:
+                json.dump(current, f, indent=2)
+            print(f'results: {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        thresholds = {name: getattr(args, f'max_{name}_regression') for name in THRESHOLDS}
+        problems = find_regressions(current, baseline, thresholds)
+        if problems:
+            print(f'\n{len(problems)} performance regressions vs {args.baseline}:')
+            for problem in problems:
+                print(' ', problem)
+            sys.exit(1)
+        print(f'\nno regressions vs {args.baseline}')
+
+
+if __name__ == '__main__':
+    main()
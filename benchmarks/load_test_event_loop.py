@@ -0,0 +1,111 @@
+"""
+Load test: /api/health latency while a 10k-lead batch is being scored (FastAPI)
+قياس زمن /api/health أثناء معالجة دفعة كبيرة لكل وضع من أوضاع INFERENCE_EXECUTOR
+
+يشغّل uvicorn في عملية منفصلة لكل وضع:
+    python benchmarks/load_test_event_loop.py --leads 10000 --executors inline thread process
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.bench_batch_lead_scoring import make_leads  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(executor, port):
+    env = dict(os.environ, INFERENCE_EXECUTOR=executor, MODEL_LOADING='eager', PYTHONWARNINGS='ignore')
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app_fastapi:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            r = await client.get('/api/health')
+            models = r.json().get('models', {})
+            if models and all(m['state'] != 'loading' and m['state'] != 'pending' for m in models.values()):
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError('server did not become ready')
+
+
+async def ping(client, stop, interval):
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get('/api/health')
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return np.array(samples) * 1000
+
+
+def describe(samples):
+    return f'p50 {np.percentile(samples, 50):7.1f} ms  p99 {np.percentile(samples, 99):7.1f} ms  max {samples.max():7.1f} ms  (n={len(samples)})'
+
+
+async def run(executor, leads, rounds):
+    port = free_port()
+    server = start_server(executor, port)
+    try:
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=120) as client:
+            await wait_ready(client)
+            stop = asyncio.Event()
+            baseline_task = asyncio.create_task(ping(client, stop, 0.01))
+            await asyncio.sleep(1.0)
+            stop.set()
+            baseline = await baseline_task
+
+            stop = asyncio.Event()
+            during_task = asyncio.create_task(ping(client, stop, 0.01))
+            start = time.perf_counter()
+            for _ in range(rounds):
+                r = await client.post('/api/batch-lead-scoring', json={'leads': leads})
+                r.raise_for_status()
+            batch_seconds = (time.perf_counter() - start) / rounds
+            stop.set()
+            during = await during_task
+
+        print(f'\n[{executor}] batch of {len(leads)} leads: {batch_seconds * 1000:.0f} ms')
+        print(f'  /api/health idle:        {describe(baseline)}')
+        print(f'  /api/health during batch: {describe(during)}')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--leads', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--executors', nargs='+', default=['inline', 'thread'])
+    args = parser.parse_args()
+
+    # FastAPI يتحقق من budget كرقم - نستبعد الصفوف غير الصالحة من البيانات الاصطناعية
+    leads = [dict(lead, budget=0 if isinstance(lead['budget'], str) else lead['budget']) for lead in make_leads(args.leads)]
+    for executor in args.executors:
+        asyncio.run(run(executor, leads, args.rounds))
+
+
+if __name__ == '__main__':
+    main()
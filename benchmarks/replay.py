@@ -0,0 +1,300 @@
+"""
+Replay captured traffic (ml_engine.capture JSONL) against a local build - optionally two builds with response diffs
+إعادة تشغيل طلبات حقيقية مسجّلة بـ TRAFFIC_CAPTURE_FILE بنفس توزيع الـ endpoints:
+
+    --speed 1      بنفس التوقيت الأصلي (الفواصل بين الطلبات كما سُجّلت)
+    --speed 10     أسرع 10 مرات
+    --speed 0      بأقصى سرعة (مقيدة بـ --concurrency فقط)
+
+--concurrency هو أقصى عدد طلبات جارية؛ إذا امتلأ تتأخر الطلبات عن موعدها ويظهر ذلك في "schedule lag".
+مع --compare يُرسل كل طلب للنسختين معاً وتُقارن الحالة والجسم (JSON بتسامح --rtol للأرقام، NDJSON سطراً بسطر،
+وغير ذلك bytes) - لمقارنة build جديد أو نسخة نموذج جديدة مع الحالية على نفس الطلبات:
+
+    TRAFFIC_CAPTURE_FILE=traffic.jsonl gunicorn app:app               # التسجيل في الإنتاج
+    python benchmarks/replay.py traffic.jsonl --target http://127.0.0.1:5000 --speed 2
+    python benchmarks/replay.py traffic.jsonl --target http://127.0.0.1:8000 --compare http://127.0.0.1:8001 \\
+        --speed 0 --concurrency 16 --output replay.json --fail-on-diff
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+import numpy as np
+
+# استجابات تتغير في كل طلب (عدادات، أوقات) - لا تُقارن
+DIFF_EXCLUDED_PATHS = ('/api/health', '/api/models', '/metrics')
+DIFF_IGNORED_KEYS = ('timestamp',)
+
+
+def load_records(paths, include=None, exclude=(), limit=None):
+    """طلبات الالتقاط مرتبة بالوقت مع الجسم كـ bytes - (الطلبات، عدد الأسطر المتجاهلة)"""
+    records, skipped = [], 0
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    skipped += bool(line.strip())
+                    continue
+                if record.get('truncated') or record['path'] in exclude or (include and record['path'] not in include):
+                    skipped += 1
+                    continue
+                if 'body_b64' in record:
+                    record['content'] = base64.b64decode(record['body_b64'])
+                else:
+                    record['content'] = record.get('body', '').encode('utf-8')
+                records.append(record)
+    records.sort(key=lambda r: r['ts'])
+    return records[:limit] if limit else records, skipped
+
+
+# === مقارنة الاستجابات ===
+
+def decode_body(response):
+    content_type = response.headers.get('content-type', '')
+    try:
+        if 'ndjson' in content_type:
+            return [json.loads(line) for line in response.content.splitlines() if line.strip()]
+        if 'json' in content_type:
+            return response.json()
+    except ValueError:
+        pass
+    return response.content
+
+
+def first_difference(a, b, rtol, atol, ignored_keys, where='$'):
+    """أول اختلاف كنص ('$.results[3].lead_score: 41.2 != 44.0') أو None"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in sorted(set(a) | set(b), key=str):
+            if key in ignored_keys:
+                continue
+            if key not in a or key not in b:
+                return f"{where}.{key}: {'missing' if key not in a else 'present'} != {'missing' if key not in b else 'present'}"
+            difference = first_difference(a[key], b[key], rtol, atol, ignored_keys, f'{where}.{key}')
+            if difference:
+                return difference
+        return None
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return f'{where}: length {len(a)} != {len(b)}'
+        for i, (x, y) in enumerate(zip(a, b)):
+            difference = first_difference(x, y, rtol, atol, ignored_keys, f'{where}[{i}]')
+            if difference:
+                return difference
+        return None
+    if isinstance(a, bytes) and isinstance(b, bytes):
+        return None if a == b else f'{where}: binary bodies differ ({len(a)} vs {len(b)} bytes)'
+    numbers = (int, float)
+    if type(a) is not bool and type(b) is not bool and isinstance(a, numbers) and isinstance(b, numbers):
+        return None if math.isclose(a, b, rel_tol=rtol, abs_tol=atol) else f'{where}: {a!r} != {b!r}'
+    # True == 1 في Python - النوع نفسه يجب أن يطابق
+    if type(a) is not type(b) or a != b:
+        return f'{where}: {a!r} != {b!r}'
+    return None
+
+
+# === التشغيل ===
+
+class Stats:
+    """أزمنة وأخطاء لكل (هدف، endpoint) + الفروق بين الهدفين"""
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.latencies = {target: defaultdict(list) for target in targets}
+        self.errors = {target: defaultdict(int) for target in targets}
+        self.status_changed = {target: defaultdict(int) for target in targets}
+        self.captured = defaultdict(list)
+        self.lag = []
+        self.diffs = defaultdict(int)
+        self.compared = defaultdict(int)
+        self.diff_examples = []
+
+
+async def send(client, target, record, timeout):
+    url = target + record['path'] + (f"?{record['query']}" if record.get('query') else '')
+    start = time.perf_counter()
+    try:
+        response = await client.request(record['method'], url, content=record['content'] or None,
+                                        headers=record.get('headers', {}), timeout=timeout)
+    except httpx.HTTPError as e:
+        return None, time.perf_counter() - start, e
+    return response, time.perf_counter() - start, None
+
+
+async def replay_one(client, record, stats, args):
+    path = record['path']
+    stats.captured[path].append(record.get('duration_ms', 0))
+    outcomes = await asyncio.gather(*(send(client, target, record, args.timeout) for target in stats.targets))
+    for target, (response, seconds, error) in zip(stats.targets, outcomes):
+        if error is not None or response.status_code >= 500:
+            stats.errors[target][path] += 1
+            continue
+        stats.latencies[target][path].append(seconds)
+        if record.get('status') is not None and response.status_code != record['status']:
+            stats.status_changed[target][path] += 1
+
+    if len(outcomes) == 2 and path not in args.diff_exclude:
+        (a, _, error_a), (b, _, error_b) = outcomes
+        stats.compared[path] += 1
+        if error_a or error_b:
+            difference = f'transport error: {error_a or error_b!r}'
+        elif a.status_code != b.status_code:
+            difference = f'status {a.status_code} != {b.status_code}'
+        else:
+            difference = first_difference(decode_body(a), decode_body(b), args.rtol, args.atol, args.ignore_keys)
+        if difference:
+            stats.diffs[path] += 1
+            if len(stats.diff_examples) < args.max_examples:
+                stats.diff_examples.append({'ts': record['ts'], 'method': record['method'], 'path': path,
+                                            'difference': difference})
+
+
+async def replay(records, args):
+    """موعد كل طلب = (ts - أول ts) / speed؛ عند امتلاء --concurrency ينتظر الطلب ويُسجَّل تأخره"""
+    stats = Stats([args.target] + ([args.compare] if args.compare else []))
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    tasks = set()
+
+    async def run(record):
+        try:
+            await replay_one(client, record, stats, args)
+        finally:
+            semaphore.release()
+
+    async with httpx.AsyncClient(limits=limits) as client:
+        first = records[0]['ts']
+        started = time.perf_counter()
+        for record in records:
+            due = started + ((record['ts'] - first) / args.speed if args.speed > 0 else 0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await semaphore.acquire()
+            stats.lag.append(max(0.0, time.perf_counter() - due))
+            task = asyncio.create_task(run(record))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    return stats, elapsed
+
+
+# === التقرير ===
+
+def percentiles(values_ms):
+    values = np.asarray(values_ms, dtype=np.float64)
+    if not len(values):
+        return None
+    return {
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'max': round(float(values.max()), 3)
+    }
+
+
+def report(records, skipped, stats, elapsed, args):
+    paths = sorted(stats.captured, key=lambda p: -len(stats.captured[p]))
+    result = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'captures': args.captures,
+            'speed': args.speed,
+            'concurrency': args.concurrency
+        },
+        'requests': len(records),
+        'skipped_records': skipped,
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(records) / elapsed, 2) if elapsed else None,
+        'schedule_lag_ms': percentiles(np.array(stats.lag) * 1000),
+        'endpoints': {}
+    }
+    for path in paths:
+        entry = {'count': len(stats.captured[path]), 'captured_ms': percentiles(stats.captured[path]), 'targets': {}}
+        for target in stats.targets:
+            entry['targets'][target] = {
+                'latency_ms': percentiles(np.array(stats.latencies[target][path]) * 1000),
+                'errors': stats.errors[target][path],
+                'status_changed': stats.status_changed[target][path]
+            }
+        if args.compare and path not in args.diff_exclude:
+            entry['compared'] = stats.compared[path]
+            entry['diffs'] = stats.diffs[path]
+        result['endpoints'][path] = entry
+    if args.compare:
+        result['diff_examples'] = stats.diff_examples
+
+    lag = result['schedule_lag_ms'] or {}
+    print(f"{len(records)} requests in {elapsed:.2f}s ({result['rps']} req/s), skipped {skipped}, "
+          f"schedule lag p99 {lag.get('p99', 0):.1f} ms")
+    for target in stats.targets:
+        print(f'\n{target}')
+        print(f"  {'endpoint':36s} {'count':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'max ms':>8s} "
+              f"{'errors':>6s} {'status≠':>7s} {'captured p50':>12s}")
+        for path, entry in result['endpoints'].items():
+            t = entry['targets'][target]
+            latency = t['latency_ms'] or dict.fromkeys(('p50', 'p95', 'p99', 'max'), float('nan'))
+            captured = (entry['captured_ms'] or {}).get('p50', float('nan'))
+            print(f"  {path:36s} {entry['count']:>6d} {latency['p50']:>8.2f} {latency['p95']:>8.2f} "
+                  f"{latency['p99']:>8.2f} {latency['max']:>8.2f} {t['errors']:>6d} {t['status_changed']:>7d} "
+                  f"{captured:>12.2f}")
+    if args.compare:
+        total = sum(stats.diffs.values())
+        print(f'\nresponse diffs {args.target} vs {args.compare}: {total} of {sum(stats.compared.values())}')
+        for path, entry in result['endpoints'].items():
+            if entry.get('diffs'):
+                print(f"  {path}: {entry['diffs']} of {entry['compared']}")
+        for example in stats.diff_examples[:10]:
+            print(f"    {example['method']} {example['path']} - {example['difference']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('captures', nargs='+', help='ملفات JSONL من TRAFFIC_CAPTURE_FILE')
+    parser.add_argument('--target', required=True, help='مثلاً http://127.0.0.1:8000')
+    parser.add_argument('--compare', help='نسخة ثانية: كل طلب يُرسل للاثنين وتُقارن الاستجابات')
+    parser.add_argument('--speed', type=float, default=1.0, help='1 التوقيت الأصلي، 10 أسرع 10 مرات، 0 أقصى سرعة')
+    parser.add_argument('--concurrency', type=int, default=32, help='أقصى عدد طلبات جارية')
+    parser.add_argument('--paths', nargs='+', help='endpoints محددة فقط')
+    parser.add_argument('--exclude-paths', nargs='+', default=[])
+    parser.add_argument('--limit', type=int, help='أول N طلب فقط')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--rtol', type=float, default=1e-6, help='تسامح نسبي عند مقارنة الأرقام')
+    parser.add_argument('--atol', type=float, default=1e-9)
+    parser.add_argument('--ignore-keys', nargs='+', default=list(DIFF_IGNORED_KEYS))
+    parser.add_argument('--diff-exclude', nargs='+', default=list(DIFF_EXCLUDED_PATHS))
+    parser.add_argument('--max-examples', type=int, default=50)
+    parser.add_argument('--output', help='ملف JSON للنتائج')
+    parser.add_argument('--fail-on-diff', action='store_true', help='exit code 1 عند أي اختلاف أو خطأ')
+    args = parser.parse_args()
+    args.target = args.target.rstrip('/')
+    args.compare = args.compare.rstrip('/') if args.compare else None
+    args.ignore_keys = frozenset(args.ignore_keys)
+
+    records, skipped = load_records(args.captures, args.paths, args.exclude_paths, args.limit)
+    if not records:
+        sys.exit('no requests to replay')
+    stats, elapsed = asyncio.run(replay(records, args))
+    result = report(records, skipped, stats, elapsed, args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f'\nresults: {args.output}')
+
+    failed = sum(sum(errors.values()) for errors in stats.errors.values()) + sum(stats.diffs.values())
+    if args.fail_on_diff and failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
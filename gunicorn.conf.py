@@ -0,0 +1,18 @@
+"""
+gunicorn config - يُقرأ تلقائياً من مجلد المشروع
+
+Flask:   gunicorn app:app
+FastAPI: gunicorn app_fastapi:app -k uvicorn.workers.UvicornWorker
+
+MODEL_PRELOAD=1: النماذج تُحمّل مرة واحدة في العملية الرئيسية والعمال يتشاركونها (copy-on-write)،
+وعدد العمال الافتراضي يصبح عدد الأنوية بدل 1. WEB_CONCURRENCY يحدد العدد صراحةً.
+"""
+import multiprocessing
+import os
+
+from ml_engine.preload import MODEL_PRELOAD
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() if MODEL_PRELOAD else 1))
+preload_app = MODEL_PRELOAD
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
@@ -0,0 +1,4 @@
+"""
+ML Engine - shared inference helpers for app.py and app_fastapi.py
+مكونات مشتركة لتشغيل النماذج يستخدمها كل من Flask و FastAPI
+"""
@@ -0,0 +1,109 @@
+"""
+Micro-batching - coalesce concurrent async requests into one vectorized call
+تجميع الطلبات المتزامنة خلال نافذة زمنية قصيرة وتشغيلها كدفعة واحدة في worker thread
+"""
+import asyncio
+import os
+import threading
+import time
+
+# أقصى زمن انتظار لتجميع الدفعة (ms) وأقصى حجم لها
+BATCH_WINDOW_MS = float(os.environ.get('BATCH_WINDOW_MS', 2))
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 64))
+
+
+def _bucket(size):
+    """حدود الـ histogram: 1, 2, 4, 8, ..."""
+    bound = 1
+    while bound < size:
+        bound *= 2
+    return bound
+
+
+class MicroBatcher:
+    """يجمع عناصر من عدة طلبات ثم يستدعي infer(items) مرة واحدة
+
+    infer تستقبل قائمة العناصر وترجع قائمة بنفس الطول، وكل نتيجة إما قيمة
+    أو Exception خاص بذلك العنصر (يُرفع فقط عند صاحبه).
+    executor: InferenceExecutor اختياري (الافتراضي thread pool الخاص بالـ event loop).
+    """
+
+    def __init__(self, name, infer, window_ms=BATCH_WINDOW_MS, max_batch_size=BATCH_MAX_SIZE, executor=None):
+        self.name = name
+        self.infer = infer
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.executor = executor
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+        self._stats = {'batches': 0, 'items': 0, 'max_queue_depth': 0, 'wait_seconds_total': 0.0}
+        self._histogram = {}
+
+    async def submit(self, item):
+        """إضافة عنصر وانتظار نتيجته"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        depth = len(self._pending)
+        if depth > self._stats['max_queue_depth']:
+            self._stats['max_queue_depth'] = depth
+
+        if depth >= self.max_batch_size:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush, loop)
+        return await future
+
+    def _flush(self, loop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            # بقية الطابور تبدأ نافذة جديدة
+            self._timer = loop.call_later(self.window, self._flush, loop)
+        if batch:
+            loop.create_task(self._run(batch))
+
+    async def _run(self, batch):
+        now = time.perf_counter()
+        items = [item for item, _, _ in batch]
+        try:
+            if self.executor is not None:
+                results = await self.executor.run(self.infer, items)
+            else:
+                results = await asyncio.get_running_loop().run_in_executor(None, self.infer, items)
+        except Exception as e:
+            results = [e] * len(batch)
+
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['items'] += len(batch)
+            self._stats['wait_seconds_total'] += sum(now - queued for _, _, queued in batch)
+            bucket = _bucket(len(batch))
+            self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        """عمق الطابور و histogram أحجام الدفعات"""
+        with self._lock:
+            items = self._stats['items']
+            return {
+                'window_ms': self.window * 1000,
+                'max_batch_size': self.max_batch_size,
+                'queue_depth': len(self._pending),
+                'max_queue_depth': self._stats['max_queue_depth'],
+                'batches': self._stats['batches'],
+                'items': items,
+                'avg_batch_size': round(items / self._stats['batches'], 2) if self._stats['batches'] else 0,
+                'avg_wait_ms': round(self._stats['wait_seconds_total'] / items * 1000, 3) if items else 0,
+                'batch_size_histogram': {f'<={k}': v for k, v in sorted(self._histogram.items())}
+            }
@@ -0,0 +1,204 @@
+"""
+Streaming bulk scoring - NDJSON/CSV in, NDJSON/CSV out
+تقييم ملفات كبيرة على شكل stream: قراءة أجزاء ثابتة الحجم، predict واحد لكل جزء، وإرسال النتائج فوراً
+
+الذاكرة لا تعتمد على حجم الملف: في أي لحظة يوجد جزء واحد فقط (STREAM_CHUNK_ROWS صف) في الذاكرة.
+"""
+import csv
+import io
+import os
+
+import pandas as pd
+
+from ml_engine.features import id_only_mask, record_columns
+from ml_engine.lead_scoring import lead_results, score_leads
+from ml_engine.metrics import staged
+from ml_engine.serialization import dumps, loads
+
+# عدد الصفوف في كل استدعاء predict، وحجم القراءة من جسم الطلب، وأقصى طول للسطر الواحد
+STREAM_CHUNK_ROWS = int(os.environ.get('STREAM_CHUNK_ROWS', 2000))
+STREAM_READ_BYTES = int(os.environ.get('STREAM_READ_BYTES', 64 * 1024))
+STREAM_MAX_LINE_BYTES = int(os.environ.get('STREAM_MAX_LINE_BYTES', 1024 * 1024))
+
+# في CSV تُكتب الـ tags في خلية واحدة مفصولة بهذا الحرف: "vip|urgent"
+CSV_TAG_SEPARATOR = '|'
+
+OUTPUT_FIELDS = ('lead_id', 'name', 'lead_score', 'priority', 'error')
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+
+def input_format(content_type):
+    """صيغة جسم الطلب من Content-Type (الافتراضي NDJSON)"""
+    return 'csv' if 'csv' in (content_type or '').lower() else 'ndjson'
+
+
+def output_format(accept):
+    """صيغة الاستجابة من Accept (الافتراضي NDJSON)"""
+    return 'csv' if 'text/csv' in (accept or '').lower() else 'ndjson'
+
+
+class LineChunker:
+    """تقسيم أجزاء bytes عشوائية إلى مجموعات من chunk_rows سطر كامل
+
+    في CSV يُحفظ أول سطر غير فارغ كـ header ولا يُحسب ضمن الصفوف.
+    """
+
+    def __init__(self, in_format, chunk_rows=STREAM_CHUNK_ROWS, max_line_bytes=STREAM_MAX_LINE_BYTES):
+        self.in_format = in_format
+        self.chunk_rows = chunk_rows
+        self.max_line_bytes = max_line_bytes
+        self.header = None
+        self._tail = b''
+        self._lines = []
+
+    def feed(self, data):
+        """إضافة bytes جديدة وإرجاع المجموعات المكتملة"""
+        lines = (self._tail + data).split(b'\n')
+        self._tail = lines.pop()
+        if len(self._tail) > self.max_line_bytes:
+            raise ValueError(f'line exceeds {self.max_line_bytes} bytes')
+        return self._add(lines)
+
+    def close(self):
+        """نهاية الجسم: آخر سطر بدون newline وآخر مجموعة ناقصة"""
+        tail, self._tail = self._tail, b''
+        ready = self._add([tail])
+        if self._lines:
+            ready.append(self._lines)
+            self._lines = []
+        return ready
+
+    def _add(self, lines):
+        ready = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if self.in_format == 'csv' and self.header is None:
+                self.header = next(csv.reader([line.decode('utf-8-sig')]))
+                continue
+            self._lines.append(line)
+            if len(self._lines) >= self.chunk_rows:
+                ready.append(self._lines)
+                self._lines = []
+        return ready
+
+
+def parse_ndjson(lines):
+    rows, errors = [], []
+    for line in lines:
+        try:
+            rows.append(loads(line))
+            errors.append(None)
+        except ValueError as e:
+            rows.append({})
+            errors.append(f'invalid JSON: {e}')
+    return rows, errors
+
+
+def _csv_value(field, value):
+    if field == 'tags':
+        return [tag for tag in value.split(CSV_TAG_SEPARATOR) if tag]
+    if field == 'id':
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def parse_csv(lines, header):
+    rows, errors = [], []
+    for line in lines:
+        try:
+            values = next(csv.reader([line.decode('utf-8')]))
+        except (UnicodeDecodeError, csv.Error) as e:
+            rows.append({})
+            errors.append(f'invalid CSV row: {e}')
+            continue
+        # الخلايا الفارغة = حقل غير موجود (القيمة الافتراضية)
+        rows.append({
+            field: _csv_value(field, value)
+            for field, value in zip(header, values) if value != ''
+        })
+        errors.append(None)
+    return rows, errors
+
+
+def score_rows(backend, rows, source_encoder, agent_encoder, now=None, row_errors=None, cache=None, endpoint=None,
+               store=None):
+    """نتائج batch-lead-scoring لقائمة dicts - خطأ كل صف في حقل error بدل فشل الدفعة"""
+    leads = [row if isinstance(row, dict) else {} for row in rows]
+    ids = [lead.get('id') for lead in leads]
+    scores, errors = score_leads(
+        backend, record_columns(leads), source_encoder, agent_encoder, now, cache, endpoint,
+        store, ids, id_only_mask(leads) if store is not None else None
+    )
+    row_errors = row_errors or [None] * len(rows)
+    errors = [
+        'lead must be an object' if not isinstance(row, dict) else row_error or error
+        for row, error, row_error in zip(rows, errors, row_errors)
+    ]
+    return lead_results(ids, [lead.get('name') for lead in leads], scores, errors)
+
+
+@staged('parse')
+def parse_lines(lines, in_format, header=None):
+    """أسطر جزء واحد -> (dicts، خطأ التحليل لكل صف)"""
+    if in_format == 'csv':
+        return parse_csv(lines, header or [])
+    return parse_ndjson(lines)
+
+
+def csv_header(fields=OUTPUT_FIELDS):
+    return ','.join(fields).encode('utf-8') + b'\r\n'
+
+
+@staged('serialize')
+def render_results(results, out_format, fields=OUTPUT_FIELDS):
+    """تحويل نتائج جزء واحد إلى bytes جاهزة للإرسال"""
+    if out_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fields)
+        writer.writerows(results)
+        return buffer.getvalue().encode('utf-8')
+    return b''.join(dumps(result) + b'\n' for result in results)
+
+
+def score_line_chunk(backend, source_encoder, agent_encoder, lines, in_format, out_format, header=None, now=None,
+                     cache=None, endpoint=None):
+    """جزء واحد: تحليل الأسطر، predict واحد، وإرجاع الناتج كـ bytes"""
+    rows, row_errors = parse_lines(lines, in_format, header)
+    results = score_rows(backend, rows, source_encoder, agent_encoder, now, row_errors, cache, endpoint)
+    return render_results(results, out_format)
+
+
+def stream_scores(byte_chunks, in_format, out_format, score_chunk, chunk_rows=STREAM_CHUNK_ROWS,
+                  fields=OUTPUT_FIELDS):
+    """Generator متزامن (Flask): score_chunk(lines, header, now) -> bytes"""
+    now = pd.Timestamp.now()  # نفس "الآن" لكل صفوف الطلب
+    chunker = LineChunker(in_format, chunk_rows)
+    if out_format == 'csv':
+        yield csv_header(fields)
+    for data in byte_chunks:
+        for lines in chunker.feed(data):
+            yield score_chunk(lines, chunker.header, now)
+    for lines in chunker.close():
+        yield score_chunk(lines, chunker.header, now)
+
+
+async def astream_scores(byte_chunks, in_format, out_format, score_chunk, chunk_rows=STREAM_CHUNK_ROWS,
+                         fields=OUTPUT_FIELDS):
+    """نفس stream_scores لكن async (FastAPI): byte_chunks و score_chunk غير متزامنة"""
+    now = pd.Timestamp.now()
+    chunker = LineChunker(in_format, chunk_rows)
+    if out_format == 'csv':
+        yield csv_header(fields)
+    async for data in byte_chunks:
+        for lines in chunker.feed(data):
+            yield await score_chunk(lines, chunker.header, now)
+    for lines in chunker.close():
+        yield await score_chunk(lines, chunker.header, now)
@@ -0,0 +1,71 @@
+"""
+Calendar table - precomputed per-day calendar features
+جدول ميزات التقويم (year, month, day, week, weekday, quarter) محسوب مسبقاً لكل يوم
+"""
+import numpy as np
+import pandas as pd
+
+
+def day_numbers(dates):
+    """رقم اليوم (أيام منذ 1970-01-01) حسب التوقيت المحلي للتاريخ"""
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    return dates.values.astype('datetime64[D]').astype(np.int64)
+
+
+def compute_calendar_features(dates):
+    """حساب ميزات التقويم مباشرة من التواريخ: (n, 6)"""
+    features = np.empty((len(dates), 6), dtype=np.int16)
+    features[:, 0] = dates.year
+    features[:, 1] = dates.month
+    features[:, 2] = dates.day
+    features[:, 3] = dates.isocalendar().week.to_numpy(dtype=np.int16)
+    features[:, 4] = dates.weekday
+    features[:, 5] = dates.quarter
+    return features
+
+
+class CalendarTable:
+    """مصفوفة (أيام, 6) int16 مع slice بدون نسخ لأي فترة متصلة داخل الجدول"""
+
+    def __init__(self, start, end):
+        dates = pd.date_range(start=pd.Timestamp(start).normalize(), end=end, freq='D')
+        self.first_day = int(day_numbers(dates[:1])[0])
+        self.features = compute_calendar_features(dates)
+        self.features.flags.writeable = False
+        self.labels = np.asarray(dates.strftime('%Y-%m-%d'), dtype=object)
+
+    @classmethod
+    def around(cls, center, years):
+        """جدول يغطي ±years سنة حول التاريخ المعطى"""
+        center = pd.Timestamp(center).normalize()
+        return cls(center - pd.DateOffset(years=years), center + pd.DateOffset(years=years))
+
+    def __len__(self):
+        return len(self.features)
+
+    @property
+    def nbytes(self):
+        return self.features.nbytes
+
+    def _positions(self, dates):
+        if len(dates) == 0:
+            return slice(0, 0)
+        days = day_numbers(dates) - self.first_day
+        lo, hi = int(days.min()), int(days.max())
+        if lo < 0 or hi >= len(self.features):
+            return None
+        if hi - lo == len(days) - 1 and days[0] == lo:
+            # فترة متصلة: slice بدون نسخ
+            return slice(lo, hi + 1)
+        return days
+
+    def lookup(self, dates):
+        """ميزات التواريخ من الجدول، أو None إذا كانت خارج نطاقه"""
+        positions = self._positions(dates)
+        return None if positions is None else self.features[positions]
+
+    def lookup_labels(self, dates):
+        """نصوص التواريخ 'YYYY-MM-DD' من الجدول، أو None إذا كانت خارج نطاقه"""
+        positions = self._positions(dates)
+        return None if positions is None else self.labels[positions]
@@ -0,0 +1,232 @@
+"""
+Traffic capture - record live requests as JSONL for benchmarks/replay.py
+تسجيل الطلبات الحقيقية (سطر JSON لكل طلب) لإعادة تشغيلها محلياً عند ضبط العمال والتجميع والكاش
+
+TRAFFIC_CAPTURE_FILE=/tmp/traffic.jsonl يفعّل التسجيل في Flask (WSGI) و FastAPI (ASGI):
+
+    {"ts": 1760000000.123, "method": "POST", "path": "/api/lead-scoring", "query": "",
+     "headers": {"content-type": "application/json"}, "body": "{...}", "status": 200, "duration_ms": 3.1}
+
+الجسم يُنسخ أثناء قراءة التطبيق له (tee) فالـ streams تبقى streams؛ الجسم غير النصي في "body_b64"،
+والأكبر من TRAFFIC_CAPTURE_MAX_BODY_BYTES يُسجَّل بدون جسم مع "truncated": true (لا يُعاد تشغيله).
+لا تُسجَّل إلا ترويسات Content-Type و Accept (لا tokens). كل سطر يُكتب بـ write واحد على ملف O_APPEND
+فعدة عمال gunicorn يمكنهم الكتابة في نفس الملف ({pid} في المسار يعطي ملفاً لكل عامل).
+"""
+import base64
+import json
+import os
+import random
+import threading
+import time
+
+TRAFFIC_CAPTURE_FILE = os.environ.get('TRAFFIC_CAPTURE_FILE', '')
+TRAFFIC_CAPTURE_SAMPLE = float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE', 1.0))
+TRAFFIC_CAPTURE_MAX_BODY_BYTES = int(os.environ.get('TRAFFIC_CAPTURE_MAX_BODY_BYTES', 1024 * 1024))
+# لا تُسجَّل: المراقبة، وإعادة تحميل النماذج وتاريخ المبيعات (تغيّر الحالة عند إعادة التشغيل)
+TRAFFIC_CAPTURE_EXCLUDE = tuple(
+    p for p in os.environ.get('TRAFFIC_CAPTURE_EXCLUDE', '/metrics,/api/models/reload,/api/sales-history').split(',')
+    if p
+)
+
+CAPTURED_HEADERS = ('content-type', 'accept')
+
+
+class TrafficRecorder:
+    """كتابة سطر JSON لكل طلب مُختار (sample) في ملف الالتقاط"""
+
+    def __init__(self, path, sample=1.0, max_body_bytes=TRAFFIC_CAPTURE_MAX_BODY_BYTES,
+                 exclude=TRAFFIC_CAPTURE_EXCLUDE):
+        self.path = path
+        self.sample = sample
+        self.max_body_bytes = max_body_bytes
+        self.exclude = tuple(exclude)
+        self._fd = None
+        self._lock = threading.Lock()
+        self._stats = {'recorded': 0, 'truncated': 0, 'errors': 0}
+
+    @classmethod
+    def from_env(cls):
+        """None إذا لم يُحدد TRAFFIC_CAPTURE_FILE"""
+        if not TRAFFIC_CAPTURE_FILE:
+            return None
+        return cls(TRAFFIC_CAPTURE_FILE, TRAFFIC_CAPTURE_SAMPLE)
+
+    def wants(self, path):
+        if path in self.exclude:
+            return False
+        return self.sample >= 1 or random.random() < self.sample
+
+    def _open(self):
+        # بعد fork (preload) كل عامل يفتح الملف بنفسه - {pid} يعطي ملفاً منفصلاً لكل عامل
+        pid = os.getpid()
+        if self._fd is None or self._fd[0] != pid:
+            path = self.path.replace('{pid}', str(pid))
+            self._fd = (pid, os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644))
+        return self._fd[1]
+
+    def record(self, started, method, path, query, headers, body, truncated, status, duration):
+        entry = {
+            'ts': round(started, 6),
+            'method': method,
+            'path': path,
+            'query': query,
+            'headers': headers,
+            'status': status,
+            'duration_ms': round(duration * 1000, 3)
+        }
+        if truncated:
+            entry['truncated'] = True
+        elif body:
+            try:
+                entry['body'] = body.decode('utf-8')
+            except UnicodeDecodeError:
+                entry['body_b64'] = base64.b64encode(body).decode('ascii')
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        try:
+            with self._lock:
+                os.write(self._open(), line)
+                self._stats['recorded'] += 1
+                self._stats['truncated'] += bool(truncated)
+        except OSError as e:
+            self._stats['errors'] += 1
+            if self._stats['errors'] == 1:
+                print(f"⚠️  تحذير: فشل تسجيل الطلبات في {self.path}: {e}")
+
+    def stats(self):
+        return {**self._stats, 'file': self.path, 'sample': self.sample}
+
+
+class _BodyCopy:
+    """نسخة من جسم الطلب حتى max_bytes - بعدها يُعلَّم truncated ويُترك الباقي"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.chunks = []
+        self.size = 0
+        self.truncated = False
+
+    def add(self, data):
+        if data and not self.truncated:
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self.truncated = True
+                self.chunks = []
+            else:
+                self.chunks.append(bytes(data))
+        return data
+
+    def value(self):
+        return b''.join(self.chunks)
+
+
+class _TeeInput:
+    """wsgi.input يسجّل ما يقرأه التطبيق (بدون readinto حتى يستخدم Werkzeug read)"""
+
+    def __init__(self, stream, copy):
+        self._stream = stream
+        self._copy = copy
+
+    def read(self, *args):
+        return self._copy.add(self._stream.read(*args))
+
+    def readline(self, *args):
+        return self._copy.add(self._stream.readline(*args))
+
+    def readlines(self, *args):
+        return [self._copy.add(line) for line in self._stream.readlines(*args)]
+
+    def __iter__(self):
+        for line in self._stream:
+            yield self._copy.add(line)
+
+
+def _header_subset(get):
+    headers = {name: get(name) for name in CAPTURED_HEADERS}
+    return {name: value for name, value in headers.items() if value}
+
+
+class WSGICapture:
+    """WSGI middleware (Flask): يُسجَّل الطلب بعد إرسال آخر جزء من الاستجابة"""
+
+    def __init__(self, app, recorder):
+        self.app = app
+        self.recorder = recorder
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not self.recorder.wants(path):
+            return self.app(environ, start_response)
+        started, start = time.time(), time.perf_counter()
+        copy = _BodyCopy(self.recorder.max_body_bytes)
+        environ['wsgi.input'] = _TeeInput(environ['wsgi.input'], copy)
+        status = [500]
+
+        def capture_status(status_line, headers, exc_info=None):
+            status[0] = int(status_line.split(' ', 1)[0])
+            return start_response(status_line, headers, exc_info)
+
+        def finish():
+            headers = _header_subset(lambda name: environ.get('CONTENT_TYPE' if name == 'content-type'
+                                                              else 'HTTP_' + name.upper().replace('-', '_')))
+            self.recorder.record(started, environ.get('REQUEST_METHOD', 'GET'), path,
+                                 environ.get('QUERY_STRING', ''), headers, copy.value(), copy.truncated,
+                                 status[0], time.perf_counter() - start)
+
+        return _ClosingIterator(self.app(environ, capture_status), finish)
+
+
+class _ClosingIterator:
+    """الخادم يستدعي close() بعد آخر جزء (أو عند انقطاع الاتصال) - عندها يُسجَّل الطلب"""
+
+    def __init__(self, result, finish):
+        self._result = result
+        self._iterator = iter(result)
+        self._finish = finish
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def close(self):
+        try:
+            if hasattr(self._result, 'close'):
+                self._result.close()
+        finally:
+            self._finish()
+
+
+class ASGICapture:
+    """ASGI middleware (FastAPI): نسخ الجسم من receive والحالة من send"""
+
+    def __init__(self, app, recorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.recorder.wants(scope['path']):
+            return await self.app(scope, receive, send)
+        started, start = time.time(), time.perf_counter()
+        copy = _BodyCopy(self.recorder.max_body_bytes)
+        status = 500
+
+        async def receive_copy():
+            message = await receive()
+            if message['type'] == 'http.request':
+                copy.add(message.get('body', b''))
+            return message
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive_copy, send_with_status)
+        finally:
+            raw_headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+            self.recorder.record(started, scope['method'], scope['path'],
+                                 scope.get('query_string', b'').decode('latin-1'), _header_subset(raw_headers.get),
+                                 copy.value(), copy.truncated, status, time.perf_counter() - start)
@@ -0,0 +1,259 @@
+"""
+Columnar binary format - packed NumPy columns for the bulk endpoints
+صيغة ثنائية عمودية: كل عمود مصفوفة NumPy متجاورة تُقرأ بـ np.frombuffer بدون تحليل JSON لكل صف
+
+التنسيق (application/vnd.crm.columns):
+    8 bytes   magic b'CRMCOL1\\n'
+    4 bytes   طول الـ header (uint32 little-endian)
+    header    JSON utf-8: {"rows": n, "meta": {...}, "columns": [
+                  {"name": "budget", "dtype": "<f8", "offset": 0},
+                  {"name": "source", "dtype": "<i4", "offset": 64, "categories": ["Facebook", ...]}, ...]}
+    padding   أصفار حتى مضاعف 64
+    data      كل عمود n قيمة تبدأ عند offset (من بداية منطقة البيانات، مضاعف 64)
+
+أعمدة النصوص dictionary-encoded: codes صحيحة تشير إلى "categories" و -1 = قيمة غائبة.
+الأنواع المسموحة: bool، أعداد صحيحة، float، و datetime64 (مثلاً "<M8[D]" لـ created_at).
+"""
+import json
+import struct
+
+import numpy as np
+
+from ml_engine.features import ID_ONLY_FIELDS, Categorical, numeric_column, row_count
+from ml_engine.forecasting import aggregate_periods, forecast_totals, period_labels, scenario_summaries
+from ml_engine.lead_scoring import score_leads
+from ml_engine.metrics import stage, staged
+from ml_engine.segmentation import SEGMENT_NAMES
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.crm.columns'
+MAGIC = b'CRMCOL1\n'
+ALIGNMENT = 64
+ALLOWED_KINDS = 'biufM'
+
+PRIORITY_CATEGORIES = ['Low', 'Medium', 'High']
+
+
+def is_columnar(content_type):
+    return COLUMNAR_MEDIA_TYPE in (content_type or '').lower()
+
+
+def accepts_columnar(accept):
+    return COLUMNAR_MEDIA_TYPE in (accept or '').lower()
+
+
+def _aligned(size):
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+@staged('serialize')
+def pack_columns(columns, meta=None):
+    """dict اسم -> ndarray أو Categorical إلى bytes"""
+    rows = None
+    specs, blobs, offset = [], [], 0
+    for name, column in columns.items():
+        if column is None:
+            continue
+        spec = {'name': name}
+        if isinstance(column, Categorical):
+            spec['categories'] = column.categories
+            column = column.codes
+        column = np.ascontiguousarray(column)
+        if column.dtype.kind not in ALLOWED_KINDS:
+            raise ValueError(f'column {name}: unsupported dtype {column.dtype}')
+        rows = len(column) if rows is None else rows
+        if len(column) != rows:
+            raise ValueError(f'column {name} has {len(column)} rows, expected {rows}')
+        column = column.astype(column.dtype.newbyteorder('<'), copy=False)
+        spec.update(dtype=column.dtype.str, offset=offset)
+        specs.append(spec)
+        blobs.append(column.tobytes())
+        offset = _aligned(offset + column.nbytes)
+
+    header = json.dumps({'rows': rows or 0, 'meta': meta or {}, 'columns': specs}).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    out = bytearray(prefix + b'\0' * (_aligned(len(prefix)) - len(prefix)))
+    for blob in blobs:
+        out += blob
+        out += b'\0' * (_aligned(len(out)) - len(out))
+    return bytes(out)
+
+
+@staged('parse')
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_header(header):
+    """rows عدد صحيح >= 0، و columns قائمة dicts فيها name و dtype و offset - ValueError لغير ذلك"""
+    if not isinstance(header, dict):
+        raise ValueError('columnar header must be an object')
+    if not _is_int(header.get('rows')) or header['rows'] < 0:
+        raise ValueError('columnar header: rows must be a non-negative integer')
+    specs = header.get('columns')
+    if not isinstance(specs, list):
+        raise ValueError('columnar header: columns must be a list')
+    for spec in specs:
+        if not isinstance(spec, dict) or not isinstance(spec.get('name'), str) \
+                or not isinstance(spec.get('dtype'), str) or not _is_int(spec.get('offset')):
+            raise ValueError('columnar header: each column needs name, dtype and an integer offset')
+        if 'categories' in spec and not isinstance(spec['categories'], list):
+            raise ValueError(f"column {spec['name']}: categories must be a list")
+    if not isinstance(header.get('meta', {}), dict):
+        raise ValueError('columnar header: meta must be an object')
+    return header
+
+
+def unpack_columns(buffer):
+    """bytes إلى (dict اسم -> ndarray أو Categorical، meta) - الأعمدة views على الـ buffer بدون نسخ"""
+    buffer = memoryview(buffer)
+    if buffer[:len(MAGIC)].tobytes() != MAGIC:
+        raise ValueError(f'body is not {COLUMNAR_MEDIA_TYPE}')
+    if len(buffer) < len(MAGIC) + 4:
+        raise ValueError('columnar body is truncated')
+    (header_size,) = struct.unpack_from('<I', buffer, len(MAGIC))
+    header_end = len(MAGIC) + 4 + header_size
+    if header_end > len(buffer):
+        raise ValueError('columnar header is out of bounds')
+    header = _check_header(json.loads(buffer[len(MAGIC) + 4:header_end].tobytes()))
+    data_start = _aligned(header_end)
+    rows = header['rows']
+
+    columns = {}
+    for spec in header['columns']:
+        try:
+            dtype = np.dtype(spec['dtype'])
+        except TypeError:
+            raise ValueError(f"column {spec['name']}: invalid dtype {spec['dtype']!r}")
+        if dtype.kind not in ALLOWED_KINDS:
+            raise ValueError(f"column {spec['name']}: unsupported dtype {dtype}")
+        start = data_start + spec['offset']
+        if start < data_start or start + rows * dtype.itemsize > len(buffer):
+            raise ValueError(f"column {spec['name']} is out of bounds")
+        column = np.frombuffer(buffer, dtype=dtype, count=rows, offset=start)
+        if 'categories' in spec:
+            if dtype.kind not in 'iu':
+                raise ValueError(f"column {spec['name']}: categorical codes must be integers")
+            column = Categorical(column, spec['categories'])
+        columns[spec['name']] = column
+    return columns, header.get('meta', {})
+
+
+def score_lead_columns(backend, columns, source_encoder, agent_encoder, now=None, cache=None, endpoint=None,
+                       store=None):
+    """أعمدة العملاء -> أعمدة النتائج: lead_id، lead_score (NaN للأخطاء)، priority، error"""
+    # نفس مسار الميزات لكل الـ endpoints (features.lead_features) - الأعمدة تُقرأ كـ views بدون نسخ
+    # جسم بأعمدة id (و name) فقط: كل العملاء من مخزن الدرجات
+    id_only = None
+    if store is not None and columns.get('id') is not None and columns.keys() <= ID_ONLY_FIELDS:
+        id_only = np.ones(row_count(columns), dtype=bool)
+    raw_scores, errors = score_leads(
+        backend, columns, source_encoder, agent_encoder, now, cache, endpoint, store, columns.get('id'), id_only
+    )
+    valid = ~np.isnan(raw_scores)
+    scores = np.round(raw_scores, 2)
+
+    priority = np.where(raw_scores > 70, 2, np.where(raw_scores > 40, 1, 0)).astype(np.int8)
+    priority[~valid] = -1
+    return {
+        'lead_id': columns.get('id'),
+        'name': columns.get('name'),
+        'lead_score': scores,
+        'priority': Categorical(priority, PRIORITY_CATEGORIES),
+        # نفس رسائل الأخطاء لكل صف كما في استجابات JSON (-1 = بدون خطأ)
+        'error': Categorical.from_values(errors)
+    }
+
+
+def segment_columns(segmenter, columns, include_distance=False):
+    """أعمدة RFM -> customer_id، segment، segment_name، distance، error"""
+    n = row_count(columns)
+    with stage('features'):
+        features = np.empty((n, len(segmenter.feature_names)), dtype=np.float64)
+        for j, name in enumerate(segmenter.feature_names):
+            features[:, j] = numeric_column(columns.get(name), name, n, segmenter.fill[j])
+        valid = np.isfinite(features).all(axis=1)
+    with stage('inference', rows=int(valid.sum()), model='customer_segmentation'):
+        labels, distances = segmenter.assign(features[valid], include_distance)
+    segment = np.full(n, -1, dtype=np.int16)
+    segment[valid] = labels
+    result = {
+        'customer_id': columns.get('id'),
+        'segment': segment,
+        'segment_name': Categorical(segment, [SEGMENT_NAMES[k] for k in sorted(SEGMENT_NAMES)]),
+        'error': Categorical(np.where(valid, -1, 0).astype(np.int8), ['features must be finite numbers'])
+    }
+    if include_distance:
+        result['distance'] = np.full(n, np.nan)
+        result['distance'][valid] = np.round(distances, 4)
+    return result
+
+
+def forecast_columns(dates, predictions):
+    """نتيجة التنبؤ كأعمدة: date (datetime64[D]) و predicted_sales، والمجاميع في meta"""
+    columns = {
+        'date': dates.values.astype('datetime64[D]'),
+        'predicted_sales': np.asarray(predictions, dtype=np.float64)
+    }
+    return columns, forecast_totals(predictions)
+
+
+def scenario_columns(scenarios, dates, offsets, predictions, aggregate='day'):
+    """نتيجة السيناريوهات كأعمدة: صف لكل يوم (أو فترة) مع رقم السيناريو، وملخص كل سيناريو في meta"""
+    meta = {'aggregate': aggregate, 'scenarios': scenario_summaries(scenarios, dates, offsets, predictions)}
+    if aggregate == 'day':
+        columns = {
+            'scenario': np.repeat(np.arange(len(dates), dtype=np.int32), np.diff(offsets)),
+            'date': np.concatenate([d.values.astype('datetime64[D]') for d in dates]),
+            'predicted_sales': np.asarray(predictions, dtype=np.float64)
+        }
+        return columns, meta
+    scenario, first, last, days, totals = aggregate_periods(dates, offsets, predictions, aggregate)
+    columns = {
+        'scenario': scenario.astype(np.int32),
+        'period': period_labels(first, aggregate).astype('datetime64[D]'),
+        'start_date': first,
+        'end_date': last,
+        'days': days.astype(np.int32),
+        'predicted_sales': totals
+    }
+    return columns, meta
+
+
+def results_to_columns(results, fields):
+    """قائمة dicts (مسار JSON) -> أعمدة لاستجابة ثنائية"""
+    columns = {}
+    for field in fields:
+        values = [result.get(field) for result in results]
+        present = [v for v in values if v is not None]
+        if not present:
+            continue
+        if any(isinstance(v, str) for v in present):
+            columns[field] = Categorical.from_values(values)
+        elif len(present) == len(values) and all(isinstance(v, (int, np.integer)) for v in present):
+            columns[field] = np.array(values, dtype=np.int64)
+        else:
+            columns[field] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    return columns
+
+
+def columns_to_results(columns, key_field):
+    """أعمدة النتائج -> قائمة dicts بنفس شكل JSON (الحقول الغائبة لا تظهر)"""
+    names, lists = [], []
+    for name, column in columns.items():
+        if column is None:
+            continue
+        values = column.values() if isinstance(column, Categorical) else column.tolist()
+        if not isinstance(column, Categorical) and column.dtype.kind == 'f':
+            values = [None if v != v else v for v in values]
+        names.append(name)
+        lists.append(values)
+
+    results = []
+    for row in zip(*lists):
+        result = {key_field: None}
+        result.update((name, value) for name, value in zip(names, row) if value is not None)
+        if result.get('error') is not None:
+            # صف الخطأ: المعرّف والاسم والخطأ فقط كما في مسار JSON
+            result = {name: result[name] for name in (key_field, 'name', 'error') if name in result}
+        results.append(result)
+    return results
@@ -0,0 +1,200 @@
+"""
+Compiled tree ensembles - flat NumPy node arrays
+تحويل نماذج الأشجار (GradientBoostingClassifier / XGBoost) إلى مصفوفات nodes مسطحة
+وتقييمها مباشرة بـ NumPy بدون أي dispatch من sklearn أو XGBoost
+"""
+import json
+
+import numpy as np
+
+# أقصى عدد صفوف يُقيّم مرة واحدة (الذاكرة المؤقتة = صفوف × عدد الأشجار)
+CHUNK_ROWS = 4096
+
+
+class CompiledEnsemble:
+    """مجموعة أشجار مسطحة: feature, threshold, left, right, default_left, value لكل node"""
+
+    name = 'compiled'
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, max_depth,
+                 base_score, strict, link, dtype):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.children = np.stack([left, right], axis=1).ravel()
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_score = base_score
+        # XGBoost: يسار إذا x < threshold | sklearn: يسار إذا x <= threshold
+        self.strict = strict
+        self.link = link
+        self.dtype = dtype
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _leaves(self, X):
+        has_missing = bool(np.isnan(X).any())
+        if len(X) == 1:
+            # صف واحد: مصفوفات أحادية البعد (أسرع من fancy indexing ثنائي)
+            x_flat, row_offset = X[0], 0
+            node = self.roots
+        else:
+            x_flat = X.ravel()
+            row_offset = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+            node = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            x = x_flat[row_offset + self.feature[node]]
+            go_right = x >= self.threshold[node] if self.strict else x > self.threshold[node]
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.default_left[node], go_right)
+            # children = [left, right] متجاورين لكل node: child = children[2 * node + go_right]
+            node = self.children[2 * node + go_right]
+        return node
+
+    def _raw_chunk(self, X):
+        leaves = self.value[self._leaves(X)]
+        if leaves.ndim == 1:
+            leaves = leaves[None, :]
+        # الجمع بالترتيب (cumsum) ليطابق ترتيب الجمع في المكتبة الأصلية
+        stacked = np.empty((len(X), self.n_trees + 1), dtype=self.dtype)
+        stacked[:, 0] = self.base_score
+        stacked[:, 1:] = leaves
+        return np.cumsum(stacked, axis=1, dtype=self.dtype)[:, -1]
+
+    def predict_raw(self, features):
+        """الناتج الخام (margin) لكل صف"""
+        X = np.ascontiguousarray(features, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) <= CHUNK_ROWS:
+            return self._raw_chunk(X)
+        return np.concatenate([
+            self._raw_chunk(X[start:start + CHUNK_ROWS]) for start in range(0, len(X), CHUNK_ROWS)
+        ])
+
+    def predict(self, features):
+        raw = self.predict_raw(features)
+        if self.link == 'logistic':
+            return 1.0 / (1.0 + np.exp(-raw))
+        return raw
+
+    def predict_positive_proba(self, features):
+        return self.predict(features)
+
+
+def _flatten(trees):
+    """دمج أشجار (feature, threshold, left, right, default_left, value) في مصفوفات واحدة بأرقام nodes عامة"""
+    offsets = np.cumsum([0] + [len(t[0]) for t in trees[:-1]])
+    feature, threshold, left, right, default_left, value = (
+        np.concatenate([t[i] for t in trees]) for i in range(6)
+    )
+    for i, offset in enumerate(offsets):
+        n = len(trees[i][0])
+        sl = slice(offset, offset + n)
+        is_leaf = trees[i][2] < 0
+        local = np.arange(n)
+        # الورقة تشير إلى نفسها حتى تبقى ثابتة في الخطوات التالية
+        left[sl] = np.where(is_leaf, local, trees[i][2]) + offset
+        right[sl] = np.where(is_leaf, local, trees[i][3]) + offset
+        feature[sl] = np.where(is_leaf, 0, trees[i][0])
+    return feature.astype(np.intp), threshold, left.astype(np.intp), right.astype(np.intp), default_left, value, offsets.astype(np.intp)
+
+
+def _depth(left, right, root):
+    depth, frontier = 0, [root]
+    while True:
+        frontier = [c for n in frontier for c in (left[n], right[n]) if c != n]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def compile_sklearn_gbc(model):
+    """GradientBoostingClassifier ثنائي (log_loss) مع init=DummyClassifier"""
+    if model.estimators_.shape[1] != 1 or getattr(model, 'loss', 'log_loss') not in ('log_loss', 'deviance'):
+        raise ValueError('only binary log_loss GradientBoostingClassifier is supported')
+    # init ثابت لكل الصفوف (DummyClassifier أو 'zero')
+    base_score = float(model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0, 0])
+    lr = model.learning_rate
+    trees = []
+    for estimator in model.estimators_[:, 0]:
+        t = estimator.tree_
+        trees.append((
+            t.feature.copy(), t.threshold.astype(np.float64), t.children_left.copy(), t.children_right.copy(),
+            np.zeros(t.node_count, dtype=bool),
+            # sklearn يضيف learning_rate * قيمة الورقة لكل مرحلة
+            lr * t.value[:, 0, 0]
+        ))
+    feature, threshold, left, right, default_left, value, roots = _flatten(trees)
+    max_depth = max(_depth(left, right, r) for r in roots)
+    return CompiledEnsemble(
+        feature, threshold, left, right, default_left, value.astype(np.float64), roots, max_depth,
+        base_score, strict=False, link='logistic', dtype=np.float64
+    )
+
+
+def compile_xgboost(model):
+    """XGBoost gbtree بهدف reg:squarederror أو binary:logistic"""
+    learner = json.loads(model.get_booster().save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in ('reg:squarederror', 'binary:logistic'):
+        raise ValueError(f'unsupported XGBoost objective: {objective}')
+    if learner['gradient_booster']['name'] != 'gbtree':
+        raise ValueError('only gbtree boosters are supported')
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    if objective == 'binary:logistic':
+        base_score = float(np.log(base_score / (1 - base_score)))
+
+    trees = []
+    for tree in learner['gradient_booster']['model']['trees']:
+        if any(tree.get('split_type', [])):
+            raise ValueError('categorical splits are not supported')
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        trees.append((
+            np.asarray(tree['split_indices'], dtype=np.int64),
+            # للأوراق split_conditions تحمل قيمة الورقة
+            np.asarray(tree['split_conditions'], dtype=np.float32),
+            left, np.asarray(tree['right_children'], dtype=np.int64),
+            np.asarray(tree['default_left'], dtype=bool),
+            np.where(left < 0, np.asarray(tree['split_conditions'], dtype=np.float32), 0).astype(np.float32)
+        ))
+    feature, threshold, left, right, default_left, value, roots = _flatten(trees)
+    max_depth = max(_depth(left, right, r) for r in roots)
+    return CompiledEnsemble(
+        feature, threshold, left, right, default_left, value, roots, max_depth,
+        np.float32(base_score), strict=True,
+        link='logistic' if objective == 'binary:logistic' else 'identity', dtype=np.float32
+    )
+
+
+def compile_model(model):
+    """تحويل النموذج إلى CompiledEnsemble (ValueError إذا كان النوع غير مدعوم)"""
+    if hasattr(model, 'get_booster'):
+        return compile_xgboost(model)
+    if hasattr(model, 'estimators_') and hasattr(model, 'learning_rate'):
+        return compile_sklearn_gbc(model)
+    raise ValueError(f'unsupported model type: {type(model).__name__}')
+
+
+def probe_features(compiled, n_rows=512, seed=0):
+    """بيانات فحص حول قيم thresholds الفعلية لكل feature (تغطي الفروع على جانبي كل split)"""
+    rng = np.random.default_rng(seed)
+    n_features = int(compiled.feature.max()) + 1
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    internal = compiled.left != np.arange(compiled.n_nodes)
+    for f in range(n_features):
+        thresholds = compiled.threshold[internal & (compiled.feature == f)].astype(np.float32)
+        if len(thresholds):
+            picks = rng.choice(thresholds, size=n_rows)
+            X[:, f] = np.nextafter(picks, rng.choice([-np.inf, np.inf], size=n_rows).astype(np.float32))
+            X[::7, f] = picks[::7]
+    return X
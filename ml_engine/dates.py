@@ -0,0 +1,217 @@
+"""
+Fast date parsing for createdAt - vectorized ISO-8601 fast path with a flexible fallback
+تحليل التواريخ لعمود كامل: صيغ ISO-8601 تُحلّل بعمليات NumPy على المصفوفة كاملة،
+والصفوف التي لا تطابقها فقط تمر على pd.to_datetime المرن (format='mixed') كما كان.
+
+الصيغ في المسار السريع:
+    YYYY-MM-DD
+    YYYY-MM-DDTHH:MM[:SS[.ffffff]]      (T أو مسافة، حتى 6 أرقام للكسور)
+    ... مع Z أو ±HH:MM في النهاية        (تُحوَّل إلى UTC بدون منطقة زمنية)
+
+"الآن" يُؤخذ مرة واحدة لكل طلب ويُمرَّر لكل الصفوف (وكل أجزاء الـ stream).
+"""
+import numpy as np
+import pandas as pd
+
+# أطول نص في المسار السريع: YYYY-MM-DDTHH:MM:SS.ffffff+HH:MM
+MAX_ISO_LENGTH = 32
+# datetime64[us] مثل pandas للنصوص - كل السنوات بأربعة أرقام
+MIN_YEAR, MAX_YEAR = 1, 9999
+
+# YYYY-MM-DD، +THH:MM، +:SS، +.f حتى .ffffff
+_CORE_LENGTHS = np.isin(np.arange(MAX_ISO_LENGTH + 2), [10, 16, 19, 21, 22, 23, 24, 25, 26])
+_DIGIT_POSITIONS = np.array([0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18])
+_FRACTION_POSITIONS = np.arange(20, 26)
+_FRACTION_SCALE = 10 ** np.arange(5, -1, -1, dtype=np.int64)
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _fixed_width(values, kind):
+    width = MAX_ISO_LENGTH + 1  # حرف إضافي: النص الأطول يظهر بطول أكبر من MAX_ISO_LENGTH بعد القص
+    try:
+        raw = np.array(values, dtype=f'{kind}{width}')
+        if raw.shape == (len(values),):
+            return raw
+    except UnicodeEncodeError:
+        raise
+    except (TypeError, ValueError):
+        pass
+    # قيم متداخلة (قوائم، dicts): النصوص فقط
+    return np.array([v if type(v) is str else '' for v in values], dtype=f'{kind}{width}')
+
+
+def _ascii_codes(values):
+    """(بايتات كل قيمة كمصفوفة uint8 (n، MAX_ISO_LENGTH + 1)، طول كل نص) - غير ASCII يصبح 0x7f
+
+    القيم غير النصية تُحوَّل بـ str كما يفعل NumPy (None -> 'None'، أعداد...) فلا تطابق ISO-8601
+    إلا كائنات التاريخ نفسها (datetime / Timestamp) وهي تعطي نفس التاريخ.
+    """
+    try:
+        raw = _fixed_width(values, 'S')
+    except UnicodeEncodeError:
+        raw = _fixed_width(values, 'U')
+        codes = np.minimum(raw.view(np.uint32), 0x7f).astype(np.uint8)
+        return codes.reshape(len(raw), -1), np.char.str_len(raw)
+    return raw.view(np.uint8).reshape(len(raw), -1), np.char.str_len(raw)
+
+
+def _days_from_civil(year, month):
+    """الأيام من 1970-01-01 حتى أول يوم في الشهر (التقويم الغريغوري، سنوات 1-9999)"""
+    year = year.astype(np.int64) - (month <= 2)
+    era_year = year % 400
+    march_month = (month + 9) % 12
+    day_of_era = era_year * 365 + era_year // 4 - era_year // 100 + (153 * march_month + 2) // 5
+    return (year // 400) * 146_097 + day_of_era - 719_468
+
+
+def _timezones(codes, lengths, n):
+    """(offset بالثواني، طول النص بدون المنطقة الزمنية، صالح) - Z أو ±HH:MM في نهاية النص"""
+    core = lengths.copy()
+    offset_seconds = np.zeros(n, dtype=np.int64)
+    valid = np.ones(n, dtype=bool)
+    index = np.arange(n)
+    end = np.maximum(lengths, 11)
+    last, sign = codes[index, end - 1], codes[index, end - 6]
+    rows = np.flatnonzero((lengths > 10) & ((last == ord('Z')) | (sign == ord('+')) | (sign == ord('-'))))
+    if len(rows) == 0:
+        return offset_seconds, core, valid
+    end, last, sign = end[rows], last[rows], sign[rows]
+    zulu = last == ord('Z')
+    offset = ~zulu & (codes[rows, end - 3] == ord(':'))
+    core[rows] = end - np.where(zulu, 1, np.where(offset, 6, 0))
+
+    digits = [codes[rows, end - k].astype(np.int64) - ord('0') for k in (5, 4, 2, 1)]
+    hours, minutes = digits[0] * 10 + digits[1], digits[2] * 10 + digits[3]
+    in_range = (np.stack(digits) >= 0).all(axis=0) & (np.stack(digits) <= 9).all(axis=0) & (hours < 24) & (minutes < 60)
+    # المنطقة الزمنية بعد وقت فقط (pandas يرفض YYYY-MM-DDZ)
+    valid[rows] = (~offset | in_range) & (~(zulu | offset) | (core[rows] >= 16))
+    offset_seconds[rows] = np.where(offset, (hours * 3600 + minutes * 60) * np.where(sign == ord('-'), -1, 1), 0)
+    return offset_seconds, core, valid
+
+
+def parse_iso(values):
+    """(datetime64[us]، parsed) - parsed=False للصفوف التي ليست ISO-8601 صالحة (تُترك للمحلل المرن)"""
+    n = len(values)
+    codes, lengths = _ascii_codes(values)
+    offset_seconds, core, ok = _timezones(codes, lengths, n)
+    digits = codes[:, :26] - np.uint8(ord('0'))  # uint8: غير الأرقام تصبح >= 10
+
+    # YYYY-MM-DD ثم الوقت اختياري: 10، 16، 19، أو 21-26 (كسور حتى microseconds مثل pandas)
+    ok &= _CORE_LENGTHS[core]
+    ok &= (codes[:, 4] == ord('-')) & (codes[:, 7] == ord('-'))
+    has_time = core > 10
+    if has_time.any():
+        ok &= ~has_time | (((codes[:, 10] == ord('T')) | (codes[:, 10] == ord(' '))) & (codes[:, 13] == ord(':')))
+        ok &= (core < 19) | (codes[:, 16] == ord(':'))
+        ok &= (core < 21) | (codes[:, 19] == ord('.'))
+        positions = _DIGIT_POSITIONS
+    else:
+        positions = _DIGIT_POSITIONS[:8]
+    ok &= ((digits[:, positions] < 10) | (positions >= core[:, None])).all(axis=1)
+
+    def number(*cols):
+        value = digits[:, cols[0]].astype(np.int32)
+        for col in cols[1:]:
+            value = value * 10 + digits[:, col]
+        return value
+
+    year, month, day = number(0, 1, 2, 3), number(5, 6), number(8, 9)
+    ok &= (year >= MIN_YEAR) & (year <= MAX_YEAR) & (month >= 1) & (month <= 12)
+    seconds = (day.astype(np.int64) - 1) * 86_400 - offset_seconds
+    micros = 0
+    if has_time.any():
+        fraction = _FRACTION_POSITIONS < core[:, None]
+        ok &= ((digits[:, 20:26] < 10) | ~fraction).all(axis=1)
+        hour = np.where(has_time, number(11, 12), 0)
+        minute = np.where(has_time, number(14, 15), 0)
+        second = np.where(core >= 19, number(17, 18), 0)
+        ok &= (hour < 24) & (minute < 60) & (second < 60)
+        seconds += hour * 3600 + minute * 60 + second
+        micros = (np.where(fraction, digits[:, 20:26], 0) * _FRACTION_SCALE).sum(axis=1)
+
+    month = np.where(ok, month, 1)
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    ok &= (day >= 1) & (day <= _DAYS_IN_MONTH[month] + ((month == 2) & leap))
+
+    seconds += _days_from_civil(year, month) * 86_400
+    parsed = (seconds * 10**6 + micros).astype('datetime64[us]')
+    parsed[~ok] = np.datetime64('NaT')
+    return parsed, ok
+
+
+def _flexible_scalar_days(value, now):
+    try:
+        parsed = pd.to_datetime(value)
+        if not isinstance(parsed, pd.Timestamp):
+            return 0  # NaT ('' و None)، أو قائمة تواريخ بدل تاريخ واحد
+        if parsed.tzinfo is not None:
+            parsed = parsed.tz_convert('UTC').tz_localize(None)
+        return (now - parsed).days
+    except Exception:
+        return 0
+
+
+def flexible_days(values, now):
+    """المحلل المرن pd.to_datetime(format='mixed') - أي صيغة يفهمها pandas، وغير الصالح 0"""
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.float64)
+    try:
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='mixed')
+        if parsed.dt.tz is not None:
+            parsed = parsed.dt.tz_convert('UTC').dt.tz_localize(None)
+        days = (now - parsed).dt.days
+    except Exception:
+        # مناطق زمنية مختلطة أو قيم غير نصية: كل قيمة على حدة
+        return np.array([_flexible_scalar_days(v, now) for v in values], dtype=np.float64)
+    return days.fillna(0).to_numpy(dtype=np.float64)
+
+
+def flexible_dates(values):
+    """flexible_days لكن التواريخ نفسها (datetime64[us]، NaT لغير الصالح)"""
+    try:
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='mixed')
+        if parsed.dt.tz is not None:
+            parsed = parsed.dt.tz_convert('UTC').dt.tz_localize(None)
+        return parsed.to_numpy(dtype='datetime64[us]')
+    except Exception:
+        dates = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[us]')
+        for i, value in enumerate(values):
+            try:
+                date = pd.to_datetime(value)
+                if isinstance(date, pd.Timestamp):
+                    dates[i] = (date.tz_convert('UTC').tz_localize(None) if date.tzinfo else date).to_datetime64()
+            except Exception:
+                pass
+        return dates
+
+
+def _needs_parser(value):
+    # None و '' و NaN -> 0 مباشرة
+    return value is not None and value != '' and not (isinstance(value, float) and value != value)
+
+
+def days_since(values, now=None):
+    """الأيام منذ كل تاريخ حتى now (floor مثل Timedelta.days) - التواريخ الغائبة أو غير الصالحة تصبح 0
+
+    ISO-8601 بالمسار السريع، والصفوف التي لا تطابقه فقط تمر على flexible_days.
+    """
+    now = pd.Timestamp.now() if now is None else now
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.float64)
+    parsed, iso = parse_iso(values)
+    with np.errstate(invalid='ignore'):  # NaT
+        days = ((np.datetime64(now.to_datetime64(), 'us') - parsed) // np.timedelta64(1, 'D')).astype(np.float64)
+    days[~iso] = 0
+    pending = [i for i in np.flatnonzero(~iso).tolist() if _needs_parser(values[i])]
+    if pending:
+        days[pending] = flexible_days([values[i] for i in pending], now)
+    return days
+
+
+def parse_dates(values):
+    """التواريخ نفسها بنفس المحللين (datetime64[us]، NaT للغائب أو غير الصالح) - لحفظها وحساب الأيام لاحقاً"""
+    parsed, iso = parse_iso(values)
+    pending = [i for i in np.flatnonzero(~iso).tolist() if _needs_parser(values[i])]
+    if pending:
+        parsed[pending] = flexible_dates([values[i] for i in pending])
+    return parsed
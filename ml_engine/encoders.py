@@ -0,0 +1,124 @@
+"""
+Categorical encoders - O(1) lookup built once from the LabelEncoder pickles
+ترميز source/agent عبر dict بدل LabelEncoder.transform في كل طلب
+
+UNKNOWN_LABEL_POLICY: ماذا يحدث لقيمة غير موجودة في LabelEncoder
+    default  ترميزها كأول class (السلوك الأصلي) مع عدّها في /api/health
+    error    خطأ لهذا الصف فقط (مثل الميزانية غير الصالحة) - الصفوف الأخرى في الدفعة تُقيَّم
+"""
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+# سياسات القيم غير المعروفة
+UNKNOWN_DEFAULT = 'default'
+UNKNOWN_ERROR = 'error'
+# الرمز الذي يرجعه encode_many / encode_categorical للقيم غير المعروفة مع سياسة error
+UNKNOWN_CODE = -1
+
+UNKNOWN_LABEL_POLICY = os.environ.get('UNKNOWN_LABEL_POLICY', UNKNOWN_DEFAULT)
+if UNKNOWN_LABEL_POLICY not in (UNKNOWN_DEFAULT, UNKNOWN_ERROR):
+    print(f"⚠️  تحذير: UNKNOWN_LABEL_POLICY={UNKNOWN_LABEL_POLICY} غير مدعوم - استخدام {UNKNOWN_DEFAULT}")
+    UNKNOWN_LABEL_POLICY = UNKNOWN_DEFAULT
+
+# أقصى عدد من القيم غير المعروفة المختلفة التي نحتفظ بعدّاد لها
+MAX_TRACKED_UNKNOWN = 100
+
+
+class CategoricalEncoder:
+    """ترميز قيمة أو مصفوفة قيم مع عدّادات للقيم غير المعروفة"""
+
+    def __init__(self, classes, name, on_unknown=UNKNOWN_LABEL_POLICY, default_code=0):
+        if on_unknown not in (UNKNOWN_DEFAULT, UNKNOWN_ERROR):
+            raise ValueError(f"on_unknown must be '{UNKNOWN_DEFAULT}' or '{UNKNOWN_ERROR}'")
+        self.name = name
+        self.classes = list(classes)
+        self.on_unknown = on_unknown
+        self.default_code = default_code
+        self._index = {label: code for code, label in enumerate(self.classes)}
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._unknown_hits = 0
+        self._unknown_labels = Counter()
+
+    @classmethod
+    def from_label_encoder(cls, label_encoder, name, **kwargs):
+        """بناء الترميز من LabelEncoder محفوظ (le_source.pkl / le_agent.pkl)"""
+        return cls(label_encoder.classes_.tolist(), name, **kwargs)
+
+    def _code(self, value):
+        try:
+            return self._index.get(value, -1)
+        except TypeError:
+            # قيم غير قابلة للـ hash مثل list أو dict
+            return -1
+
+    @property
+    def unknown_code(self):
+        """رمز القيمة غير المعروفة: default_code، أو UNKNOWN_CODE مع سياسة error"""
+        return UNKNOWN_CODE if self.on_unknown == UNKNOWN_ERROR else self.default_code
+
+    def unknown_error(self, value):
+        """رسالة خطأ الصف لقيمة غير معروفة (سياسة error)"""
+        return f'Unknown {self.name} label: {value!r}'
+
+    def encode(self, value):
+        """ترميز قيمة واحدة - ValueError لقيمة غير معروفة مع سياسة error"""
+        code = self._code(value)
+        if code < 0:
+            self._record_unknown([value], 1)
+            if self.on_unknown == UNKNOWN_ERROR:
+                raise ValueError(self.unknown_error(value))
+            return self.default_code
+        self._record_unknown((), 0, lookups=1)
+        return code
+
+    def encode_many(self, values):
+        """ترميز مصفوفة قيم دفعة واحدة - ترجع int64 array (unknown_code للقيم غير المعروفة)"""
+        code = self._code
+        codes = np.fromiter((code(v) for v in values), dtype=np.int64, count=len(values))
+        unknown = codes < 0
+        n_unknown = int(unknown.sum())
+        if n_unknown:
+            self._record_unknown([values[i] for i in np.flatnonzero(unknown)], n_unknown, lookups=len(codes))
+            codes[unknown] = self.unknown_code
+        else:
+            self._record_unknown((), 0, lookups=len(codes))
+        return codes
+
+    def encode_categorical(self, codes, categories):
+        """ترميز عمود dictionary-encoded: كل category تُرمَّز مرة واحدة ثم codes تُحوَّل بالفهرسة
+
+        codes تشير إلى مواقع في categories (بدون قيم سالبة).
+        """
+        table = np.fromiter((self._code(c) for c in categories), dtype=np.int64, count=len(categories))
+        counts = np.bincount(codes, minlength=len(categories)) if len(codes) else np.zeros(len(categories), np.int64)
+        unknown = np.flatnonzero((table < 0) & (counts > 0))
+        n_unknown = int(counts[unknown].sum())
+        self._record_unknown(
+            [categories[i] for i in unknown], n_unknown, lookups=len(codes), label_counts=counts[unknown].tolist()
+        )
+        table[table < 0] = self.unknown_code
+        return table[codes]
+
+    def _record_unknown(self, labels, count, lookups=1, label_counts=None):
+        with self._lock:
+            self._lookups += lookups
+            self._unknown_hits += count
+            for label, n in zip(labels, label_counts or [1] * len(labels)):
+                key = label if isinstance(label, str) else repr(label)
+                if key in self._unknown_labels or len(self._unknown_labels) < MAX_TRACKED_UNKNOWN:
+                    self._unknown_labels[key] += n
+
+    def stats(self):
+        """إحصائيات الترميز لعرضها في /api/health"""
+        with self._lock:
+            return {
+                'known_labels': len(self.classes),
+                'on_unknown': self.on_unknown,
+                'lookups': self._lookups,
+                'unknown_hits': self._unknown_hits,
+                'top_unknown': dict(self._unknown_labels.most_common(10))
+            }
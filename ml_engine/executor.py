@@ -0,0 +1,127 @@
+"""
+Inference executor - keep CPU-bound model work off the event loop
+طبقة تنفيذ موحدة لكل استدعاءات النماذج: thread pool (افتراضي) أو process pool مع backpressure
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ml_engine.metrics import call_collecting, current_endpoint, record_collected
+
+# thread: خيوط في نفس العملية | process: عمليات fork تتشارك النماذج المحملة (copy-on-write)
+# inline: التنفيذ مباشرة على الـ event loop (السلوك القديم - للمقارنة فقط)
+INFERENCE_EXECUTOR = os.environ.get('INFERENCE_EXECUTOR', 'thread')
+EXECUTOR_KINDS = ('thread', 'process', 'inline')
+EXECUTOR_WORKERS = int(os.environ.get('EXECUTOR_WORKERS', min(4, os.cpu_count() or 1)))
+
+# أقصى عدد مهام (قيد التنفيذ + في الانتظار) قبل رفض الطلب بـ 503
+EXECUTOR_MAX_QUEUE = int(os.environ.get('EXECUTOR_MAX_QUEUE', 32))
+EXECUTOR_RETRY_AFTER = int(os.environ.get('EXECUTOR_RETRY_AFTER', 1))
+WAIT_POLL_SECONDS = 0.005
+
+
+class ExecutorBusy(Exception):
+    """الطابور ممتلئ - يتحول إلى 503 مع Retry-After"""
+
+    def __init__(self, retry_after):
+        super().__init__('Inference queue is full, retry later')
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """تشغيل دوال الاستدلال في pool مع حد أقصى للطابور"""
+
+    def __init__(self, kind=INFERENCE_EXECUTOR, max_workers=EXECUTOR_WORKERS, max_queue=EXECUTOR_MAX_QUEUE,
+                 retry_after=EXECUTOR_RETRY_AFTER, before_start=None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f'INFERENCE_EXECUTOR must be one of {EXECUTOR_KINDS}')
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        # process pool: يُستدعى قبل fork (مثلاً انتظار تحميل كل النماذج)
+        self.before_start = before_start
+        self._pool = None
+        self._starting = None
+        self._in_flight = 0
+        self._stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'max_in_flight': 0}
+
+    async def _get_pool(self):
+        if self._pool is not None:
+            return self._pool
+        if self.kind == 'thread':
+            self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix='inference')
+            return self._pool
+        # process: fork بعد اكتمال تحميل النماذج حتى ترثها العمليات الفرعية
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._start_process_pool())
+        return await asyncio.shield(self._starting)
+
+    async def _start_process_pool(self):
+        if self.before_start is not None:
+            await asyncio.to_thread(self.before_start)
+        self._pool = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('fork'))
+        return self._pool
+
+    @property
+    def busy(self):
+        return self._in_flight >= self.max_queue
+
+    async def run(self, fn, *args, wait=False):
+        """تنفيذ fn(*args) خارج الـ event loop - ExecutorBusy إذا كان الطابور ممتلئاً
+
+        wait=True: انتظار مكان في الطابور بدل الرفض (للـ streams التي بدأت إرسال الاستجابة)
+        """
+        while wait and self.busy:
+            await asyncio.sleep(WAIT_POLL_SECONDS)
+        if self.busy:
+            self._stats['rejected'] += 1
+            raise ExecutorBusy(self.retry_after)
+
+        self._in_flight += 1
+        self._stats['submitted'] += 1
+        self._stats['max_in_flight'] = max(self._stats['max_in_flight'], self._in_flight)
+        try:
+            if self.kind == 'inline':
+                result = fn(*args)
+            elif self.kind == 'thread':
+                # نفس الـ ContextVars (endpoint للمقاييس) داخل الخيط
+                pool = await self._get_pool()
+                context = contextvars.copy_context()
+                result = await asyncio.get_running_loop().run_in_executor(pool, context.run, fn, *args)
+            else:
+                # أزمنة المراحل في العملية الفرعية تعود مع النتيجة
+                pool = await self._get_pool()
+                result, collected = await asyncio.get_running_loop().run_in_executor(
+                    pool, call_collecting, current_endpoint(), fn, *args
+                )
+                record_collected(collected)
+            self._stats['completed'] += 1
+            return result
+        except Exception:
+            self._stats['failed'] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    def restart(self):
+        """إعادة إنشاء الـ pool (مثلاً بعد إعادة تحميل النماذج في وضع process)"""
+        pool, self._pool, self._starting = self._pool, None, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def stats(self):
+        return dict(
+            self._stats,
+            kind=self.kind,
+            workers=self.max_workers,
+            max_queue=self.max_queue,
+            in_flight=self._in_flight
+        )
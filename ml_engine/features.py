@@ -0,0 +1,216 @@
+"""
+Lead feature pipeline - one vectorized path for every lead-scoring endpoint
+بناء ميزات Lead Scoring من أعمدة: مصفوفة float32 متجاورة (n, 5) + قناع الصفوف الصالحة + رسالة خطأ لكل صف
+
+كل endpoints التقييم (عميل واحد، دفعة JSON، stream NDJSON/CSV، الصيغة الثنائية) في Flask و FastAPI
+تمر من lead_features، لذا أي تحسين هنا يصل للجميع. كل عمود يمكن أن يكون:
+    قائمة قيم Python    (JSON، CSV، pydantic)
+    ndarray             (الصيغة الثنائية: أعداد، أو datetime64 لـ created_at)
+    Categorical         (نصوص مرمّزة: codes + categories)
+    None                (عمود غائب: القيمة الافتراضية لكل الصفوف)
+
+float32 هو النوع الذي تحوّل إليه كل الـ backends الميزات قبل التنبؤ، فلا نسخ إضافي ولا تغيير في الدرجات.
+"""
+import numpy as np
+import pandas as pd
+
+from ml_engine.dates import days_since
+from ml_engine.encoders import UNKNOWN_CODE
+from ml_engine.metrics import stage
+
+DEFAULT_SOURCE = 'الموقع الإلكتروني'
+DEFAULT_AGENT = 'غير محدد'
+
+FEATURE_NAMES = ('source', 'agent', 'tags_count', 'days_since_created', 'budget')
+FEATURE_DTYPE = np.float32
+
+BUDGET_ERROR = 'budget must be a finite number'
+
+# العميل المرسل بهذه الحقول فقط ({"id": 42}) يأخذ ميزاته من مخزن الدرجات (ml_engine.score_store)
+ID_ONLY_FIELDS = frozenset(('id', 'name'))
+
+
+class Categorical:
+    """عمود نصي مرمّز: codes (مصفوفة أعداد صحيحة) + categories (قائمة نصوص)"""
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = list(categories)
+
+    @classmethod
+    def from_values(cls, values):
+        """ترميز قائمة نصوص (None = غائبة)"""
+        codes, categories = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+        return cls(codes.astype(np.int32), [str(c) for c in categories])
+
+    def __len__(self):
+        return len(self.codes)
+
+    def values(self):
+        """القيم كقائمة Python (None للغائبة)"""
+        labels = np.array(self.categories + [None], dtype=object)
+        return labels[self.codes].tolist()
+
+
+def record_columns(records):
+    """قائمة dicts (JSON، NDJSON، CSV) -> أعمدة - الحقل الغائب يأخذ القيمة الافتراضية"""
+    return {
+        'source': [record.get('source', DEFAULT_SOURCE) for record in records],
+        'agent': [record.get('agent', DEFAULT_AGENT) for record in records],
+        'tags': [record.get('tags', []) for record in records],
+        'created_at': [record.get('createdAt') for record in records],
+        'budget': [record.get('budget', 0) for record in records]
+    }
+
+
+def id_only_mask(records):
+    """قناع العملاء المرسلين بالمعرّف فقط (None إذا لم يوجد أي منهم)"""
+    mask = np.fromiter(
+        (type(r) is dict and len(r) <= len(ID_ONLY_FIELDS) and r.get('id') is not None and r.keys() <= ID_ONLY_FIELDS
+         for r in records),
+        dtype=bool, count=len(records)
+    )
+    return mask if mask.any() else None
+
+
+def row_count(columns):
+    return next((len(column) for column in columns.values() if column is not None), 0)
+
+
+def take_rows(columns, rows):
+    """نفس الأعمدة لمجموعة صفوف (rows: مصفوفة مواقع)"""
+    taken = {}
+    for name, column in columns.items():
+        if column is None:
+            taken[name] = None
+        elif isinstance(column, Categorical):
+            taken[name] = Categorical(column.codes[rows], column.categories)
+        elif isinstance(column, np.ndarray):
+            taken[name] = column[rows]
+        else:
+            taken[name] = [column[i] for i in rows.tolist()]
+    return taken
+
+
+def _is_array(column, kinds):
+    return isinstance(column, np.ndarray) and column.dtype.kind in kinds
+
+
+def encode_column(encoder, column, default_label, n):
+    """source/agent: Categorical بالفهرسة (الغائب = القيمة الافتراضية)، أو قائمة نصوص عبر encode_many"""
+    if column is None:
+        column = Categorical(np.full(n, -1, dtype=np.int32), [])
+    if isinstance(column, Categorical):
+        codes = np.where(column.codes < 0, len(column.categories), column.codes)
+        return encoder.encode_categorical(codes, column.categories + [default_label])
+    if isinstance(column, np.ndarray):
+        raise ValueError(f'{encoder.name} must be a categorical column')
+    return encoder.encode_many(column)
+
+
+def unknown_label_errors(encoder, column, codes, default_label, errors):
+    """رسالة خطأ لكل صف رمزه UNKNOWN_CODE (سياسة error في ml_engine.encoders) - باقي الصفوف لا تتأثر"""
+    for i in np.flatnonzero(codes == UNKNOWN_CODE).tolist():
+        if isinstance(column, Categorical):
+            value = column.categories[column.codes[i]] if column.codes[i] >= 0 else default_label
+        else:
+            value = default_label if column is None else column[i]
+        errors[i] = errors[i] or encoder.unknown_error(value)
+
+
+def numeric_column(column, name, n, default=0):
+    """عمود أعداد من الصيغة الثنائية"""
+    if column is None:
+        return np.full(n, default, dtype=np.float64)
+    if not _is_array(column, 'biuf'):
+        raise ValueError(f'{name} must be a numeric column')
+    return column
+
+
+def tags_count_column(columns, n):
+    """tags_count جاهز (الصيغة الثنائية) أو طول قائمة tags لكل صف (غير القائمة = 0)"""
+    if 'tags_count' in columns:
+        return numeric_column(columns['tags_count'], 'tags_count', n)
+    tags = columns.get('tags')
+    if tags is None:
+        return np.zeros(n, dtype=np.float64)
+    return np.fromiter((len(t) if isinstance(t, list) else 0 for t in tags), dtype=np.float64, count=n)
+
+
+def days_since_column(column, now, n):
+    """created_at: datetime64 (نفس floor لـ Timedelta.days، NaT -> 0) أو قائمة نصوص (ml_engine.dates)"""
+    if column is None:
+        return np.zeros(n, dtype=np.float64)
+    if not isinstance(column, (np.ndarray, Categorical)):
+        return days_since(column, now)
+    if not _is_array(column, 'M'):
+        raise ValueError('created_at must be a datetime64 column')
+    now = np.datetime64(now.to_datetime64(), 'us')
+    with np.errstate(invalid='ignore'):  # NaT
+        days = ((now - column.astype('datetime64[us]')) // np.timedelta64(1, 'D')).astype(np.float64)
+    days[np.isnat(column)] = 0
+    return days
+
+
+def to_float_column(values):
+    """تحويل الميزانية إلى float مع رسالة خطأ لكل صف غير صالح"""
+    errors = [None] * len(values)
+    try:
+        column = np.array(values, dtype=np.float64)
+        # ndim: ميزانيات كلها قوائم ([1]) تعطي مصفوفة ثنائية الأبعاد بدل خطأ
+        if column.ndim == 1 and np.isfinite(column).all():
+            return column, errors
+    except (TypeError, ValueError):
+        pass
+
+    # المسار البطيء فقط عند وجود قيم غير صالحة
+    column = np.zeros(len(values), dtype=np.float64)
+    for i, value in enumerate(values):
+        try:
+            column[i] = float(value)
+        except Exception as e:
+            errors[i] = str(e)
+            continue
+        if not np.isfinite(column[i]):
+            # النموذج لا يقبل NaN/inf - خطأ لهذا الصف فقط بدل فشل الدفعة كاملة
+            errors[i] = BUDGET_ERROR
+            column[i] = 0
+    return column, errors
+
+
+def budget_column(column, n):
+    """(الميزانية، رسالة خطأ لكل صف)"""
+    if column is None or isinstance(column, (np.ndarray, Categorical)):
+        return numeric_column(column, 'budget', n), [None] * n
+    return to_float_column(column)
+
+
+def lead_features(columns, source_encoder, agent_encoder, now=None):
+    """أعمدة العملاء -> (features float32 (n, 5)، valid (bool)، errors (None أو رسالة لكل صف))
+
+    الصفوف غير الصالحة تبقى في المصفوفة بقيم محدودة - يمرر المستدعي features[valid] فقط للنموذج.
+    """
+    now = pd.Timestamp.now() if now is None else now
+    n = row_count(columns)
+    features = np.empty((n, len(FEATURE_NAMES)), dtype=FEATURE_DTYPE)
+    with stage('encode'):
+        features[:, 0] = encode_column(source_encoder, columns.get('source'), DEFAULT_SOURCE, n)
+        features[:, 1] = encode_column(agent_encoder, columns.get('agent'), DEFAULT_AGENT, n)
+
+    with stage('features'):
+        budget, errors = budget_column(columns.get('budget'), n)
+        unknown_label_errors(source_encoder, columns.get('source'), features[:, 0], DEFAULT_SOURCE, errors)
+        unknown_label_errors(agent_encoder, columns.get('agent'), features[:, 1], DEFAULT_AGENT, errors)
+        features[:, 2] = tags_count_column(columns, n)
+        features[:, 3] = days_since_column(columns.get('created_at'), now, n)
+        with np.errstate(over='ignore', invalid='ignore'):
+            features[:, 4] = budget
+
+        # NaN/inf (أو ميزانية أكبر من مدى float32) - خطأ لهذا الصف فقط
+        valid = np.isfinite(features[:, 4])
+        for i in np.flatnonzero(~valid).tolist():
+            errors[i] = errors[i] or BUDGET_ERROR
+        features[~valid, 4] = 0
+        if errors.count(None) != n:
+            valid &= np.array([error is None for error in errors], dtype=bool)
+    return features, valid, errors
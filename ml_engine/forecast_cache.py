@@ -0,0 +1,160 @@
+"""
+Forecast cache - LRU/TTL cache for /api/sales-forecast
+كاش لنتائج التنبؤ بالمبيعات مع إعادة استخدام الأيام المشتركة بين الفترات
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from ml_engine.calendar_table import day_numbers
+from ml_engine.forecasting import predict_days
+
+# تكلفة تقريبية ثابتة لكل مدخل (المفتاح + OrderedDict + كائن المدخل)
+ENTRY_OVERHEAD_BYTES = 256
+
+DEFAULT_MAX_BYTES = int(os.environ.get('FORECAST_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+DEFAULT_TTL_SECONDS = float(os.environ.get('FORECAST_CACHE_TTL', 3600))
+
+
+class _Entry:
+    __slots__ = ('first_day', 'predictions', 'expires_at', 'nbytes')
+
+    def __init__(self, first_day, predictions, expires_at):
+        self.first_day = first_day
+        self.predictions = predictions
+        self.expires_at = expires_at
+        self.nbytes = predictions.nbytes + ENTRY_OVERHEAD_BYTES
+
+
+class ForecastCache:
+    """كاش محدود بالذاكرة - المفتاح (أول يوم، عدد الأيام، (avg_transactions، نسخة تاريخ المبيعات))"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._backend = None
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            ('hits', 'misses', 'partial_hits', 'reused_days', 'predicted_days',
+             'evictions', 'expirations', 'invalidations', 'bypassed'), 0
+        )
+
+    def invalidate(self):
+        """مسح الكاش بالكامل - يُستدعى عند إعادة تحميل النموذج"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._backend = None
+            self._stats['invalidations'] += 1
+
+    def bind(self, backend):
+        """ربط الكاش بنسخة نموذج جديدة ومسح تنبؤات النسخة السابقة"""
+        with self._lock:
+            if self._backend is not None:
+                self._stats['invalidations'] += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._backend = backend
+
+    def get_or_predict(self, backend, dates, avg_transactions, history=None):
+        """إرجاع التنبؤات من الكاش أو حساب الأيام الناقصة فقط
+
+        history (HistorySnapshot): نسخة تاريخ المبيعات جزء من المفتاح - قيمة كل يوم ثابتة لنفس النسخة
+        و avg_transactions مهما كانت الفترة المطلوبة، فإعادة استخدام الأيام المشتركة تبقى صحيحة.
+        """
+        try:
+            hash(avg_transactions)
+        except TypeError:
+            return predict_days(backend, dates, avg_transactions, history)
+
+        first_day = int(day_numbers(dates[:1])[0])
+        variant = (avg_transactions, None if history is None else history.version)
+        key = (first_day, len(dates), variant)
+        now = time.monotonic()
+
+        with self._lock:
+            if self._backend is None:
+                self._backend = backend
+            bypass = backend is not self._backend
+            if bypass:
+                self._stats['bypassed'] += 1
+        if bypass:
+            # طلب جارٍ على نسخة نموذج أقدم من المرتبطة بالكاش: بدون كاش
+            return predict_days(backend, dates, avg_transactions, history)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry.predictions
+            if entry is not None:
+                self._remove(key)
+                self._stats['expirations'] += 1
+            predictions, missing = self._fill_from_overlaps(first_day, len(dates), variant, now)
+
+        if missing.any():
+            predictions[missing] = predict_days(backend, dates[missing], avg_transactions, history)
+        predictions.flags.writeable = False
+
+        reused = len(dates) - int(missing.sum())
+        with self._lock:
+            self._stats['misses'] += 1
+            self._stats['predicted_days'] += len(dates) - reused
+            if reused:
+                self._stats['partial_hits'] += 1
+                self._stats['reused_days'] += reused
+            if backend is self._backend:
+                self._store(key, _Entry(first_day, predictions, now + self.ttl_seconds))
+        return predictions
+
+    def _fill_from_overlaps(self, first_day, n_days, variant, now):
+        # نسخ الأيام المتاحة من فترات مخزنة تتقاطع مع الفترة المطلوبة
+        predictions = np.empty(n_days, dtype=np.float64)
+        missing = np.ones(n_days, dtype=bool)
+        last_day = first_day + n_days
+        for (_, _, cached_variant), entry in self._entries.items():
+            if cached_variant != variant or entry.expires_at <= now:
+                continue
+            lo = max(first_day, entry.first_day)
+            hi = min(last_day, entry.first_day + len(entry.predictions))
+            if lo >= hi:
+                continue
+            target = slice(lo - first_day, hi - first_day)
+            predictions[target] = entry.predictions[lo - entry.first_day:hi - entry.first_day]
+            missing[target] = False
+            if not missing.any():
+                break
+        return predictions, missing
+
+    def _store(self, key, entry):
+        if entry.nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def stats(self):
+        """إحصائيات الكاش لعرضها في /api/health"""
+        with self._lock:
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+                ttl_seconds=self.ttl_seconds
+            )
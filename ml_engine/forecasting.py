@@ -0,0 +1,332 @@
+"""
+Sales Forecasting - single-pass vectorized forecast
+التنبؤ بالمبيعات لكامل الفترة باستدعاء predict واحد بدل DataFrame لكل يوم
+
+/api/sales-forecast/scenarios: عدة سيناريوهات (فترة + avg_transactions) في مصفوفة ميزات واحدة مكدسة
+واستدعاء predict واحد، مع تجميع أسبوعي/شهري بـ NumPy على كل السيناريوهات معاً.
+
+مع تاريخ مبيعات مسجل (ml_engine.sales_history) تأخذ sales_7day_avg و sales_30day_avg قيمها منه، والأيام بعد
+آخر يوم مسجل تُتنبأ تكرارياً: تنبؤ كل يوم يدخل نوافذ الأيام التالية. بدونه تبقى النافذتان 0.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from ml_engine.calendar_table import CalendarTable, compute_calendar_features, day_numbers
+from ml_engine.metrics import stage
+from ml_engine.sales_history import WINDOWS
+
+FEATURE_COLUMNS = [
+    'year', 'month', 'day', 'week', 'weekday', 'quarter',
+    'transaction_count', 'sales_7day_avg', 'sales_30day_avg'
+]
+
+AGGREGATIONS = ('day', 'week', 'month')
+DEFAULT_AVG_TRANSACTIONS = 5
+
+# أقصى عدد أيام (مجموع كل السيناريوهات) في طلب /api/sales-forecast/scenarios واحد
+FORECAST_SCENARIOS_MAX_DAYS = int(os.environ.get('FORECAST_SCENARIOS_MAX_DAYS', 100000))
+# أقصى عدد أيام بعد آخر يوم في تاريخ المبيعات (كل يوم استدعاء predict في التنبؤ التكراري)
+FORECAST_RECURSIVE_MAX_DAYS = int(os.environ.get('FORECAST_RECURSIVE_MAX_DAYS', 1830))
+
+# جدول التقويم يُحسب مرة واحدة عند بدء التشغيل (CALENDAR_TABLE_YEARS سنة قبل وبعد اليوم)
+CALENDAR_TABLE_YEARS = int(os.environ.get('CALENDAR_TABLE_YEARS', 5))
+calendar_table = CalendarTable.around(pd.Timestamp.now(), CALENDAR_TABLE_YEARS)
+
+
+def calendar_features(dates):
+    """ميزات التقويم لكل الأيام: (n, 6) year, month, day, week, weekday, quarter"""
+    features = calendar_table.lookup(dates)
+    if features is None:
+        # خارج نطاق الجدول: حساب مباشر
+        features = compute_calendar_features(dates)
+    return features
+
+
+def date_labels(dates):
+    """نصوص التواريخ 'YYYY-MM-DD' من الجدول أو عبر strftime خارج نطاقه"""
+    labels = calendar_table.lookup_labels(dates)
+    if labels is None:
+        labels = dates.strftime('%Y-%m-%d')
+    return labels
+
+
+def day_dates(days):
+    """أرقام الأيام (منذ 1970-01-01) -> DatetimeIndex"""
+    return pd.DatetimeIndex(np.asarray(days, dtype=np.int64).astype('datetime64[D]'))
+
+
+def build_forecast_features(dates, avg_transactions):
+    """بناء مصفوفة الميزات float32 (n, 9) لكل الفترة بنفس ترتيب أعمدة التدريب"""
+    features = np.zeros((len(dates), len(FEATURE_COLUMNS)), dtype=np.float32)
+    features[:, :6] = calendar_features(dates)
+    features[:, 6] = avg_transactions
+    # sales_7day_avg و sales_30day_avg تبقى 0 (بدون تاريخ مبيعات)
+    return features
+
+
+def forecast_dates(start_date, end_date):
+    """الأيام المطلوبة في الفترة"""
+    dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    if len(dates) == 0:
+        raise ValueError('end_date must be on or after start_date')
+    return dates
+
+
+def clip_sales(predictions):
+    """القص عند 0 والتقريب"""
+    return np.round(np.maximum(predictions.astype(np.float64), 0), 2)
+
+
+def predict_features(backend, features):
+    """predict واحد على مصفوفة الميزات - بعد القص عند 0 والتقريب"""
+    with stage('inference', rows=len(features), model='sales_forecasting'):
+        predictions = backend.predict(features)
+    return clip_sales(predictions)
+
+
+def recursive_forecast(backend, history, transactions, horizon, max_days=FORECAST_RECURSIVE_MAX_DAYS):
+    """(قيم avg_transactions، horizon): الأيام التالية لآخر يوم مسجل - خطوة لكل يوم لكل القيم معاً
+
+    تنبؤ كل يوم يدخل نافذتي الأيام التالية بـ O(1) (يُضاف الجديد ويُطرح الخارج من النافذة) في نفس
+    مصفوفة الميزات - بدون DataFrame ولا إعادة بناء ميزات التقويم.
+    """
+    if horizon > max_days:
+        raise ValueError(f'forecast ends {horizon} days after the last sales history day, the limit is {max_days}')
+    longest = WINDOWS[-1]
+    n = len(transactions)
+    # آخر 30 يوماً مسجلة ثم التنبؤات (الأصفار قبل أول يوم مسجل لا تدخل عدد أيام النافذة)
+    values = np.zeros((n, longest + horizon), dtype=np.float64)
+    values[:, longest - len(history.tail):longest] = history.tail
+    sums = [np.full(n, history.window_sum(window)) for window in WINDOWS]
+    with stage('features'):
+        calendar = calendar_features(day_dates(np.arange(horizon) + history.last_day + 1))
+    features = np.zeros((n, len(FEATURE_COLUMNS)), dtype=np.float32)
+    features[:, 6] = transactions
+    with stage('inference', rows=n * horizon, model='sales_forecasting'):
+        for t in range(horizon):
+            recorded = len(history) + t
+            features[:, :6] = calendar[t]
+            for j, window in enumerate(WINDOWS):
+                features[:, 7 + j] = sums[j] / min(window, recorded)
+            position = longest + t
+            values[:, position] = clip_sales(backend.predict(features))
+            for j, window in enumerate(WINDOWS):
+                sums[j] += values[:, position] - values[:, position - window]
+    return values[:, longest:]
+
+
+def history_forecast(backend, history, days, transactions):
+    """التنبؤ بنوافذ المبيعات من التاريخ (HistorySnapshot) لعدة سلاسل أيام - قائمة تنبؤات لكل سلسلة
+
+    days: أرقام أيام مرتبة لكل سلسلة، transactions: avg_transactions لكل سلسلة.
+    الأيام حتى آخر يوم مسجل: النوافذ من المجاميع التراكمية - predict واحد لكل السلاسل.
+    بعده: recursive_forecast من اليوم التالي لآخر يوم مسجل، مرة واحدة لكل قيمة avg_transactions.
+    """
+    transactions = np.asarray(transactions, dtype=np.float64)
+    predictions = [np.empty(len(d), dtype=np.float64) for d in days]
+    known = [d <= history.last_day for d in days]
+    counts = [int(k.sum()) for k in known]
+    if sum(counts):
+        rows = np.concatenate([d[k] for d, k in zip(days, known)])
+        with stage('features'):
+            features = np.zeros((len(rows), len(FEATURE_COLUMNS)), dtype=np.float32)
+            features[:, :6] = calendar_features(day_dates(rows))
+            features[:, 6] = np.repeat(transactions, counts)
+            features[:, 7:] = history.windows(rows)
+        values = np.split(predict_features(backend, features), np.cumsum(counts)[:-1])
+        for p, k, v in zip(predictions, known, values):
+            p[k] = v
+
+    pending = [i for i, k in enumerate(known) if not k.all()]
+    if pending:
+        horizon = max(int(days[i][-1]) for i in pending) - history.last_day
+        unique, inverse = np.unique(transactions[pending], return_inverse=True)
+        future = recursive_forecast(backend, history, unique, horizon)
+        for i, row in zip(pending, inverse.tolist()):
+            later = ~known[i]
+            predictions[i][later] = future[row, days[i][later] - history.last_day - 1]
+    return predictions
+
+
+def predict_days(backend, dates, avg_transactions, history=None):
+    """التنبؤ لأيام محددة - بعد القص عند 0 والتقريب (history: HistorySnapshot للنوافذ)"""
+    if history is not None:
+        return history_forecast(backend, history, [day_numbers(dates)], [avg_transactions])[0]
+    with stage('features'):
+        features = build_forecast_features(dates, avg_transactions)
+    return predict_features(backend, features)
+
+
+def transactions_value(value):
+    """avg_transactions كرقم محدود - null و NaN والنصوص والقوائم خطأ (NaN يعني قيمة مفقودة لـ XGBoost)"""
+    if isinstance(value, (list, dict)):
+        value = None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        value = float('nan')
+    if not np.isfinite(value):
+        raise ValueError('avg_transactions must be a finite number')
+    return value
+
+
+def forecast_sales(backend, start_date, end_date, avg_transactions, cache=None, history=None):
+    """التنبؤ لكل يوم في الفترة - ترجع (dates, predictions)"""
+    # قبل بناء الميزات والكاش: avg_transactions غير الصالح ValueError (400)
+    avg_transactions = transactions_value(avg_transactions)
+    dates = forecast_dates(start_date, end_date)
+    if cache is None:
+        return dates, predict_days(backend, dates, avg_transactions, history)
+    return dates, cache.get_or_predict(backend, dates, avg_transactions, history)
+
+
+def forecast_totals(predictions):
+    """total_forecast و average_daily - المتوسط من المجموع المقرّب كما في الاستجابة الأصلية (JSON والصيغة الثنائية)"""
+    total_forecast = round(float(predictions.sum()), 2)
+    return {'total_forecast': total_forecast, 'average_daily': round(total_forecast / len(predictions), 2)}
+
+
+def forecast_response(dates, predictions):
+    """تجميع الاستجابة من المصفوفات مباشرة"""
+    return {
+        'success': True,
+        'predictions': [
+            {'date': date, 'predicted_sales': value}
+            for date, value in zip(date_labels(dates), predictions.tolist())
+        ],
+        **forecast_totals(predictions)
+    }
+
+
+def scenario_list(data, default_start, default_end):
+    """جسم الطلب -> قائمة سيناريوهات (start_date, end_date, avg_transactions)
+
+    scenarios: قائمة {"start_date", "end_date", "avg_transactions"} (الغائب يأخذ القيمة الافتراضية)
+    avg_transactions_grid: قيم avg_transactions على نفس الفترة start_date..end_date
+    """
+    start_date = data.get('start_date') or default_start
+    end_date = data.get('end_date') or default_end
+    scenarios = []
+    for scenario in data.get('scenarios') or []:
+        if not isinstance(scenario, dict):
+            raise ValueError('each scenario must be an object')
+        scenarios.append((
+            scenario.get('start_date') or start_date,
+            scenario.get('end_date') or end_date,
+            transactions_value(scenario.get('avg_transactions', DEFAULT_AVG_TRANSACTIONS))
+        ))
+    grid = data.get('avg_transactions_grid')
+    if grid is not None:
+        if not isinstance(grid, list):
+            raise ValueError('avg_transactions_grid must be a list')
+        scenarios.extend((start_date, end_date, transactions_value(value)) for value in grid)
+    if not scenarios:
+        raise ValueError('scenarios or avg_transactions_grid is required')
+    return scenarios
+
+
+def forecast_scenarios(backend, scenarios, max_days=FORECAST_SCENARIOS_MAX_DAYS, history=None):
+    """كل السيناريوهات باستدعاء predict واحد - ترجع (dates لكل سيناريو، offsets، predictions مكدسة)
+
+    predictions[offsets[i]:offsets[i + 1]] هي أيام السيناريو i. الفترات المكررة (شبكة avg_transactions)
+    تُحسب ميزات تقويمها مرة واحدة. مع history: الأيام بعد آخر يوم مسجل خطوة لكل يوم لكل السيناريوهات معاً.
+    """
+    windows = {}
+    for start_date, end_date, _ in scenarios:
+        if (start_date, end_date) not in windows:
+            windows[start_date, end_date] = forecast_dates(start_date, end_date)
+    dates = [windows[start_date, end_date] for start_date, end_date, _ in scenarios]
+    lengths = np.array([len(d) for d in dates], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    if offsets[-1] > max_days:
+        raise ValueError(f'scenarios cover {offsets[-1]} days, the limit is {max_days}')
+    if history is not None:
+        predictions = history_forecast(
+            backend, history, [day_numbers(d) for d in dates], [tx for _, _, tx in scenarios]
+        )
+        return dates, offsets, np.concatenate(predictions)
+
+    with stage('features'):
+        features = np.zeros((offsets[-1], len(FEATURE_COLUMNS)), dtype=np.float32)
+        calendar = {}
+        for i, (start_date, end_date, _) in enumerate(scenarios):
+            window = (start_date, end_date)
+            if window not in calendar:
+                calendar[window] = calendar_features(dates[i])
+            features[offsets[i]:offsets[i + 1], :6] = calendar[window]
+        features[:, 6] = np.repeat([tx for _, _, tx in scenarios], lengths)
+        # sales_7day_avg و sales_30day_avg تبقى 0 (بدون تاريخ مبيعات)
+    return dates, offsets, predict_features(backend, features)
+
+
+def aggregate_periods(dates, offsets, predictions, aggregate):
+    """تجميع أسبوعي (يبدأ الاثنين) أو شهري لكل السيناريوهات معاً بـ np.add.reduceat
+
+    ترجع (scenario، أول يوم، آخر يوم (datetime64[D])، عدد الأيام، المجموع) لكل فترة، مرتبة حسب السيناريو.
+    """
+    if aggregate not in AGGREGATIONS[1:]:
+        raise ValueError(f'aggregate must be one of {", ".join(AGGREGATIONS)}')
+    days = np.concatenate([day_numbers(d) for d in dates])
+    if aggregate == 'week':
+        keys = (days + 3) // 7  # 1970-01-01 خميس
+    else:
+        keys = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    scenario = np.repeat(np.arange(len(dates)), np.diff(offsets))
+    changed = (keys[1:] != keys[:-1]) | (scenario[1:] != scenario[:-1])
+    starts = np.flatnonzero(np.concatenate(([True], changed)))
+    ends = np.append(starts[1:], len(days)) - 1
+    totals = np.round(np.add.reduceat(predictions, starts), 2)
+    return (scenario[starts], days[starts].astype('datetime64[D]'), days[ends].astype('datetime64[D]'),
+            ends - starts + 1, totals)
+
+
+def period_labels(first, aggregate):
+    """بداية كل فترة: اثنين الأسبوع (datetime64[D]) أو الشهر (datetime64[M])"""
+    if aggregate == 'month':
+        return first.astype('datetime64[M]')
+    days = first.astype(np.int64)
+    return ((days + 3) // 7 * 7 - 3).astype('datetime64[D]')
+
+
+def scenario_summaries(scenarios, dates, offsets, predictions):
+    """الفترة و avg_transactions والمجموع ومتوسط اليوم لكل سيناريو"""
+    totals = np.round(np.add.reduceat(predictions, offsets[:-1]), 2)
+    averages = np.round(totals / np.diff(offsets), 2)
+    return [
+        {
+            'start_date': str(date_labels(d[:1])[0]),
+            'end_date': str(date_labels(d[-1:])[0]),
+            'avg_transactions': tx,
+            'days': len(d),
+            'total_forecast': total,
+            'average_daily': average
+        }
+        for d, (_, _, tx), total, average in zip(dates, scenarios, totals.tolist(), averages.tolist())
+    ]
+
+
+def scenarios_response(scenarios, dates, offsets, predictions, aggregate='day', include_daily=True):
+    """استجابة /api/sales-forecast/scenarios: سلسلة يومية و/أو فترات ومجاميع لكل سيناريو"""
+    results = scenario_summaries(scenarios, dates, offsets, predictions)
+    if include_daily:
+        values = predictions.tolist()
+        for i, (result, d) in enumerate(zip(results, dates)):
+            result['predictions'] = [
+                {'date': date, 'predicted_sales': value}
+                for date, value in zip(date_labels(d), values[offsets[i]:offsets[i + 1]])
+            ]
+    if aggregate != 'day':
+        scenario, first, last, days, sums = aggregate_periods(dates, offsets, predictions, aggregate)
+        labels = np.datetime_as_string(period_labels(first, aggregate))
+        for result in results:
+            result['periods'] = []
+        for i, label, start, end, n, total in zip(
+            scenario.tolist(), labels.tolist(), np.datetime_as_string(first).tolist(),
+            np.datetime_as_string(last).tolist(), days.tolist(), sums.tolist()
+        ):
+            results[i]['periods'].append(
+                {'period': label, 'start_date': start, 'end_date': end, 'days': n, 'predicted_sales': total}
+            )
+    return {'success': True, 'aggregate': aggregate, 'scenarios': results}
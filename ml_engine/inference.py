@@ -0,0 +1,123 @@
+"""
+Inference backends - native XGBoost booster path
+تشغيل النماذج مباشرة عبر Booster.inplace_predict بدل واجهة sklearn
+
+نموذج Lead Scoring هو GradientBoostingClassifier من sklearn (وليس XGBoost)،
+لذلك يمر عبر SklearnBackend بمصفوفة float32 متصلة (نفس النوع الذي تحوّل إليه sklearn داخلياً).
+"""
+import os
+
+import numpy as np
+
+from ml_engine.compiled_trees import compile_model, probe_features
+
+# عدد الخيوط للدفعات الكبيرة (الصف الواحد يستخدم خيطاً واحداً دائماً)
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', os.cpu_count() or 1))
+
+# native: XGBoost inplace_predict / sklearn | compiled: مصفوفات nodes مسطحة (ml_engine.compiled_trees)
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'native')
+
+# compiled أسرع للصفوف القليلة فقط - الدفعات الأكبر من هذا الحد تذهب للمكتبة الأصلية
+COMPILED_MAX_ROWS = int(os.environ.get('COMPILED_MAX_ROWS', 64))
+
+# من هذا العدد من الصفوف فما فوق نستخدم INFERENCE_THREADS خيطاً
+INFERENCE_PARALLEL_MIN_ROWS = int(os.environ.get('INFERENCE_PARALLEL_MIN_ROWS', 1024))
+
+
+def as_float32(features):
+    """مصفوفة float32 متصلة (C-contiguous) بدون نسخ إذا كانت كذلك أصلاً"""
+    return np.ascontiguousarray(features, dtype=np.float32)
+
+
+class XGBoostBackend:
+    """Booster.inplace_predict مع نسختين من الـ booster: خيط واحد وعدة خيوط"""
+
+    name = 'xgboost-inplace'
+
+    def __init__(self, model, threads=INFERENCE_THREADS, parallel_min_rows=INFERENCE_PARALLEL_MIN_ROWS):
+        self.model = model
+        self.parallel_min_rows = parallel_min_rows
+        booster = model.get_booster()
+        # نسخ منفصلة حتى لا يتغير nthread أثناء طلبات متزامنة
+        self._single = booster.copy()
+        self._single.set_param({'nthread': 1})
+        self._parallel = booster.copy()
+        self._parallel.set_param({'nthread': max(1, threads)})
+        best_iteration = getattr(model, 'best_iteration', None)
+        self._iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+
+    def _booster_for(self, n_rows):
+        return self._parallel if n_rows >= self.parallel_min_rows else self._single
+
+    def predict(self, features):
+        """ناتج النموذج الخام (regression) لكل صف"""
+        features = as_float32(features)
+        return self._booster_for(len(features)).inplace_predict(
+            features, iteration_range=self._iteration_range, validate_features=False
+        )
+
+    def predict_positive_proba(self, features):
+        """احتمال الفئة الموجبة لنماذج binary:logistic"""
+        return self.predict(features)
+
+
+class SklearnBackend:
+    """واجهة sklearn مع مصفوفة float32 متصلة"""
+
+    name = 'sklearn'
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, features):
+        return self.model.predict(as_float32(features))
+
+    def predict_positive_proba(self, features):
+        return self.model.predict_proba(as_float32(features))[:, 1]
+
+
+class CompiledBackend:
+    """CompiledEnsemble للطلبات الصغيرة، والـ backend الأصلي للدفعات الكبيرة"""
+
+    name = 'compiled'
+
+    def __init__(self, compiled, fallback, max_rows=COMPILED_MAX_ROWS):
+        self.compiled = compiled
+        self.fallback = fallback
+        self.max_rows = max_rows
+
+    def _engine_for(self, features):
+        return self.compiled if len(features) <= self.max_rows else self.fallback
+
+    def predict(self, features):
+        return self._engine_for(features).predict(features)
+
+    def predict_positive_proba(self, features):
+        return self._engine_for(features).predict_positive_proba(features)
+
+
+def _native_backend(model):
+    if hasattr(model, 'get_booster'):
+        return XGBoostBackend(model)
+    return SklearnBackend(model)
+
+
+def _compiled_backend(model, reference):
+    """CompiledEnsemble بعد التحقق من تطابقه مع النموذج الأصلي على بيانات فحص"""
+    compiled = compile_model(model)
+    probe = probe_features(compiled)
+    if not np.array_equal(compiled.predict_positive_proba(probe), reference.predict_positive_proba(probe)):
+        raise ValueError('compiled predictions differ from the original model')
+    return CompiledBackend(compiled, reference)
+
+
+def make_backend(model, engine=INFERENCE_ENGINE):
+    """اختيار backend للنموذج - compiled يرجع إلى native إذا لم يكن النموذج مدعوماً"""
+    backend = _native_backend(model)
+    if engine != 'compiled':
+        return backend
+    try:
+        return _compiled_backend(model, backend)
+    except ValueError as e:
+        print(f"⚠️  تحذير: compiled engine غير متاح لـ {type(model).__name__}: {e}")
+        return backend
@@ -0,0 +1,89 @@
+"""
+Lead Scoring - vectorized batch engine
+محرك Lead Scoring: مصفوفة ميزات واحدة واستدعاء predict_proba واحد لكل الدفعة
+"""
+import numpy as np
+import pandas as pd
+
+from ml_engine.features import (  # noqa: F401
+    DEFAULT_AGENT, DEFAULT_SOURCE, FEATURE_DTYPE, FEATURE_NAMES, lead_features, take_rows
+)
+from ml_engine.metrics import stage
+
+PRIORITY_LABELS = np.array(['Low', 'Medium', 'High'], dtype=object)
+
+
+def priority_for(score):
+    """تحويل الدرجة إلى أولوية"""
+    return 'High' if score > 70 else 'Medium' if score > 40 else 'Low'
+
+
+def priorities_for(scores):
+    """priority_for لعمود كامل"""
+    return PRIORITY_LABELS[np.where(scores > 70, 2, np.where(scores > 40, 1, 0))]
+
+
+def score_features(backend, features):
+    """استدعاء predict_proba واحد لكل الصفوف وإرجاع الدرجات (0-100)"""
+    if len(features) == 0:
+        return np.zeros(0, dtype=np.float64)
+    with stage('inference', rows=len(features), model='lead_scoring'):
+        return backend.predict_positive_proba(features).astype(np.float64) * 100
+
+
+def cached_scores(backend, features, cache=None, endpoint=None):
+    """score_features عبر ScoreCache إن وُجد: الصفوف غير الموجودة في الكاش فقط تمر على النموذج"""
+    if cache is None:
+        return score_features(backend, features)
+    return cache.score(backend, features, score_features, endpoint)
+
+
+def score_leads(backend, columns, source_encoder, agent_encoder, now=None, cache=None, endpoint=None,
+                store=None, ids=None, id_only=None):
+    """تقييم دفعة كاملة من أعمدة العملاء (features.lead_features): الصفوف الصالحة فقط تمر على النموذج
+
+    store (ml_engine.score_store): العملاء الموجودون فيه بنفس الميزات يأخذون الدرجة المحفوظة بالمعرّف (ids)،
+    والمرسلون بالمعرّف فقط (قناع id_only) يأخذون ميزاتهم منه بدون بناء ميزات.
+    """
+    now = pd.Timestamp.now() if now is None else now
+    found = store.lookup(backend, ids) if store is not None and ids is not None else None
+    by_id = None
+    if found is not None and id_only is not None:
+        by_id = np.asarray(id_only, dtype=bool) & (found[1] >= 0)
+        by_id = by_id if by_id.any() else None
+
+    if by_id is None:
+        features, valid, errors = lead_features(columns, source_encoder, agent_encoder, now)
+    else:
+        generation, rows = found
+        features = np.empty((len(rows), len(FEATURE_NAMES)), dtype=FEATURE_DTYPE)
+        valid = np.ones(len(rows), dtype=bool)
+        errors = [None] * len(rows)
+        features[by_id] = generation.features_at(rows[by_id], now)
+        rest = np.flatnonzero(~by_id)
+        if len(rest):
+            features[rest], valid[rest], rest_errors = lead_features(
+                take_rows(columns, rest), source_encoder, agent_encoder, now
+            )
+            for i, error in zip(rest.tolist(), rest_errors):
+                errors[i] = error
+
+    scores = np.full(len(features), np.nan)
+    pending = valid
+    if found is not None:
+        # الدرجة المحفوظة لكل صف تطابق ميزاته المخزن (والأيام نفسها أو بعدها بيوم)
+        hits = store.fill(*found, features, valid, scores, 0 if by_id is None else int(by_id.sum()))
+        pending = valid & ~hits
+    scores[pending] = cached_scores(backend, features if pending.all() else features[pending], cache, endpoint)
+    return scores, errors
+
+
+def lead_results(ids, names, scores, errors):
+    """نتائج batch-lead-scoring من المصفوفات مباشرة: التقريب والأولوية على العمود كاملاً"""
+    rounded = [round(score, 2) for score in scores.tolist()]
+    priorities = priorities_for(scores).tolist()
+    return [
+        {'lead_id': lead_id, 'name': name, 'error': error} if error is not None else
+        {'lead_id': lead_id, 'name': name, 'lead_score': score, 'priority': priority}
+        for lead_id, name, score, priority, error in zip(ids, names, rounded, priorities, errors)
+    ]
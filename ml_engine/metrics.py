@@ -0,0 +1,321 @@
+"""
+Prometheus-style metrics - request counts, latency per stage, batch sizes, model load times, RSS
+مقاييس بصيغة Prometheus النصية (بدون مكتبات إضافية) لـ GET /metrics في Flask و FastAPI
+
+    crm_ml_requests_total{endpoint,method,status}         عدد الطلبات
+    crm_ml_request_errors_total{endpoint,status}          الطلبات التي انتهت بـ 4xx/5xx
+    crm_ml_request_duration_seconds{endpoint}             زمن الطلب كاملاً (حتى آخر byte في الـ streams)
+    crm_ml_stage_duration_seconds{endpoint,stage}         parse | features | encode | inference | serialize
+    crm_ml_batch_rows{endpoint,model}                     عدد الصفوف في كل استدعاء للنموذج
+    crm_ml_model_load_seconds{model,version}              زمن تحميل + بناء + فحص النسخة الفعالة
+    process_resident_memory_bytes                         RSS للعملية
+
+المقاييس لكل عملية (كل عامل gunicorn له أرقامه مثل الكاش وإحصائيات /api/health).
+الـ endpoint يُحدد مرة واحدة في بداية الطلب (ContextVar) فتعرفه المراحل داخل ml_engine دون تمريره؛
+في INFERENCE_EXECUTOR=process تُجمع أزمنة المراحل في العملية الفرعية وتُسجَّل في العملية الرئيسية.
+"""
+import bisect
+import contextvars
+import functools
+import os
+import sys
+import threading
+import time
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ثوانٍ: من 0.1ms (مرحلة لصف واحد) حتى 10s (stream كبير)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# صفوف: 1, 4, 16, ... 65536
+BATCH_BUCKETS = tuple(4 ** k for k in range(9))
+
+OTHER_ENDPOINT = 'other'
+
+_endpoint = contextvars.ContextVar('metrics_endpoint', default=OTHER_ENDPOINT)
+_collected = contextvars.ContextVar('metrics_collected', default=None)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    """عدّاد لكل مجموعة labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(map(labels.__getitem__, self.labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, self.labels, key, value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """histogram تراكمي (_bucket / _sum / _count) لكل مجموعة labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(map(labels.__getitem__, self.labels))
+        # أول حد أكبر من أو يساوي القيمة (le)، و len(buckets) = +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts[0][index] += 1
+            counts[1] += value
+
+    def samples(self):
+        names = self.labels + ('le',)
+        with self._lock:
+            values = sorted((key, list(counts[0]), counts[1]) for key, counts in self._values.items())
+        samples = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', names, key + (_format_value(bound),), cumulative))
+            samples.append((f'{self.name}_sum', self.labels, key, round(total, 9)))
+            samples.append((f'{self.name}_count', self.labels, key, cumulative))
+        return samples
+
+
+class Gauge:
+    """قيمة تُقرأ عند كل طلب /metrics: collect() -> [(قيم الـ labels, القيمة)]"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def samples(self):
+        return [(self.name, self.labels, tuple(key), value) for key, value in self.collect()]
+
+
+class MetricsRegistry:
+    """كل المقاييس بترتيب التسجيل و render() بصيغة Prometheus"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name, documentation, labels=()):
+        """decorator: @metrics.gauge(...) def collect(): return [((label, ...), value), ...]"""
+        def decorator(collect):
+            self.register(Gauge(name, documentation, labels, collect))
+            return collect
+        return decorator
+
+    def render(self):
+        """bytes بصيغة Prometheus text exposition 0.0.4"""
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                # مقياس واحد معطل لا يُفشل /metrics كاملاً
+                lines.append(f'# {metric.name} unavailable: {e}')
+                continue
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, label_names, label_values, value in samples:
+                lines.append(f'{name}{_format_labels(label_names, label_values)} {_format_value(value)}')
+        return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+metrics = MetricsRegistry()
+
+REQUESTS = metrics.counter('crm_ml_requests_total', 'HTTP requests', ('endpoint', 'method', 'status'))
+REQUEST_ERRORS = metrics.counter('crm_ml_request_errors_total', 'HTTP requests with a 4xx/5xx status',
+                                 ('endpoint', 'status'))
+REQUEST_SECONDS = metrics.histogram('crm_ml_request_duration_seconds', 'Request latency', ('endpoint',))
+STAGE_SECONDS = metrics.histogram('crm_ml_stage_duration_seconds',
+                                  'Latency per stage (parse, features, encode, inference, serialize)',
+                                  ('endpoint', 'stage'))
+BATCH_ROWS = metrics.histogram('crm_ml_batch_rows', 'Rows per model call', ('endpoint', 'model'), BATCH_BUCKETS)
+
+
+@metrics.gauge('process_resident_memory_bytes', 'Resident memory size in bytes')
+def _resident_memory():
+    return [((), resident_memory_bytes())]
+
+
+def resident_memory_bytes():
+    """RSS الحالي من /proc (Linux)، وإلا أقصى RSS من getrusage"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def register_models(registry):
+    """crm_ml_model_load_seconds للنسخة الفعالة من كل نموذج في ModelRegistry"""
+    @metrics.gauge('crm_ml_model_load_seconds', 'Load + build + smoke test time of the active model version',
+                   ('model', 'version'))
+    def _model_load_seconds():
+        versions = (registry.get(name) for name in registry.specs)
+        return [((v.name, v.version), v.load_seconds) for v in versions if v is not None]
+    return _model_load_seconds
+
+
+# === تسجيل الطلب والمراحل ===
+
+def endpoint_label(path, known_paths):
+    """مسار معروف كما هو، وأي مسار آخر 'other' (حتى لا تنفجر أعداد الـ labels مع طلبات 404)"""
+    return path if path in known_paths else OTHER_ENDPOINT
+
+
+def start_request(endpoint):
+    """بداية الطلب: تحديد الـ endpoint للمراحل داخل ml_engine وإرجاع زمن البداية"""
+    _endpoint.set(endpoint)
+    return time.perf_counter()
+
+
+def finish_request(endpoint, method, status, started):
+    REQUESTS.inc(endpoint=endpoint, method=method, status=str(status))
+    if status >= 400:
+        REQUEST_ERRORS.inc(endpoint=endpoint, status=str(status))
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+
+
+def _record(name, seconds, rows=None, model=None):
+    collected = _collected.get()
+    if collected is not None:
+        collected.append((name, seconds, rows, model))
+        return
+    endpoint = _endpoint.get()
+    STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=name)
+    if rows is not None:
+        BATCH_ROWS.observe(rows, endpoint=endpoint, model=model)
+
+
+class stage:
+    """with stage('inference', rows=n, model='lead_scoring'): زمن مرحلة واحدة (و rows في استدعاء النموذج)
+
+    class بدل contextmanager: يُستدعى عدة مرات لكل طلب فكل ميكروثانية محسوبة.
+    """
+
+    __slots__ = ('name', 'rows', 'model', 'start')
+
+    def __init__(self, name, rows=None, model=None):
+        self.name = name
+        self.rows = rows
+        self.model = model
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _record(self.name, time.perf_counter() - self.start, self.rows, self.model)
+        return False
+
+
+def staged(name):
+    """decorator: زمن الدالة كاملة كمرحلة name"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def call_collecting(endpoint, fn, *args):
+    """تنفيذ fn في عملية فرعية وإرجاع (النتيجة، أزمنة المراحل) لتُسجَّل في العملية الرئيسية"""
+    def run():
+        _endpoint.set(endpoint)
+        collected = []
+        _collected.set(collected)
+        return fn(*args), collected
+    return contextvars.Context().run(run)
+
+
+class MetricsMiddleware:
+    """ASGI middleware (FastAPI): عدد الطلبات وزمنها حتى آخر جزء من الاستجابة
+
+    middleware خام بدل BaseHTTPMiddleware حتى لا تُقرأ الـ streams في الذاكرة.
+    paths: دالة ترجع مسارات التطبيق (تُقرأ عند أول طلب بعد تسجيل كل الـ routes).
+    """
+
+    def __init__(self, app, paths):
+        self.app = app
+        self._paths = paths
+        self._known_paths = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        if self._known_paths is None:
+            self._known_paths = frozenset(self._paths())
+        endpoint = endpoint_label(scope['path'], self._known_paths)
+        started = start_request(endpoint)
+        status = 500  # استثناء قبل بداية الاستجابة
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            finish_request(endpoint, scope['method'], status, started)
+
+
+def current_endpoint():
+    return _endpoint.get()
+
+
+def record_collected(collected):
+    for name, seconds, rows, model in collected:
+        _record(name, seconds, rows, model)
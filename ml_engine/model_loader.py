@@ -0,0 +1,203 @@
+"""
+Model loader - lazy / parallel / memory-mapped model loading
+تحميل النماذج عند أول استخدام أو بالتوازي في الخلفية مع حالة جاهزية لكل نموذج
+
+تحويل نموذج XGBoost إلى الصيغة الأصلية (أسرع في التحميل من pickle):
+    python -m ml_engine.model_loader export-native
+"""
+import os
+import sys
+import threading
+import time
+
+import joblib
+
+from ml_engine.encoders import CategoricalEncoder
+
+# eager: تحميل متسلسل قبل الخدمة | background: خيوط متوازية عند البدء | lazy: عند أول طلب
+MODEL_LOADING = os.environ.get('MODEL_LOADING', 'background')
+LOADING_MODES = ('eager', 'background', 'lazy')
+
+# مثلاً 'r' لقراءة مصفوفات numpy عبر mmap بدل نسخها في الذاكرة
+MODEL_MMAP_MODE = os.environ.get('MODEL_MMAP_MODE') or None
+
+# أقصى مدة ينتظرها الطلب حتى يجهز النموذج الذي يحتاجه
+MODEL_WAIT_TIMEOUT = float(os.environ.get('MODEL_WAIT_TIMEOUT', 60))
+
+NATIVE_XGBOOST_SUFFIX = '.ubj'
+
+
+def load_pickle(path):
+    """joblib.load مع mmap_mode الاختياري"""
+    return joblib.load(path, mmap_mode=MODEL_MMAP_MODE)
+
+
+def native_path(pickle_path):
+    return os.path.splitext(pickle_path)[0] + NATIVE_XGBOOST_SUFFIX
+
+
+def load_xgboost_regressor(path):
+    """تحميل XGBRegressor من الصيغة الأصلية (.ubj) إن وُجدت وكانت أحدث من pickle"""
+    native = native_path(path)
+    if os.path.exists(native) and os.path.getmtime(native) >= os.path.getmtime(path):
+        import xgboost
+        model = xgboost.XGBRegressor()
+        model.load_model(native)
+        return model
+    return load_pickle(path)
+
+
+class ModelSlot:
+    """نموذج واحد (أو مجموعة ملفات مرتبطة) مع حالته وزمن تحميل كل ملف"""
+
+    def __init__(self, name, loader, on_ready=None):
+        self.name = name
+        self.loader = loader
+        self.on_ready = on_ready
+        self.state = 'pending'
+        self.error = None
+        self.seconds = None
+        self.files = {}
+        self._started = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def timed(self, label, fn, *args):
+        """تنفيذ دالة تحميل وتسجيل زمنها باسم الملف"""
+        start = time.perf_counter()
+        value = fn(*args)
+        self.files[label] = round(time.perf_counter() - start, 4)
+        return value
+
+    def load(self):
+        """تحميل النموذج مرة واحدة فقط حتى لو استُدعيت من عدة خيوط"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self.state = 'loading'
+
+        start = time.perf_counter()
+        try:
+            value = self.loader(self)
+            if value is None:
+                self.state = 'missing'
+            else:
+                if self.on_ready is not None:
+                    self.on_ready(value)
+                self.state = 'ready'
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            print(f"⚠️  تحذير: لم يتم تحميل {self.name}: {e}")
+        finally:
+            self.seconds = round(time.perf_counter() - start, 4)
+            self._done.set()
+
+    def wait(self, timeout=MODEL_WAIT_TIMEOUT):
+        """انتظار انتهاء التحميل (يبدأ التحميل في الخيط الحالي إذا لم يبدأ بعد)"""
+        if not self._started:
+            self.load()
+        return self._done.wait(timeout)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def status(self):
+        return {
+            'state': self.state,
+            'seconds': self.seconds,
+            'files': dict(self.files),
+            'error': self.error
+        }
+
+
+class ModelLoader:
+    """مجموعة ModelSlot مع أوضاع التحميل eager / background / lazy"""
+
+    def __init__(self):
+        self.slots = {}
+        self.mode = None
+
+    def register(self, name, loader, on_ready=None):
+        self.slots[name] = ModelSlot(name, loader, on_ready)
+
+    def start(self, mode=MODEL_LOADING):
+        if mode not in LOADING_MODES:
+            raise ValueError(f'MODEL_LOADING must be one of {LOADING_MODES}')
+        self.mode = mode
+        if mode == 'eager':
+            for slot in self.slots.values():
+                slot.load()
+        elif mode == 'background':
+            for slot in self.slots.values():
+                threading.Thread(target=slot.load, name=f'load-{slot.name}', daemon=True).start()
+
+    def wait(self, name, timeout=MODEL_WAIT_TIMEOUT):
+        """انتظار نموذج واحد فقط - لا ينتظر الطلب نماذج لا يحتاجها"""
+        return self.slots[name].wait(timeout)
+
+    def wait_all(self, timeout=MODEL_WAIT_TIMEOUT):
+        return all(slot.wait(timeout) for slot in self.slots.values())
+
+    def is_ready(self, name):
+        return self.slots[name].done
+
+    def status(self):
+        return {name: slot.status() for name, slot in self.slots.items()}
+
+
+# === تحميل ملفات كل نموذج ===
+
+def load_lead_scoring(models_dir, slot, model_dir=None):
+    """Lead Scoring: النموذج + ترميز source/agent (model_dir: مجلد نسخة محددة بدل Lead_scoring/)"""
+    lead_dir = model_dir or os.path.join(models_dir, 'Lead_scoring')
+    model_path = os.path.join(lead_dir, 'lead_scoring_model.pkl')
+    if not os.path.exists(model_path):
+        return None
+    model = slot.timed('lead_scoring_model.pkl', load_pickle, model_path)
+    # الترميز يُبنى مرة واحدة كـ dict lookup بدل LabelEncoder.transform في كل طلب
+    source_encoder = CategoricalEncoder.from_label_encoder(
+        slot.timed('le_source.pkl', load_pickle, os.path.join(lead_dir, 'le_source.pkl')), 'source'
+    )
+    agent_encoder = CategoricalEncoder.from_label_encoder(
+        slot.timed('le_agent.pkl', load_pickle, os.path.join(lead_dir, 'le_agent.pkl')), 'agent'
+    )
+    return model, source_encoder, agent_encoder
+
+
+def load_sales_forecasting(models_dir, slot, model_dir=None):
+    """Sales Forecasting: XGBRegressor (الصيغة الأصلية إن وُجدت)"""
+    model_path = os.path.join(model_dir or os.path.join(models_dir, 'Sales_forecasting'), 'sales_forecasting_model.pkl')
+    if not os.path.exists(model_path):
+        return None
+    return slot.timed('sales_forecasting_model.pkl', load_xgboost_regressor, model_path)
+
+
+def load_customer_segmentation(models_dir, slot, model_dir=None):
+    """Customer Segmentation: KMeans + StandardScaler"""
+    seg_dir = model_dir or os.path.join(models_dir, 'Customer_segmentation')
+    model_path = os.path.join(seg_dir, 'customer_segmentation_model.pkl')
+    if not os.path.exists(model_path):
+        return None
+    model = slot.timed('customer_segmentation_model.pkl', load_pickle, model_path)
+    scaler = slot.timed(
+        'customer_segmentation_scaler.pkl', load_pickle,
+        os.path.join(seg_dir, 'customer_segmentation_scaler.pkl')
+    )
+    return model, scaler
+
+
+def export_native(models_dir):
+    """حفظ نموذج XGBoost بالصيغة الأصلية بجانب ملف pickle"""
+    model_path = os.path.join(models_dir, 'Sales_forecasting', 'sales_forecasting_model.pkl')
+    model = joblib.load(model_path)
+    model.save_model(native_path(model_path))
+    print(f"✅ {native_path(model_path)}")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['export-native']:
+        sys.exit('usage: python -m ml_engine.model_loader export-native')
+    export_native(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,23 @@
+"""
+Preload - load the models once in the gunicorn master and share them with forked workers
+تحميل النماذج مرة واحدة في العملية الرئيسية قبل fork: العمال يتشاركون نفس صفحات الذاكرة (copy-on-write)
+
+MODEL_PRELOAD=1 مع gunicorn.conf.py (preload_app) - بدونه كل عامل يحمّل نسخة كاملة من كل نموذج.
+"""
+import gc
+import os
+
+MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '0').lower() in ('1', 'true', 'yes')
+
+
+def freeze_heap():
+    """نقل كل الكائنات الحالية إلى الجيل الدائم: GC في العمال لا يكتب عليها فتبقى صفحاتها مشتركة"""
+    gc.collect()
+    gc.freeze()
+
+
+def preload_models(model_loader):
+    """تحميل كل النماذج الآن (بدون خيوط خلفية - لا يجوز fork أثناء التحميل) ثم تجميد الـ heap"""
+    model_loader.start('eager')
+    model_loader.wait_all()
+    freeze_heap()
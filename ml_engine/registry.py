@@ -0,0 +1,308 @@
+"""
+Model registry - versioned model directories, hot reload and atomic swap
+سجل النماذج: لكل نموذج نسخة فعالة واحدة (ModelVersion) تُستبدل كمرجع واحد بعد التحميل والتحقق
+
+هيكل المجلدات:
+    Lead_scoring/*.pkl                     النسخة الأساسية "base"
+    Lead_scoring/versions/<version>/*.pkl  نسخ إضافية
+    Lead_scoring/CURRENT                   اسم النسخة الفعالة (اختياري - وإلا أحدث نسخة في versions/ بالترتيب الطبيعي v2 < v10، ثم base)
+
+الطلب يأخذ المرجع مرة واحدة في بدايته: الطلبات الجارية تكمل على النسخة القديمة بعد الاستبدال.
+"""
+import hmac
+import itertools
+import os
+import re
+import threading
+import time
+import weakref
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ml_engine.forecasting import predict_days
+from ml_engine.inference import make_backend
+from ml_engine.lead_scoring import score_features
+from ml_engine.model_loader import ModelSlot, load_customer_segmentation, load_lead_scoring, load_sales_forecasting
+from ml_engine.segmentation import make_segmenter
+
+# فحص ملفات النماذج كل N ثانية وإعادة التحميل عند تغيرها (0 = معطّل)
+MODEL_WATCH_SECONDS = float(os.environ.get('MODEL_WATCH_SECONDS', 0))
+
+# إذا حُدد: POST /api/models/reload يتطلب ترويسة X-Reload-Token بنفس القيمة
+MODEL_RELOAD_TOKEN = os.environ.get('MODEL_RELOAD_TOKEN') or None
+# بدون token: إعادة التحميل مرفوضة (403) إلا إذا فُتحت صراحةً بـ MODEL_RELOAD_OPEN=1 (تطوير محلي فقط)
+MODEL_RELOAD_OPEN = os.environ.get('MODEL_RELOAD_OPEN', '0') == '1'
+
+VERSIONS_DIR = 'versions'
+CURRENT_FILE = 'CURRENT'
+BASE_VERSION = 'base'
+
+# النسخ التي ما زال يستخدمها طلب أو هي الفعالة - ModelVersion يُرسل إلى process pool كمفتاح فقط
+_live_versions = weakref.WeakValueDictionary()
+_generations = itertools.count(1)
+
+
+def _lookup_version(name, generation):
+    version = _live_versions.get((name, generation))
+    if version is None:
+        raise LookupError(f'{name} generation {generation} is no longer loaded')
+    return version
+
+
+def reload_allowed(token):
+    if MODEL_RELOAD_TOKEN is None:
+        return MODEL_RELOAD_OPEN
+    return hmac.compare_digest(token or '', MODEL_RELOAD_TOKEN)
+
+
+def version_key(name):
+    """ترتيب طبيعي لأسماء النسخ: الأرقام كأعداد (v2 قبل v10، و 2025-1-9 قبل 2025-1-10)"""
+    return [(int(part), '') if part.isdigit() else (-1, part) for part in re.split(r'(\d+)', name)]
+
+
+def _fingerprint(path):
+    """أسماء ملفات المجلد وأحجامها وأوقات تعديلها - تتغير عند استبدال أي ملف"""
+    if not os.path.isdir(path):
+        return ()
+    return tuple(sorted(
+        (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+        for entry in os.scandir(path) if entry.is_file()
+    ))
+
+
+class ModelVersion:
+    """نسخة محمّلة من نموذج: كل ما يحتاجه الطلب (model، backend، encoders...) في مرجع واحد لا يتغير"""
+
+    def __init__(self, name, version, path, fingerprint, **objects):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.fingerprint = fingerprint
+        self.generation = next(_generations)
+        self.loaded_at = time.time()
+        self.load_seconds = None
+        self.__dict__.update(objects)
+        _live_versions[(name, self.generation)] = self
+
+    def __reduce__(self):
+        # العمليات الفرعية (fork) تملك نفس النسخة - لا داعي لنسخ النموذج مع كل مهمة
+        return _lookup_version, (self.name, self.generation)
+
+    def info(self):
+        return {
+            'version': self.version,
+            'generation': self.generation,
+            'path': self.path,
+            'load_seconds': self.load_seconds,
+            'loaded_at': datetime.fromtimestamp(self.loaded_at).isoformat()
+        }
+
+
+class ModelSpec:
+    """كيف يُحمّل نموذج ويُبنى ويُتحقق منه"""
+
+    def __init__(self, name, title, subdir, load, build, smoke):
+        self.name = name
+        self.title = title
+        self.subdir = subdir
+        self.load = load
+        self.build = build
+        self.smoke = smoke
+
+
+# === بناء كائنات الطلب والتحقق بدفعة صغيرة قبل الاستبدال ===
+
+def _build_lead_scoring(bundle):
+    model, source_encoder, agent_encoder = bundle
+    return {'model': model, 'backend': make_backend(model), 'source_encoder': source_encoder,
+            'agent_encoder': agent_encoder}
+
+
+def _smoke_lead_scoring(version):
+    # ميزات مرمّزة مباشرة (بدون encoders حتى لا تتأثر عدّاداتها)
+    grid = np.array([[0, 0, tags, days, budget]
+                     for tags in (0, 3) for days in (0, 30, 400) for budget in (0, 50_000, 5_000_000)], dtype=np.float64)
+    scores = score_features(version.backend, grid)
+    if scores.shape != (len(grid),) or not np.all((scores >= 0) & (scores <= 100)):
+        raise ValueError('lead scoring smoke batch: scores must be 0-100')
+
+
+def _build_sales_forecasting(model):
+    # Booster.inplace_predict مباشرة بدل واجهة sklearn
+    return {'model': model, 'backend': make_backend(model)}
+
+
+def _smoke_sales_forecasting(version):
+    dates = pd.date_range(pd.Timestamp.now().normalize(), periods=14, freq='D')
+    predictions = predict_days(version.backend, dates, 5)
+    if predictions.shape != (len(dates),) or not np.isfinite(predictions).all():
+        raise ValueError('sales forecasting smoke batch: predictions must be finite')
+
+
+def _build_customer_segmentation(bundle):
+    model, scaler = bundle
+    # StandardScaler مدمج في مراكز KMeans
+    return {'model': model, 'scaler': scaler, 'segmenter': make_segmenter(model, scaler)}
+
+
+def _smoke_customer_segmentation(version):
+    segmenter = version.segmenter
+    features = segmenter.fill * np.linspace(0.5, 2, 8)[:, None]
+    labels, distances = segmenter.assign(features, True)
+    if labels.shape != (len(features),) or labels.min() < 0 or not np.isfinite(distances).all():
+        raise ValueError('customer segmentation smoke batch: invalid segments')
+
+
+MODEL_SPECS = (
+    ModelSpec('lead_scoring', 'Lead Scoring Model', 'Lead_scoring',
+              load_lead_scoring, _build_lead_scoring, _smoke_lead_scoring),
+    ModelSpec('sales_forecasting', 'Sales Forecasting Model', 'Sales_forecasting',
+              load_sales_forecasting, _build_sales_forecasting, _smoke_sales_forecasting),
+    ModelSpec('customer_segmentation', 'Customer Segmentation Model', 'Customer_segmentation',
+              load_customer_segmentation, _build_customer_segmentation, _smoke_customer_segmentation),
+)
+
+
+class ModelRegistry:
+    """النسخة الفعالة لكل نموذج + إعادة التحميل في الخلفية والاستبدال الذري"""
+
+    def __init__(self, models_dir, specs=MODEL_SPECS):
+        self.models_dir = models_dir
+        self.specs = {spec.name: spec for spec in specs}
+        self._current = dict.fromkeys(self.specs)
+        self._reloads = {}
+        self._attempted = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._watch_pid = None
+
+    def attach(self, model_loader):
+        """التحميل الأول عبر ModelLoader (eager / background / lazy) ثم النشر في السجل"""
+        for name in self.specs:
+            model_loader.register(name, lambda slot, name=name: self.load_version(name, slot), self.publish)
+
+    def on_swap(self, listener):
+        """listener(version, previous) بعد كل استبدال (مسح الكاش، إعادة تشغيل process pool...)"""
+        self._listeners.append(listener)
+        return listener
+
+    def get(self, name):
+        """النسخة الفعالة الآن (None قبل التحميل) - قراءة مرجع واحد"""
+        return self._current[name]
+
+    def model_dir(self, name):
+        return os.path.join(self.models_dir, self.specs[name].subdir)
+
+    def versions(self, name):
+        versions_dir = os.path.join(self.model_dir(name), VERSIONS_DIR)
+        if not os.path.isdir(versions_dir):
+            return [BASE_VERSION]
+        return [BASE_VERSION] + sorted(
+            (entry.name for entry in os.scandir(versions_dir) if entry.is_dir()), key=version_key
+        )
+
+    def resolve(self, name, version=None):
+        """(اسم النسخة، مجلدها): المطلوبة صراحةً، أو المكتوبة في CURRENT، أو أحدث نسخة"""
+        base = self.model_dir(name)
+        if version is None:
+            current_file = os.path.join(base, CURRENT_FILE)
+            if os.path.exists(current_file):
+                with open(current_file) as f:
+                    version = f.read().strip() or None
+        if version is None:
+            version = self.versions(name)[-1]
+        if version == BASE_VERSION:
+            return version, base
+        if not version or os.path.basename(version) != version or version in ('.', '..'):
+            raise ValueError(f'invalid version name: {version!r}')
+        path = os.path.join(base, VERSIONS_DIR, version)
+        if not os.path.isdir(path):
+            raise ValueError(f'{name} version {version!r} not found')
+        return version, path
+
+    def load_version(self, name, slot, version=None):
+        """تحميل وبناء والتحقق من نسخة دون استبدال الفعالة (None إذا لم توجد ملفات النموذج)"""
+        spec = self.specs[name]
+        version, path = self.resolve(name, version)
+        fingerprint = _fingerprint(path)
+        start = time.perf_counter()
+        bundle = spec.load(self.models_dir, slot, path)
+        if bundle is None:
+            return None
+        loaded = ModelVersion(name, version, path, fingerprint, **spec.build(bundle))
+        slot.timed('smoke', spec.smoke, loaded)
+        loaded.load_seconds = round(time.perf_counter() - start, 4)
+        return loaded
+
+    def publish(self, version):
+        """الاستبدال الذري: الطلبات الجديدة ترى النسخة الجديدة فوراً"""
+        with self._lock:
+            previous = self._current[version.name]
+            self._current[version.name] = version
+        for listener in self._listeners:
+            listener(version, previous)
+        suffix = '' if version.version == BASE_VERSION else f' ({version.version})'
+        print(f"✅ تم تحميل {self.specs[version.name].title}{suffix}")
+
+    def reload(self, name, version=None):
+        """تحميل نسخة في خيط خلفي ثم الاستبدال إذا نجح التحقق - ترجع ModelSlot لمتابعة الحالة"""
+        self.resolve(name, version)  # ValueError فوراً للنسخة غير الموجودة
+        with self._lock:
+            running = self._reloads.get(name)
+            if running is not None and not running.done:
+                return running
+            slot = ModelSlot(name, lambda slot: self.load_version(name, slot, version), self.publish)
+            self._reloads[name] = slot
+        threading.Thread(target=slot.load, name=f'reload-{name}', daemon=True).start()
+        return slot
+
+    def reload_many(self, model=None, version=None):
+        """POST /api/models/reload: نموذج واحد (ونسخة اختيارية) أو كل النماذج"""
+        if model is not None and model not in self.specs:
+            raise ValueError(f'unknown model: {model!r}')
+        if version is not None and model is None:
+            raise ValueError('version requires model')
+        names = [model] if model is not None else list(self.specs)
+        return {name: self.reload(name, version).status() for name in names}
+
+    def changed(self, name):
+        """هل تغيرت ملفات النسخة المطلوبة عن الفعالة (ولم تُجرَّب بعد)"""
+        current = self._current[name]
+        if current is None:
+            return False
+        try:
+            _, path = self.resolve(name)
+        except ValueError:
+            return False
+        state = (path, _fingerprint(path))
+        if state == (current.path, current.fingerprint) or state == self._attempted.get(name):
+            return False
+        self._attempted[name] = state
+        return True
+
+    def watch(self, interval=MODEL_WATCH_SECONDS):
+        """خيط يفحص الملفات كل interval ثانية (مرة لكل عملية - يعمل أيضاً في عمال gunicorn بعد fork)"""
+        if interval <= 0 or self._watch_pid == os.getpid():
+            return
+        self._watch_pid = os.getpid()
+        threading.Thread(target=self._watch_loop, args=(interval,), name='model-watch', daemon=True).start()
+
+    def _watch_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            for name in self.specs:
+                if self.changed(name):
+                    self.reload(name)
+
+    def status(self):
+        """النسخة الفعالة والنسخ المتاحة وحالة آخر إعادة تحميل لكل نموذج"""
+        return {
+            name: {
+                'current': version.info() if version is not None else None,
+                'available': self.versions(name),
+                'reload': self._reloads[name].status() if name in self._reloads else None
+            }
+            for name, version in self._current.items()
+        }
@@ -0,0 +1,231 @@
+"""
+Sales history - append-only daily sales series with O(1) rolling windows for the forecast lag features
+المبيعات اليومية الفعلية في مصفوفة NumPy (append-only) تغذي sales_7day_avg و sales_30day_avg في التنبؤ
+
+POST /api/sales-history يضيف أياماً: {"days": [{"date": "2025-11-30", "sales": 152340.5}, ...]}
+    - مبيعات آخر يوم مسجل يمكن الإضافة إليها (تُجمع)، والأيام الأقدم منه مرفوضة
+    - الأيام غير المرسلة بين آخر يوم واليوم الجديد = 0 مبيعات
+    - مجاميع تراكمية (prefix sums): كل يوم يُضاف بـ O(1)، ومجموع أي نافذة 7 أو 30 يوماً بـ O(1)
+
+نافذة اليوم d هي متوسط الأيام المسجلة من d-7 (أو d-30) حتى d-1 - قبل اليوم المتنبأ به؛ التاريخ الأقصر من
+النافذة يُقسم على عدد أيامه. بدون أي يوم مسجل تبقى النافذتان 0 كما كانت (ml_engine.forecasting).
+
+SALES_HISTORY_FILE: سجل CSV (date,sales) يُضاف إليه فقط - يُقرأ عند البدء، وكل عامل gunicorn يقرأ ما أضافه
+غيره قبل كل تنبؤ (الأسطر الجديدة فقط). بدونه التاريخ في ذاكرة العملية فقط ويضيع عند إعادة التشغيل.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ml_engine.calendar_table import day_numbers
+
+try:
+    import fcntl
+except ImportError:  # Windows: عملية واحدة بدون قفل الملف
+    fcntl = None
+
+SALES_HISTORY_FILE = os.environ.get('SALES_HISTORY_FILE', '')
+
+# نوافذ sales_7day_avg و sales_30day_avg
+WINDOWS = (7, 30)
+INITIAL_CAPACITY = 1024
+SALES_ERROR = 'sales must be a finite number'
+
+
+def day_labels(days):
+    """أرقام الأيام -> 'YYYY-MM-DD'"""
+    return np.datetime_as_string(np.asarray(days, dtype=np.int64).astype('datetime64[D]')).tolist()
+
+
+def parse_days(records):
+    """[{"date", "sales"}] -> (أرقام الأيام، المبيعات) مرتبة حسب التاريخ"""
+    if not isinstance(records, list) or not records:
+        raise ValueError('days must be a non-empty list')
+    if not all(isinstance(record, dict) for record in records):
+        raise ValueError('each day must be an object')
+    dates = pd.to_datetime(pd.Series([r.get('date') for r in records], dtype=object), format='mixed')
+    if dates.isna().any():
+        raise ValueError('date is required')
+    try:
+        sales = np.array([r.get('sales') for r in records], dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(SALES_ERROR)
+    if sales.ndim != 1 or not np.isfinite(sales).all():
+        raise ValueError(SALES_ERROR)
+    days = day_numbers(pd.DatetimeIndex(dates))
+    order = np.argsort(days, kind='stable')
+    return days[order], sales[order]
+
+
+class HistorySnapshot:
+    """التاريخ كما كان عند بداية الطلب (يُمرر لعمليات الـ executor) - version جزء من مفتاح كاش التنبؤ"""
+
+    def __init__(self, first_day, prefix, tail, version):
+        self.first_day = first_day
+        self.prefix = prefix
+        self.tail = tail
+        self.version = version
+
+    def __len__(self):
+        return len(self.prefix) - 1
+
+    @property
+    def last_day(self):
+        return self.first_day + len(self) - 1
+
+    def window_sum(self, window):
+        """مجموع آخر window يوم مسجل"""
+        return self.prefix[-1] - self.prefix[max(len(self) - window, 0)]
+
+    def windows(self, days):
+        """(n, 2) متوسط نافذتي 7 و 30 يوماً قبل كل يوم - للأيام حتى اليوم التالي لآخر يوم مسجل"""
+        offsets = np.asarray(days, dtype=np.int64) - self.first_day
+        averages = np.zeros((len(offsets), len(WINDOWS)), dtype=np.float64)
+        for j, window in enumerate(WINDOWS):
+            hi = np.clip(offsets, 0, len(self))
+            lo = np.clip(offsets - window, 0, len(self))
+            count = hi - lo
+            np.divide(self.prefix[hi] - self.prefix[lo], count, out=averages[:, j], where=count > 0)
+        return averages
+
+
+class SalesHistory:
+    """المبيعات اليومية منذ أول يوم مسجل + مجاميعها التراكمية (السعة تتضاعف: إضافة يوم O(1))"""
+
+    def __init__(self, path=''):
+        self.path = path
+        self._first_day = None
+        self._length = 0
+        self._sales = np.zeros(INITIAL_CAPACITY, dtype=np.float64)
+        # _prefix[k] = مجموع أول k يوم
+        self._prefix = np.zeros(INITIAL_CAPACITY + 1, dtype=np.float64)
+        self._version = 0
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('ingested', 'synced_lines', 'errors'), 0)
+        if path:
+            self.sync()
+
+    @classmethod
+    def from_env(cls):
+        return cls(SALES_HISTORY_FILE)
+
+    def _check_order(self, days):
+        if self._length and days[0] < self._first_day + self._length - 1:
+            last = day_labels([self._first_day + self._length - 1])[0]
+            raise ValueError(f'sales history is append-only: {day_labels(days[:1])[0]} is before {last}')
+
+    def _reserve(self, length):
+        if length <= len(self._sales):
+            return
+        capacity = max(length, 2 * len(self._sales))
+        self._sales = np.concatenate((self._sales, np.zeros(capacity - len(self._sales))))
+        self._prefix = np.concatenate((self._prefix, np.zeros(capacity - len(self._prefix) + 1)))
+
+    def _append(self, days, sales):
+        """أيام مرتبة (آخر يوم مسجل أو بعده) - تحديث المجاميع من آخر يوم مسجل فقط"""
+        self._check_order(days)
+        if self._first_day is None:
+            self._first_day = int(days[0])
+        positions = days - self._first_day
+        start = max(self._length - 1, 0)
+        length = max(self._length, int(positions[-1]) + 1)
+        self._reserve(length)
+        np.add.at(self._sales, positions, sales)
+        # جمع تسلسلي من _prefix[start]: نفس القيم مهما كان تقسيم الأيام على الطلبات
+        self._prefix[start:length + 1] = np.cumsum(np.append(self._prefix[start], self._sales[start:length]))
+        self._length = length
+        self._version += 1
+
+    def ingest(self, records):
+        """إضافة أيام طلب /api/sales-history - ترجع الإحصائيات بعد الإضافة"""
+        days, sales = parse_days(records)
+        if not self.path:
+            with self._lock:
+                self._append(days, sales)
+                self._stats['ingested'] += len(days)
+            return self.stats()
+
+        lines = ''.join(f'{label},{value!r}\n' for label, value in zip(day_labels(days), sales.tolist()))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            # عدة عمال: التحقق من الترتيب والكتابة تحت نفس القفل
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self.sync()
+                with self._lock:
+                    self._check_order(days)
+                f.write(lines)
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        self.sync()
+        with self._lock:
+            self._stats['ingested'] += len(days)
+        return self.stats()
+
+    def sync(self):
+        """قراءة الأسطر التي أضافتها عمليات أخرى إلى SALES_HISTORY_FILE منذ آخر قراءة"""
+        if not self.path:
+            return
+        try:
+            if os.path.getsize(self.path) <= self._offset:
+                return
+        except OSError:
+            return
+        with self._lock:
+            with open(self.path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end == 0:
+                return
+            days, sales = [], []
+            last = self._first_day + self._length - 1 if self._length else None
+            for line in data[:end].decode('utf-8').splitlines():
+                try:
+                    label, value = line.split(',')
+                    day, value = int(np.datetime64(label, 'D').astype(np.int64)), float(value)
+                    if last is not None and day < last:
+                        raise ValueError('out of order')
+                except ValueError as e:
+                    self._stats['errors'] += 1
+                    print(f"⚠️  تحذير: سطر غير صالح في {self.path}: {line!r} ({e})")
+                    continue
+                days.append(day)
+                sales.append(value)
+                last = day
+            self._offset += end
+            if days:
+                self._append(np.array(days, dtype=np.int64), np.array(sales))
+                self._stats['synced_lines'] += len(days)
+
+    def snapshot(self):
+        """نسخة ثابتة للطلب - None إذا لم يُسجل أي يوم (النوافذ 0 كما كانت)"""
+        self.sync()
+        with self._lock:
+            if not self._length:
+                return None
+            return HistorySnapshot(
+                self._first_day,
+                self._prefix[:self._length + 1].copy(),
+                self._sales[max(self._length - WINDOWS[-1], 0):self._length].copy(),
+                self._version
+            )
+
+    def stats(self):
+        """للعرض في /api/health و GET /api/sales-history: النوافذ كما ستدخل تنبؤ اليوم التالي لآخر يوم"""
+        snapshot = self.snapshot()
+        with self._lock:
+            stats = dict(self._stats, path=self.path or None, days=self._length, version=self._version)
+        if snapshot is None:
+            return dict(stats, first_date=None, last_date=None, sales_7day_avg=0.0, sales_30day_avg=0.0)
+        averages = snapshot.windows([snapshot.last_day + 1])[0]
+        first_date, last_date = day_labels([snapshot.first_day, snapshot.last_day])
+        return dict(
+            stats, first_date=first_date, last_date=last_date,
+            sales_7day_avg=round(float(averages[0]), 2), sales_30day_avg=round(float(averages[1]), 2)
+        )
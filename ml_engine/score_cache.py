@@ -0,0 +1,131 @@
+"""
+Lead score cache - LRU cache keyed by the encoded feature vector
+كاش لدرجات العملاء: المفتاح هو صف الميزات المرمّزة نفسه (source، agent، عدد الـ tags، الأيام منذ الإنشاء، الميزانية)
+
+الدرجة تعتمد على هذه الميزات فقط، لذا العميل الذي لم يتغير يأخذ درجته من الكاش.
+days_since_created يتغير كل يوم فالمدخلات القديمة لن تُطلب مجدداً: الكاش يُمسح عند تغير اليوم وعند تغير النموذج.
+الكاش مرتبط بنسخة واحدة من النموذج (bind): طلبات النسخة القديمة الجارية بعد الاستبدال لا تقرأ منه ولا تكتب فيه.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('SCORE_CACHE_MAX_ENTRIES', 100000))
+
+
+def feature_keys(features):
+    """كل صف كـ bytes (float32 من features.lead_features: 20 byte للصف) - hash المحتوى الكامل بدون تصادمات"""
+    features = np.ascontiguousarray(features)
+    if len(features) == 0:
+        return []
+    return features.view(np.dtype((np.void, features.shape[1] * features.itemsize))).ravel().tolist()
+
+
+class ScoreCache:
+    """كاش محدود بعدد المدخلات - درجة لكل صف ميزات، وإحصائيات لكل endpoint"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, today=date.today):
+        self.max_entries = max_entries
+        self._today = today
+        self._day = None
+        self._backend = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('evictions', 'rollovers', 'invalidations', 'bypassed'), 0)
+        self._endpoints = {}
+
+    def invalidate(self):
+        """مسح الكاش بالكامل - يُستدعى عند إعادة تحميل النموذج"""
+        with self._lock:
+            self._entries.clear()
+            self._backend = None
+            self._stats['invalidations'] += 1
+
+    def bind(self, backend):
+        """ربط الكاش بنسخة نموذج جديدة ومسح درجات النسخة السابقة"""
+        with self._lock:
+            if self._backend is not None:
+                self._stats['invalidations'] += 1
+            self._entries.clear()
+            self._backend = backend
+
+    def score(self, backend, features, score_fn, endpoint='default'):
+        """درجات كل الصفوف: الموجود في الكاش يُعاد مباشرة، والباقي فقط يمر على score_fn(backend, features)"""
+        if self.max_entries <= 0:
+            return score_fn(backend, features)
+        keys = feature_keys(features)
+        scores = np.empty(len(keys), dtype=np.float64)
+        missing = []
+
+        with self._lock:
+            bypass = not self._check_generation(backend)
+            if bypass:
+                self._stats['bypassed'] += len(keys)
+            else:
+                entries = self._entries
+                for i, key in enumerate(keys):
+                    score = entries.get(key)
+                    if score is None:
+                        missing.append(i)
+                    else:
+                        entries.move_to_end(key)
+                        scores[i] = score
+                counters = self._endpoints.setdefault(endpoint, {'hits': 0, 'misses': 0})
+                counters['hits'] += len(keys) - len(missing)
+                counters['misses'] += len(missing)
+        if bypass:
+            return score_fn(backend, features)
+
+        if missing:
+            # الصفوف المتكررة داخل نفس الدفعة تُحسب مرة واحدة
+            unique = {}
+            for i in missing:
+                unique.setdefault(keys[i], i)
+            rows = list(unique.values())
+            predicted = score_fn(backend, features[rows])
+            by_key = dict(zip(unique, predicted.tolist()))
+            scores[missing] = [by_key[keys[i]] for i in missing]
+            with self._lock:
+                if backend is self._backend:
+                    self._store(by_key)
+        return scores
+
+    def _check_generation(self, backend):
+        # نسخة نموذج غير المرتبطة (طلب جارٍ على نسخة قديمة): بدون كاش | يوم جديد: مسح الكاش
+        if self._backend is None:
+            self._backend = backend
+        elif backend is not self._backend:
+            return False
+        today = self._today()
+        if today != self._day:
+            if self._day is not None and self._entries:
+                self._stats['rollovers'] += 1
+            self._entries.clear()
+            self._day = today
+        return True
+
+    def _store(self, by_key):
+        entries = self._entries
+        entries.update(by_key)
+        overflow = len(entries) - self.max_entries
+        for _ in range(max(overflow, 0)):
+            entries.popitem(last=False)
+        self._stats['evictions'] += max(overflow, 0)
+
+    def stats(self):
+        """إحصائيات الكاش لعرضها في /api/health (نسبة الإصابة لكل endpoint)"""
+        with self._lock:
+            endpoints = {
+                name: dict(counters, hit_ratio=round(counters['hits'] / max(counters['hits'] + counters['misses'], 1), 4))
+                for name, counters in self._endpoints.items()
+            }
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                max_entries=self.max_entries,
+                day=self._day.isoformat() if self._day else None,
+                endpoints=endpoints
+            )
@@ -0,0 +1,518 @@
+"""
+Precomputed lead score store - memory-mapped arrays keyed by lead id
+درجات كل العملاء محسوبة مسبقاً (offline) في مصفوفات .npy تُقرأ عبر mmap: بحث O(1) بمعرّف العميل
+
+    python -m ml_engine.score_store build leads.ndjson     # كل العملاء (NDJSON أو CSV بنفس صيغة الـ stream)
+    python -m ml_engine.score_store refresh changed.ndjson # العملاء الجدد أو الذين تغيرت بياناتهم فقط
+    python -m ml_engine.score_store roll                   # بداية يوم جديد: days_since_created لكل العملاء
+    python -m ml_engine.score_store info
+
+LEAD_SCORE_STORE هو مجلد المخزن. كل عملية تكتب جيلاً جديداً كاملاً ثم تستبدل CURRENT (مثل نسخ النماذج):
+    generations/<n>/ids.npy        المعرّفات (bytes) | slots.npy  جدول hash (linear probing) -> رقم الصف
+    generations/<n>/features.npy   الميزات المرمّزة (float32 (n, 5)) | created.npy  createdAt (datetime64[us])
+    generations/<n>/scores.npy     الدرجة بالأيام المحفوظة وبعدها بيوم (n, 2) | meta.json
+
+الطلب يأخذ الدرجة من المخزن فقط إذا طابقت ميزاته الميزات المحفوظة (والأيام نفسها أو +1)، وإلا يمر على
+النموذج كالمعتاد - النتيجة مطابقة دائماً. العميل المرسل بـ id فقط ({"id": 42}) يأخذ بيانات المخزن.
+المخزن مرتبط بملفات نموذج Lead Scoring التي بُني بها (sha256): نموذج آخر = المخزن معطّل حتى build جديد.
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from ml_engine.bulk_scoring import STREAM_CHUNK_ROWS, STREAM_READ_BYTES, LineChunker, parse_lines
+from ml_engine.dates import parse_dates
+from ml_engine.features import FEATURE_DTYPE, FEATURE_NAMES, Categorical, lead_features, record_columns
+from ml_engine.lead_scoring import score_features
+
+LEAD_SCORE_STORE = os.environ.get('LEAD_SCORE_STORE', '')
+# كل كم ثانية يُقرأ CURRENT لاكتشاف جيل جديد كتبه build/refresh/roll
+LEAD_SCORE_STORE_CHECK_SECONDS = float(os.environ.get('LEAD_SCORE_STORE_CHECK_SECONDS', 10))
+
+FORMAT_VERSION = 1
+GENERATIONS_DIR = 'generations'
+CURRENT_FILE = 'CURRENT'
+KEEP_GENERATIONS = 3
+ARRAYS = ('ids', 'slots', 'features', 'created', 'scores')
+
+# ملفات نموذج Lead Scoring (model_loader.load_lead_scoring) - الـ digest يحدد صلاحية المخزن
+MODEL_FILES = ('lead_scoring_model.pkl', 'le_source.pkl', 'le_agent.pkl')
+# كل الميزات عدا days_since_created (تتغير يومياً - scores تغطي اليوم المحفوظ والذي بعده)
+STATIC_FEATURES = [0, 1, 2, 4]
+DAYS_FEATURE = 3
+DAYS_STORED = 2
+FNV_OFFSET = np.uint64(0xcbf29ce484222325)
+FNV_PRIME = np.uint64(0x100000001b3)
+MIX_PRIME = np.uint64(0xff51afd7ed558ccd)
+
+
+def model_digest(path):
+    """sha256 لمحتوى ملفات النموذج (لا يتغير مع mtime عند النشر من git)"""
+    digest = hashlib.sha256()
+    for name in MODEL_FILES:
+        file_path = os.path.join(path, name)
+        if os.path.exists(file_path):
+            digest.update(name.encode('utf-8'))
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+def id_keys(ids):
+    """معرّفات العملاء (قائمة، ndarray، أو Categorical) -> مصفوفة bytes (str(id) بـ utf-8) - الغائب b''"""
+    values = ids.values() if isinstance(ids, Categorical) else ids
+    if len(values) == 0:
+        return np.zeros(0, dtype='S1')
+    try:
+        array = values if isinstance(values, np.ndarray) else np.array(values)
+    except ValueError:
+        array = None
+    if array is not None and array.ndim == 1 and array.dtype.kind in 'iuU':
+        try:
+            return array.astype('S')
+        except UnicodeEncodeError:
+            return np.char.encode(array, 'utf-8')
+    # None، أعداد عشرية، أو أنواع مختلطة: قيمة قيمة
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    return np.array([b'' if v is None else str(v).encode('utf-8') for v in values], dtype=bytes)
+
+
+def _hashes(keys):
+    """FNV-1a على bytes كل معرّف - عمود بعد عمود لكل المعرّفات معاً (الأصفار في نهاية S لا تُحسب)"""
+    keys = np.ascontiguousarray(keys)
+    width = keys.dtype.itemsize
+    codes = keys.view(np.uint8).reshape(len(keys), width).astype(np.uint64)
+    hashes = np.full(len(keys), FNV_OFFSET, dtype=np.uint64)
+    for column in codes.T:
+        hashes = np.where(column != 0, (hashes ^ column) * FNV_PRIME, hashes)
+    # خلط نهائي (murmur3 fmix64): البتات الدنيا (رقم الخانة) تتغير مع كل بايت في المعرّف
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= MIX_PRIME
+    hashes ^= hashes >> np.uint64(33)
+    return hashes.view(np.int64)
+
+
+def build_slots(keys):
+    """جدول hash بحجم قوة 2 >= ضعف عدد الصفوف: كل صف في أول خانة فارغة بعد hash(id) - بعمليات متجهة"""
+    size = 8
+    while size < 2 * len(keys):
+        size *= 2
+    mask = size - 1
+    slots = np.full(size, -1, dtype=np.int32 if len(keys) < 2**31 else np.int64)
+    position = _hashes(keys) & mask
+    pending = np.arange(len(keys))
+    while len(pending):
+        wanted = position[pending]
+        free = slots[wanted] < 0
+        # عدة صفوف على نفس الخانة الفارغة: الأول يأخذها والباقي يجرب الخانة التالية
+        taken, first = np.unique(wanted[free], return_index=True)
+        winners = pending[free][first]
+        slots[taken] = winners
+        placed = np.zeros(len(keys), dtype=bool)
+        placed[winners] = True
+        pending = pending[~placed[pending]]
+        position[pending] = (position[pending] + 1) & mask
+    return slots
+
+
+def lookup_rows(ids, slots, keys):
+    """رقم الصف لكل معرّف (-1 غير موجود) - نفس تسلسل الخانات في build_slots لكل المعرّفات معاً"""
+    rows = np.full(len(keys), -1, dtype=np.int64)
+    if len(keys) == 0 or len(ids) == 0:
+        return rows
+    mask = len(slots) - 1
+    position = _hashes(keys) & mask
+    pending = np.flatnonzero(keys != b'')
+    while len(pending):
+        candidates = slots[position[pending]].astype(np.int64)
+        occupied = candidates >= 0
+        found = occupied.copy()
+        found[occupied] = ids[candidates[occupied]] == keys[pending[occupied]]
+        rows[pending[found]] = candidates[found]
+        pending = pending[occupied & ~found]
+        position[pending] = (position[pending] + 1) & mask
+    return rows
+
+
+def days_since_created(created, now):
+    """days_since_created من التواريخ المحفوظة (نفس features.days_since_column، NaT -> 0)"""
+    with np.errstate(invalid='ignore'):
+        days = (np.datetime64(now.to_datetime64(), 'us') - created) // np.timedelta64(1, 'D')
+    days = days.astype(np.float32)
+    days[np.isnat(created)] = 0
+    return days
+
+
+def stacked_scores(backend, features):
+    """(n, 2): الدرجة بالأيام الحالية وبعدها بيوم - استدعاء predict واحد لـ 2n صف"""
+    n = len(features)
+    both = np.concatenate([features, features])
+    both[n:, DAYS_FEATURE] += 1
+    scores = score_features(backend, both)
+    return np.stack([scores[:n], scores[n:]], axis=1)
+
+
+class StoreGeneration:
+    """جيل واحد مفتوح للقراءة: المصفوفات عبر mmap (الصفحات مشتركة بين عمال gunicorn)"""
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != FORMAT_VERSION:
+            raise ValueError(f"unsupported score store format {self.meta.get('format')!r}")
+        for array in ARRAYS:
+            setattr(self, array, np.load(os.path.join(path, f'{array}.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rows(self, keys):
+        return lookup_rows(self.ids, self.slots, keys)
+
+    def features_at(self, rows, now):
+        """الميزات المحفوظة لهذه الصفوف مع days_since_created محسوبة لـ now"""
+        features = self.features[rows]
+        features[:, DAYS_FEATURE] = days_since_created(self.created[rows], now)
+        return features
+
+
+def _generations_dir(store_path):
+    return os.path.join(store_path, GENERATIONS_DIR)
+
+
+def current_generation(store_path):
+    """الجيل المكتوب في CURRENT (None إذا لم يُبنَ المخزن بعد)"""
+    try:
+        with open(os.path.join(store_path, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return StoreGeneration(os.path.join(_generations_dir(store_path), name), name) if name else None
+
+
+class ScoreStore:
+    """قراءة المخزن في التطبيق: الجيل الحالي (يُعاد فتحه عند تغير CURRENT) مرتبط بنسخة النموذج الفعالة"""
+
+    def __init__(self, path, check_seconds=LEAD_SCORE_STORE_CHECK_SECONDS):
+        self.path = path
+        self.check_seconds = check_seconds
+        self._generation = None
+        self._current_name = None
+        self._checked = None
+        self._backend = None
+        self._digest = None
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(('hits', 'misses', 'id_only', 'reopened', 'errors'), 0)
+
+    @classmethod
+    def from_env(cls):
+        """None إذا لم يُحدد LEAD_SCORE_STORE"""
+        if not LEAD_SCORE_STORE:
+            return None
+        return cls(LEAD_SCORE_STORE)
+
+    def bind(self, version):
+        """ربط المخزن بنسخة Lead Scoring: الدرجات تُستخدم فقط إذا بُنيت بنفس ملفات النموذج"""
+        digest = model_digest(version.path)
+        with self._lock:
+            self._backend = version.backend
+            self._digest = digest
+        generation = self.generation()
+        if generation is not None and generation.meta['model_digest'] != digest:
+            print(f"⚠️  تحذير: مخزن الدرجات {self.path} مبني بنموذج آخر - معطّل حتى build جديد")
+
+    def generation(self):
+        """الجيل الحالي - فحص CURRENT مرة كل check_seconds على الأكثر"""
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < self.check_seconds:
+            return self._generation
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.check_seconds:
+                return self._generation
+            self._checked = now
+            try:
+                with open(os.path.join(self.path, CURRENT_FILE)) as f:
+                    name = f.read().strip() or None
+                if name != self._current_name:
+                    generation = StoreGeneration(os.path.join(_generations_dir(self.path), name), name)
+                    self._stats['reopened'] += self._generation is not None
+                    self._generation, self._current_name = generation, name
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                self._stats['errors'] += 1
+                print(f"⚠️  تحذير: فشل فتح مخزن الدرجات {self.path}: {e}")
+            return self._generation
+
+    def lookup(self, backend, ids):
+        """(الجيل، رقم الصف لكل معرّف - -1 غير موجود) أو None إذا لم يكن المخزن فعالاً لهذه النسخة
+
+        الجيل يُعاد مع الصفوف: نفس الجيل لكل الدفعة حتى لو كُتب جيل جديد أثناءها.
+        """
+        generation = self.generation()
+        if generation is None or backend is not self._backend or generation.meta['model_digest'] != self._digest:
+            return None
+        return generation, generation.rows(id_keys(ids))
+
+    def fill(self, generation, rows, features, valid, scores, by_id=0):
+        """الدرجات المحفوظة في scores (مكانها) للصفوف التي تطابق ميزاتها المخزن - ترجع قناع هذه الصفوف"""
+        candidates = np.flatnonzero((rows >= 0) & valid)
+        stored = rows[candidates]
+        saved = generation.features[stored]
+        offset = features[candidates, DAYS_FEATURE] - saved[:, DAYS_FEATURE]
+        match = (features[candidates][:, STATIC_FEATURES] == saved[:, STATIC_FEATURES]).all(axis=1)
+        match &= (offset >= 0) & (offset < DAYS_STORED)
+        hits = candidates[match]
+        scores[hits] = generation.scores[stored[match], offset[match].astype(np.intp)]
+        found = np.zeros(len(features), dtype=bool)
+        found[hits] = True
+
+        with self._lock:
+            self._stats['hits'] += len(hits)
+            self._stats['misses'] += int(np.count_nonzero(rows >= 0)) - len(hits)
+            self._stats['id_only'] += by_id
+        return found
+
+    def stats(self):
+        """حالة المخزن لعرضها في /api/health"""
+        generation = self._generation
+        with self._lock:
+            stats = dict(self._stats, path=self.path)
+        if generation is None:
+            return dict(stats, generation=None, rows=0)
+        meta = generation.meta
+        return dict(
+            stats,
+            generation=generation.name,
+            rows=len(generation),
+            model_version=meta.get('model_version'),
+            model_matches=meta.get('model_digest') == self._digest,
+            rolled_at=meta.get('rolled_at'),
+            updated_at=meta.get('updated_at')
+        )
+
+
+# === كتابة المخزن (CLI / job) ===
+
+def write_generation(store_path, arrays, meta, previous=None):
+    """جيل جديد في generations/<n> ثم استبدال CURRENT ذرياً - المصفوفات غير المتغيرة (None) تُربط من previous"""
+    generations = _generations_dir(store_path)
+    os.makedirs(generations, exist_ok=True)
+    existing = sorted(int(entry) for entry in os.listdir(generations) if entry.isdigit())
+    name = f'{(existing[-1] if existing else 0) + 1:06d}'
+    path = os.path.join(generations, name)
+    os.mkdir(path)  # FileExistsError إذا كتب job آخر نفس الجيل في نفس اللحظة
+
+    for array in ARRAYS:
+        target = os.path.join(path, f'{array}.npy')
+        if arrays.get(array) is None:
+            source = os.path.join(previous.path, f'{array}.npy')
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copyfile(source, target)
+        else:
+            np.save(target, arrays[array])
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(dict(meta, format=FORMAT_VERSION, generation=name), f, ensure_ascii=False, indent=2)
+
+    pointer = os.path.join(store_path, CURRENT_FILE)
+    with open(pointer + '.tmp', 'w') as f:
+        f.write(name)
+    os.replace(pointer + '.tmp', pointer)
+
+    # العمال الذين ما زالوا يقرؤون جيلاً محذوفاً يحتفظون بملفاته المفتوحة (mmap)
+    for old in existing[:max(len(existing) - (KEEP_GENERATIONS - 1), 0)]:
+        shutil.rmtree(os.path.join(generations, f'{old:06d}'), ignore_errors=True)
+    return name
+
+
+def read_lead_chunks(paths, in_format=None, chunk_rows=STREAM_CHUNK_ROWS):
+    """ملفات NDJSON/CSV (نفس صيغة /api/batch-lead-scoring/stream) -> أجزاء من dicts"""
+    for path in paths:
+        file_format = in_format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        chunker = LineChunker(file_format, chunk_rows)
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(STREAM_READ_BYTES), b''):
+                for lines in chunker.feed(data):
+                    yield parse_lines(lines, file_format, chunker.header)[0]
+        for lines in chunker.close():
+            yield parse_lines(lines, file_format, chunker.header)[0]
+
+
+def lead_arrays(version, chunks, now):
+    """(المعرّفات، الميزات، createdAt، عدد الصفوف المتجاهلة) - آخر ظهور لكل معرّف، بدون الصفوف غير الصالحة"""
+    keys, features, created, skipped = [], [], [], 0
+    for rows in chunks:
+        leads = [row for row in rows if isinstance(row, dict) and row.get('id') not in (None, '')]
+        columns = record_columns(leads)
+        columns['created_at'] = parse_dates(columns['created_at'])
+        chunk_features, valid, _ = lead_features(columns, version.source_encoder, version.agent_encoder, now)
+        skipped += len(rows) - int(valid.sum())
+        keys.append(id_keys([lead['id'] for lead in leads])[valid])
+        features.append(chunk_features[valid])
+        created.append(columns['created_at'][valid])
+    if not keys:
+        return np.zeros(0, dtype='S1'), np.zeros((0, len(FEATURE_NAMES)), FEATURE_DTYPE), np.zeros(0, 'M8[us]'), skipped
+
+    keys, features, created = np.concatenate(keys), np.concatenate(features), np.concatenate(created)
+    _, last = np.unique(keys[::-1], return_index=True)
+    keep = np.sort(len(keys) - 1 - last)
+    return keys[keep], features[keep], created[keep], skipped + len(keys) - len(keep)
+
+
+def _same_dates(a, b):
+    return (a == b) | (np.isnat(a) & np.isnat(b))
+
+
+def _meta(version, previous=None, **fields):
+    meta = dict(previous.meta) if previous is not None else {}
+    meta.update(model_version=version.version, model_digest=model_digest(version.path),
+                updated_at=datetime.now().isoformat(), **fields)
+    return meta
+
+
+def build_store(store_path, version, paths, in_format=None, now=None):
+    """كل العملاء من جديد: الميزات والدرجات (predict واحد) وجدول المعرّفات"""
+    now = pd.Timestamp.now() if now is None else now
+    keys, features, created, skipped = lead_arrays(version, read_lead_chunks(paths, in_format), now)
+    if len(keys) == 0:
+        raise ValueError('no valid leads with an id in the input')
+    arrays = {
+        'ids': keys, 'slots': build_slots(keys), 'features': features, 'created': created,
+        'scores': stacked_scores(version.backend, features)
+    }
+    summary = {'action': 'build', 'rows': len(keys), 'rescored': len(keys), 'skipped': skipped}
+    name = write_generation(store_path, arrays, _meta(version, rolled_at=now.isoformat(), last=summary))
+    return dict(summary, generation=name)
+
+
+def _require_current(store_path, version):
+    previous = current_generation(store_path)
+    if previous is None:
+        raise ValueError(f'no score store in {store_path} - run build first')
+    if previous.meta['model_digest'] != model_digest(version.path):
+        raise ValueError('the store was built with different model files - run build again')
+    return previous
+
+
+def refresh_store(store_path, version, paths, in_format=None, now=None):
+    """تحديث تزايدي: العملاء الجدد أو الذين تغيرت ميزاتهم أو createdAt فقط يمرون على النموذج"""
+    now = pd.Timestamp.now() if now is None else now
+    previous = _require_current(store_path, version)
+    keys, features, created, skipped = lead_arrays(version, read_lead_chunks(paths, in_format), now)
+
+    rows = previous.rows(keys)
+    known = np.flatnonzero(rows >= 0)
+    unchanged = np.zeros(len(keys), dtype=bool)
+    unchanged[known] = (
+        (previous.features[rows[known]][:, STATIC_FEATURES] == features[known][:, STATIC_FEATURES]).all(axis=1)
+        & _same_dates(previous.created[rows[known]], created[known])
+    )
+    changed = np.flatnonzero(~unchanged)
+    summary = {'action': 'refresh', 'rows': len(previous), 'rescored': len(changed),
+               'unchanged': int(unchanged.sum()), 'added': 0, 'skipped': skipped}
+    if len(changed) == 0:
+        return dict(summary, generation=previous.name)
+
+    new_scores = stacked_scores(version.backend, features[changed])
+    updated = rows[changed] >= 0
+    added = changed[~updated]
+    arrays = {
+        'features': np.concatenate([previous.features, features[added]]),
+        'created': np.concatenate([previous.created, created[added]]),
+        'scores': np.concatenate([previous.scores, new_scores[~updated]])
+    }
+    target = rows[changed[updated]]
+    arrays['features'][target] = features[changed[updated]]
+    arrays['created'][target] = created[changed[updated]]
+    arrays['scores'][target] = new_scores[updated]
+    if len(added):
+        arrays['ids'] = np.concatenate([previous.ids, keys[added]])
+        arrays['slots'] = build_slots(arrays['ids'])
+
+    summary.update(rows=len(arrays['features']), added=len(added))
+    name = write_generation(store_path, arrays, _meta(version, previous, last=summary), previous)
+    return dict(summary, generation=name)
+
+
+def roll_store(store_path, version, now=None):
+    """يوم جديد: days_since_created لكل العملاء من createdAt المحفوظ، والصفوف التي تغيرت أيامها
+    فقط تمر على النموذج - كلها في predict واحد"""
+    now = pd.Timestamp.now() if now is None else now
+    previous = _require_current(store_path, version)
+    features = np.array(previous.features)
+    days = days_since_created(previous.created, now)
+    changed = np.flatnonzero(days != features[:, DAYS_FEATURE])
+    summary = {'action': 'roll', 'rows': len(features), 'rescored': len(changed)}
+
+    scores = np.array(previous.scores)
+    if len(changed):
+        features[changed, DAYS_FEATURE] = days[changed]
+        scores[changed] = stacked_scores(version.backend, features[changed])
+    arrays = {'features': features, 'scores': scores}
+    name = write_generation(store_path, arrays, _meta(version, previous, rolled_at=now.isoformat(), last=summary),
+                            previous)
+    return dict(summary, generation=name)
+
+
+def _load_lead_scoring(version=None):
+    """نفس نسخة Lead Scoring التي يحمّلها التطبيق (CURRENT أو أحدث نسخة) أو --version"""
+    from ml_engine.model_loader import ModelSlot
+    from ml_engine.registry import ModelRegistry
+
+    registry = ModelRegistry(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    loaded = registry.load_version('lead_scoring', ModelSlot('lead_scoring', None), version)
+    if loaded is None:
+        sys.exit('❌ Lead Scoring model files not found')
+    return loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precomputed lead score store (LEAD_SCORE_STORE)')
+    parser.add_argument('command', choices=('build', 'refresh', 'roll', 'info'))
+    parser.add_argument('inputs', nargs='*', help='NDJSON/CSV lead files (build, refresh)')
+    parser.add_argument('--store', default=LEAD_SCORE_STORE, help='store directory (default: $LEAD_SCORE_STORE)')
+    parser.add_argument('--format', choices=('ndjson', 'csv'), help='input format (default: by file extension)')
+    parser.add_argument('--version', help='lead_scoring model version (default: the one the app loads)')
+    args = parser.parse_args(argv)
+    if not args.store:
+        parser.error('--store or LEAD_SCORE_STORE is required')
+    if args.command in ('build', 'refresh') and not args.inputs:
+        parser.error(f'{args.command} needs at least one input file')
+
+    if args.command == 'info':
+        generation = current_generation(args.store)
+        print(json.dumps(generation.meta if generation else None, ensure_ascii=False, indent=2))
+        return
+
+    version = _load_lead_scoring(args.version)
+    start = time.perf_counter()
+    try:
+        if args.command == 'build':
+            summary = build_store(args.store, version, args.inputs, args.format)
+        elif args.command == 'refresh':
+            summary = refresh_store(args.store, version, args.inputs, args.format)
+        else:
+            summary = roll_store(args.store, version)
+    except ValueError as e:
+        sys.exit(f'❌ {e}')
+    summary['seconds'] = round(time.perf_counter() - start, 3)
+    print(f"✅ {json.dumps(summary, ensure_ascii=False)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+Customer Segmentation - StandardScaler folded into the KMeans centroids
+تصنيف العملاء: دمج StandardScaler داخل مراكز KMeans عند التحميل وحساب المسافات على أجزاء
+
+argmin_k ||(x - μ)/σ - c_k||² = argmin_k (x @ A + b)_k
+حيث A = -2 (c_k / σ) و b = ||c_k||² + 2 (μ/σ)·c_k: ضرب مصفوفات واحد لكل جزء بدل transform ثم predict.
+"""
+import os
+
+import numpy as np
+
+from ml_engine.bulk_scoring import parse_lines, render_results
+from ml_engine.metrics import stage
+
+SEGMENT_NAMES = {
+    0: 'Bronze',
+    1: 'Silver',
+    2: 'Gold',
+    3: 'Platinum'
+}
+
+# ترتيب ميزات التدريب (يُقرأ من scaler.feature_names_in_ إن وُجد)
+SEGMENT_FEATURES = (
+    'recency', 'frequency', 'monetary', 'lead_count', 'avg_budget', 'total_deal_value', 'avg_probability'
+)
+# القيم الافتراضية القديمة للـ API - الميزات الأخرى الغائبة تأخذ متوسط التدريب (0 بعد التحجيم)
+SEGMENT_DEFAULTS = {'recency': 30, 'frequency': 1, 'monetary': 0, 'lead_count': 1, 'avg_budget': 0}
+
+# عدد الصفوف في كل ضرب مصفوفات (الذاكرة المؤقتة = SEGMENT_CHUNK_ROWS × عدد المراكز)
+SEGMENT_CHUNK_ROWS = int(os.environ.get('SEGMENT_CHUNK_ROWS', 65536))
+
+SEGMENT_LABELS = np.array([SEGMENT_NAMES.get(k, 'Unknown') for k in range(max(SEGMENT_NAMES) + 1)], dtype=object)
+
+OUTPUT_FIELDS = ('customer_id', 'segment', 'segment_name', 'distance', 'error')
+
+
+def _scaler_arrays(scaler, n_features):
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    if mean is None or not getattr(scaler, 'with_mean', True):
+        mean = np.zeros(n_features)
+    if scale is None or not getattr(scaler, 'with_std', True):
+        scale = np.ones(n_features)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+class FusedSegmenter:
+    """KMeans + StandardScaler كعملية خطية واحدة على الميزات الأصلية"""
+
+    name = 'fused-kmeans'
+
+    def __init__(self, model, scaler, chunk_rows=SEGMENT_CHUNK_ROWS):
+        centers = getattr(model, 'cluster_centers_', None)
+        if centers is None:
+            raise ValueError(f'{type(model).__name__} has no cluster_centers_')
+        if type(scaler).__name__ != 'StandardScaler':
+            raise ValueError(f'cannot fold {type(scaler).__name__} into the centroids')
+        centers = np.asarray(centers, dtype=np.float64)
+        n_features = centers.shape[1]
+        if getattr(scaler, 'n_features_in_', n_features) != n_features:
+            raise ValueError('scaler and model feature counts differ')
+
+        names = getattr(scaler, 'feature_names_in_', None)
+        self.feature_names = tuple(names) if names is not None else SEGMENT_FEATURES[:n_features]
+        self.mean, self.scale = _scaler_arrays(scaler, n_features)
+        self.fill = np.array([
+            SEGMENT_DEFAULTS.get(name, self.mean[i]) for i, name in enumerate(self.feature_names)
+        ], dtype=np.float64)
+
+        inv_scale = 1.0 / self.scale
+        self.coef = -2.0 * (centers * inv_scale).T
+        self.bias = (centers ** 2).sum(axis=1) + 2.0 * (self.mean * inv_scale) @ centers.T
+        self.inv_scale = inv_scale
+        self.n_clusters = len(centers)
+        self.chunk_rows = chunk_rows
+
+    def assign(self, features, return_distance=False):
+        """أقرب مركز لكل صف (والمسافة إليه في الفضاء المُحجَّم عند الطلب)"""
+        features = np.asarray(features, dtype=np.float64)
+        labels = np.empty(len(features), dtype=np.int64)
+        distances = np.empty(len(features), dtype=np.float64) if return_distance else None
+        for start in range(0, len(features), self.chunk_rows):
+            chunk = features[start:start + self.chunk_rows]
+            scores = chunk @ self.coef
+            scores += self.bias
+            chunk_labels = scores.argmin(axis=1)
+            labels[start:start + len(chunk)] = chunk_labels
+            if return_distance:
+                # ||z - c||² = ||z||² + score الأدنى
+                z = (chunk - self.mean) * self.inv_scale
+                squared = np.einsum('ij,ij->i', z, z) + scores[np.arange(len(chunk)), chunk_labels]
+                distances[start:start + len(chunk)] = np.sqrt(np.maximum(squared, 0))
+        return labels, distances
+
+
+class PipelineSegmenter:
+    """scaler.transform ثم model.predict - للنماذج التي لا يمكن دمجها"""
+
+    name = 'sklearn'
+
+    def __init__(self, model, scaler):
+        self.model = model
+        self.scaler = scaler
+        n_features = getattr(scaler, 'n_features_in_', len(SEGMENT_FEATURES))
+        names = getattr(scaler, 'feature_names_in_', None)
+        self.feature_names = tuple(names) if names is not None else SEGMENT_FEATURES[:n_features]
+        mean = getattr(scaler, 'mean_', np.zeros(n_features))
+        self.fill = np.array([
+            SEGMENT_DEFAULTS.get(name, mean[i]) for i, name in enumerate(self.feature_names)
+        ], dtype=np.float64)
+
+    def assign(self, features, return_distance=False):
+        if len(features) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0) if return_distance else None
+        scaled = self.scaler.transform(np.asarray(features, dtype=np.float64))
+        labels = self.model.predict(scaled).astype(np.int64)
+        if not return_distance:
+            return labels, None
+        return labels, self.model.transform(scaled)[np.arange(len(labels)), labels]
+
+
+def check_segment_count(model):
+    """كل مركز يجب أن يكون له اسم في SEGMENT_LABELS - نموذج بمراكز أكثر يُرفض عند التحميل بدل IndexError في كل طلب"""
+    centers = getattr(model, 'cluster_centers_', None)
+    n_clusters = len(centers) if centers is not None else getattr(model, 'n_clusters', None)
+    if n_clusters is not None and n_clusters > len(SEGMENT_LABELS):
+        raise ValueError(
+            f'{type(model).__name__} has {n_clusters} clusters but SEGMENT_NAMES names only {len(SEGMENT_LABELS)}'
+        )
+
+
+def make_segmenter(model, scaler):
+    """FusedSegmenter بعد التحقق من تطابقه مع sklearn، وإلا PipelineSegmenter"""
+    check_segment_count(model)
+    reference = PipelineSegmenter(model, scaler)
+    try:
+        fused = FusedSegmenter(model, scaler)
+    except ValueError as e:
+        print(f"⚠️  تحذير: لا يمكن دمج scaler في KMeans: {e}")
+        return reference
+    # بيانات فحص حول كل مركز (بوحدات الميزات الأصلية)
+    rng = np.random.default_rng(0)
+    centers = fused.mean + np.asarray(model.cluster_centers_) * fused.scale
+    probe = np.repeat(centers, 64, axis=0) + rng.normal(size=(len(centers) * 64, centers.shape[1])) * fused.scale
+    if not np.array_equal(fused.assign(probe)[0], reference.assign(probe)[0]):
+        print("⚠️  تحذير: نتائج FusedSegmenter تختلف عن sklearn - استخدام scaler.transform + predict")
+        return reference
+    return fused
+
+
+def features_from_rows(segmenter, rows):
+    """dicts -> مصفوفة (n, عدد الميزات) مع خطأ لكل صف غير صالح"""
+    features = np.tile(segmenter.fill, (len(rows), 1))
+    errors = [None] * len(rows)
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[i] = 'customer must be an object'
+            continue
+        for j, name in enumerate(segmenter.feature_names):
+            value = row.get(name)
+            if value is None:
+                continue
+            try:
+                features[i, j] = float(value)
+            except (TypeError, ValueError):
+                errors[i] = f'{name} must be a number'
+                break
+            if not np.isfinite(features[i, j]):
+                errors[i] = f'{name} must be a finite number'
+                break
+    return features, errors
+
+
+def segment_rows(segmenter, rows, include_distance=False, row_errors=None):
+    """نتيجة لكل عميل: القسم واسمه (والمسافة للمركز) أو خطأ ذلك الصف فقط"""
+    with stage('features'):
+        features, errors = features_from_rows(segmenter, rows)
+    row_errors = row_errors or [None] * len(rows)
+    errors = [row_error or error for row_error, error in zip(row_errors, errors)]
+    valid = np.array([e is None for e in errors], dtype=bool)
+    with stage('inference', rows=int(valid.sum()), model='customer_segmentation'):
+        labels, distances = segmenter.assign(features[valid], include_distance)
+
+    # القيم والأسماء لكل الصفوف الصالحة من المصفوفات مباشرة
+    segments = labels.tolist()
+    names = SEGMENT_LABELS[labels].tolist()
+    distances = np.round(distances, 4).tolist() if include_distance else [None] * len(segments)
+    valid_results = iter(zip(segments, names, distances))
+
+    results = []
+    for row, error in zip(rows, errors):
+        customer_id = row.get('id') if isinstance(row, dict) else None
+        if error is not None:
+            results.append({'customer_id': customer_id, 'error': error})
+            continue
+        segment, name, distance = next(valid_results)
+        result = {'customer_id': customer_id, 'segment': segment, 'segment_name': name}
+        if include_distance:
+            result['distance'] = distance
+        results.append(result)
+    return results
+
+
+def segment_line_chunk(segmenter, lines, in_format, out_format, header=None, include_distance=False):
+    """جزء واحد من /api/batch-customer-segment/stream -> bytes"""
+    rows, row_errors = parse_lines(lines, in_format, header)
+    return render_results(segment_rows(segmenter, rows, include_distance, row_errors), out_format, OUTPUT_FIELDS)
@@ -0,0 +1,46 @@
+"""
+JSON serialization - orjson when available, stdlib json otherwise
+تحويل الاستجابات إلى JSON عبر orjson (أسرع بكثير ويدعم مصفوفات NumPy مباشرة) مع الرجوع إلى json
+
+JSON_SERIALIZER=json يفرض المكتبة القياسية (للمقارنة أو إذا لم يكن orjson مثبتاً).
+"""
+import json
+import os
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # orjson اختياري
+    orjson = None
+
+JSON_SERIALIZER = os.environ.get('JSON_SERIALIZER', 'orjson' if orjson is not None else 'json')
+if JSON_SERIALIZER == 'orjson' and orjson is None:
+    print("⚠️  تحذير: JSON_SERIALIZER=orjson لكن orjson غير مثبت - استخدام json")
+    JSON_SERIALIZER = 'json'
+
+
+def _default(value):
+    """أنواع NumPy التي لا يعرفها json القياسي"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+if JSON_SERIALIZER == 'orjson':
+    _OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(value):
+        """قيمة Python/NumPy -> bytes (UTF-8)"""
+        # ndarray المتجاورة تُكتب مباشرة؛ default للحالات الأخرى (object arrays، views غير متجاورة)
+        return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+    loads = orjson.loads
+else:
+    def dumps(value):
+        """قيمة Python/NumPy -> bytes (UTF-8)"""
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+    loads = json.loads
@@ -0,0 +1,31 @@
+"""
+Shared fixtures - the shipped models are loaded once per test session
+النماذج الحقيقية من مجلدات المشروع تُحمّل مرة واحدة لكل الاختبارات
+"""
+import os
+import sys
+
+import joblib
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+def load(relative_path):
+    return joblib.load(os.path.join(ROOT_DIR, relative_path))
+
+
+@pytest.fixture(scope='session')
+def lead_model():
+    return load('Lead_scoring/lead_scoring_model.pkl')
+
+
+@pytest.fixture(scope='session')
+def sales_model():
+    return load('Sales_forecasting/sales_forecasting_model.pkl')
+
+
+def pytest_configure(config):
+    # أسماء الـ features في sklearn وتحذير pickle في XGBoost - نفس تحذيرات التطبيق عند التحميل
+    config.addinivalue_line('filterwarnings', 'ignore::UserWarning')
@@ -0,0 +1,116 @@
+"""
+ml_engine.columnar - binary responses match the JSON endpoints, malformed bodies are rejected
+نتائج الصيغة الثنائية: نفس الدرجات والأخطاء والمجاميع كما في JSON، والجسم غير الصالح ValueError (400)
+"""
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+from ml_engine.bulk_scoring import score_rows
+from ml_engine.columnar import (
+    COLUMNAR_MEDIA_TYPE, MAGIC, columns_to_results, forecast_columns, pack_columns, score_lead_columns, unpack_columns
+)
+from ml_engine.encoders import CategoricalEncoder
+from ml_engine.features import Categorical, record_columns
+from ml_engine.forecasting import forecast_response
+from ml_engine.inference import make_backend
+
+NOW = pd.Timestamp('2026-03-15 13:45:10')
+LEADS = [
+    {'id': 1, 'source': 'Facebook', 'agent': 'Ahmed', 'tags': ['VIP'], 'createdAt': '2025-01-01', 'budget': 250000},
+    {'id': 2, 'budget': 'n/a'},
+    {'id': 3, 'budget': float('inf')},
+    {'id': 4, 'budget': [1]},
+    {'id': 5, 'budget': 1e40},
+    {'id': 6, 'createdAt': 'not a date', 'budget': 10},
+]
+
+
+@pytest.fixture(scope='module')
+def scoring(lead_model):
+    return (
+        make_backend(lead_model),
+        CategoricalEncoder.from_label_encoder(load('Lead_scoring/le_source.pkl'), 'source'),
+        CategoricalEncoder.from_label_encoder(load('Lead_scoring/le_agent.pkl'), 'agent'),
+    )
+
+
+def test_lead_errors_match_json(scoring):
+    backend, source_encoder, agent_encoder = scoring
+    leads = [dict(lead, name=f"lead {lead['id']}") for lead in LEADS]
+    expected = score_rows(backend, leads, source_encoder, agent_encoder, NOW)
+    columns = dict(
+        record_columns(LEADS), id=np.array([lead['id'] for lead in LEADS]),
+        name=Categorical.from_values([f"lead {lead['id']}" for lead in LEADS])
+    )
+    result = score_lead_columns(backend, columns, source_encoder, agent_encoder, NOW)
+    # عبر الصيغة الثنائية نفسها: categories الأخطاء في الـ header
+    unpacked, _ = unpack_columns(pack_columns(result))
+    assert columns_to_results(unpacked, 'lead_id') == expected
+    errors = unpacked['error'].values()
+    assert errors[0] is None and errors[5] is None
+    assert len(set(errors[1:5])) > 1
+
+
+def test_forecast_totals_match_json():
+    """average_daily من المجموع المقرّب في الصيغتين - المتوسط المباشر يختلف بـ 0.01 أحياناً"""
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        predictions = rng.uniform(0, 9e5, int(rng.integers(1, 400)))
+        dates = pd.date_range('2026-01-01', periods=len(predictions))
+        expected = forecast_response(dates, predictions)
+        _, meta = unpack_columns(pack_columns(*forecast_columns(dates, predictions)))
+        assert meta == {'total_forecast': expected['total_forecast'], 'average_daily': expected['average_daily']}
+
+
+def with_header(header, data=b''):
+    """جسم ثنائي بـ header معطى (بدون التحقق الذي يقوم به pack_columns)"""
+    raw = json.dumps(header).encode('utf-8')
+    return MAGIC + struct.pack('<I', len(raw)) + raw + bytes(-(len(MAGIC) + 4 + len(raw)) % 64) + data
+
+
+BUDGET = {'name': 'budget', 'dtype': '<f8', 'offset': 0}
+
+
+@pytest.mark.parametrize('body', [
+    with_header({'columns': [BUDGET]}, bytes(8)),
+    with_header({'rows': -1, 'columns': [BUDGET]}, bytes(64)),
+    with_header({'rows': '1', 'columns': [BUDGET]}, bytes(8)),
+    with_header({'rows': True, 'columns': [BUDGET]}, bytes(8)),
+    with_header({'rows': 1, 'columns': {'budget': BUDGET}}, bytes(8)),
+    with_header({'rows': 1, 'columns': ['budget']}, bytes(8)),
+    with_header({'rows': 1, 'columns': [{'name': 'budget', 'dtype': '<f8'}]}, bytes(8)),
+    with_header({'rows': 1, 'columns': [dict(BUDGET, dtype='nope')]}, bytes(8)),
+    with_header({'rows': 1, 'columns': [dict(BUDGET, offset=-64)]}, bytes(8)),
+    with_header({'rows': 2, 'columns': [BUDGET]}, bytes(8)),
+    with_header([1, 2]),
+    MAGIC + struct.pack('<I', 1000) + b'{}',
+    MAGIC + b'\x01',
+    MAGIC + struct.pack('<I', 3) + b'{{{',
+])
+def test_malformed_body_raises_value_error(body):
+    with pytest.raises(ValueError):
+        unpack_columns(body)
+
+
+def test_malformed_body_is_400(lead_model):
+    from fastapi.testclient import TestClient
+
+    import app as flask_app
+    import app_fastapi
+
+    body = with_header({'rows': -1, 'columns': [BUDGET]}, bytes(64))
+    headers = {'Content-Type': COLUMNAR_MEDIA_TYPE}
+    flask_app.model_loader.wait_all()
+    client = flask_app.app.test_client()
+    for path in ('/api/batch-lead-scoring', '/api/batch-customer-segment'):
+        response = client.post(path, data=body, headers=headers)
+        assert response.status_code == 400, response.get_json()
+        response.close()
+    with TestClient(app_fastapi.app) as client:
+        for path in ('/api/batch-lead-scoring', '/api/batch-customer-segment'):
+            assert client.post(path, content=body, headers=headers).status_code == 400
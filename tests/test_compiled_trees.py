@@ -0,0 +1,126 @@
+"""
+CompiledEnsemble must return exactly what sklearn / XGBoost return
+تطابق الأشجار المسطحة مع النماذج الأصلية: قيم ثابتة، قيم على كل threshold وبجانبه، وقيم مفقودة (NaN)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_engine.compiled_trees import compile_model, probe_features
+from ml_engine.forecasting import FEATURE_COLUMNS
+from ml_engine.inference import make_backend
+
+# source, agent, tags, days_since_created, budget
+LEAD_ROWS = np.array([
+    [0, 0, 0, 0, 0],
+    [1, 2, 1, 30, 250000],
+    [3, 1, 4, 400, 1e6],
+    [2, 0, 0, 5000, 1e9],
+    [-1, -1, -1, -1, -1e6],
+], dtype=np.float32)
+
+# year, month, day, week, weekday, quarter, transaction_count, sales_7day_avg, sales_30day_avg
+SALES_ROWS = np.array([
+    [2025, 1, 1, 1, 2, 1, 5, 0, 0],
+    [2025, 12, 31, 1, 2, 4, 50, 150000, 140000],
+    [2026, 6, 15, 25, 0, 2, 1, 9e5, 5e5],
+    [2030, 2, 28, 9, 3, 1, 1e4, 1e9, 1e9],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0],
+], dtype=np.float32)
+
+
+def boundary_rows(compiled, base):
+    """لكل split: الصف base مع قيمة الـ feature على الـ threshold تماماً وقبله وبعده بأصغر فرق float32"""
+    internal = compiled.left != np.arange(compiled.n_nodes)
+    features = compiled.feature[internal]
+    thresholds = compiled.threshold[internal].astype(np.float32)
+    rows = []
+    for direction in (None, -np.inf, np.inf):
+        values = thresholds if direction is None else np.nextafter(thresholds, np.float32(direction))
+        X = np.repeat(base[None, :], len(features), axis=0)
+        X[np.arange(len(features)), features] = values
+        rows.append(X)
+    return np.concatenate(rows)
+
+
+def missing_rows(rows):
+    """كل feature مفقودة وحدها، ثم كل الـ features مفقودة"""
+    X = np.repeat(rows[:1], rows.shape[1] + 1, axis=0)
+    X[np.arange(rows.shape[1]), np.arange(rows.shape[1])] = np.nan
+    X[-1] = np.nan
+    return np.concatenate([X, np.where(np.eye(len(rows), rows.shape[1], dtype=bool), np.nan, rows)])
+
+
+@pytest.fixture(scope='module')
+def lead(lead_model):
+    return lead_model, compile_model(lead_model), lambda X: lead_model.predict_proba(X)[:, 1]
+
+
+@pytest.fixture(scope='module')
+def sales(sales_model):
+    return sales_model, compile_model(sales_model), lambda X: sales_model.get_booster().inplace_predict(X)
+
+
+def assert_identical(compiled, reference, X):
+    expected = reference(X)
+    np.testing.assert_array_equal(compiled.predict(X), expected)
+    # صف واحد يمر بمسار مختلف في _leaves
+    single = np.array([compiled.predict(X[i:i + 1])[0] for i in range(min(len(X), 64))])
+    np.testing.assert_array_equal(single, expected[:len(single)])
+
+
+@pytest.mark.parametrize('name', ['lead', 'sales'])
+def test_fixed_rows(request, name):
+    _, compiled, reference = request.getfixturevalue(name)
+    assert_identical(compiled, reference, LEAD_ROWS if name == 'lead' else SALES_ROWS)
+
+
+@pytest.mark.parametrize('name', ['lead', 'sales'])
+def test_threshold_boundaries(request, name):
+    _, compiled, reference = request.getfixturevalue(name)
+    rows = LEAD_ROWS if name == 'lead' else SALES_ROWS
+    for base in rows[:2]:
+        assert_identical(compiled, reference, boundary_rows(compiled, base))
+
+
+@pytest.mark.parametrize('name', ['lead', 'sales'])
+def test_probe_and_wide_values(request, name):
+    _, compiled, reference = request.getfixturevalue(name)
+    probe = probe_features(compiled, 2048, seed=1)
+    rng = np.random.default_rng(1)
+    wide = (rng.normal(size=probe.shape) * rng.choice([1, 1e3, 1e7], size=probe.shape)).astype(np.float32)
+    assert_identical(compiled, reference, probe)
+    assert_identical(compiled, reference, wide)
+
+
+def test_xgboost_missing_values(sales):
+    _, compiled, reference = sales
+    assert_identical(compiled, reference, missing_rows(SALES_ROWS))
+    probe = probe_features(compiled, 2048, seed=2)
+    probe[np.random.default_rng(2).random(size=probe.shape) < 0.1] = np.nan
+    assert_identical(compiled, reference, probe)
+
+
+def test_chunked_batches_match(sales):
+    """أكثر من CHUNK_ROWS صف: نفس نتيجة التقييم صفاً صفاً"""
+    _, compiled, reference = sales
+    X = probe_features(compiled, 10000, seed=3)
+    np.testing.assert_array_equal(compiled.predict(X), reference(X))
+
+
+def test_compiled_backends_match_native(lead_model, sales_model):
+    lead_native, lead_compiled = make_backend(lead_model, 'native'), make_backend(lead_model, 'compiled')
+    assert lead_compiled.name == 'compiled'
+    np.testing.assert_array_equal(
+        lead_compiled.predict_positive_proba(LEAD_ROWS), lead_native.predict_positive_proba(LEAD_ROWS)
+    )
+    sales_native, sales_compiled = make_backend(sales_model, 'native'), make_backend(sales_model, 'compiled')
+    assert sales_compiled.name == 'compiled'
+    np.testing.assert_array_equal(sales_compiled.predict(SALES_ROWS), sales_native.predict(SALES_ROWS))
+    frame = pd.DataFrame(SALES_ROWS, columns=FEATURE_COLUMNS)
+    np.testing.assert_array_equal(sales_compiled.predict(SALES_ROWS), sales_model.predict(frame))
+
+
+def test_unsupported_model_raises():
+    with pytest.raises(ValueError):
+        compile_model(object())
@@ -0,0 +1,29 @@
+"""
+ml_engine.dates - missing and invalid createdAt values
+التواريخ الغائبة أو غير الصالحة: 0 بدون تحذيرات، وبنفس نتيجة مسار الأعمدة datetime64
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ml_engine.dates import days_since, parse_dates
+from ml_engine.features import days_since_column
+
+NOW = pd.Timestamp('2026-03-15 13:45:10')
+VALUES = ['2025-01-01', None, 'not a date', '', float('nan'), '2026-03-14T13:45:10Z', '2026-03-15 13:45:11']
+
+
+def test_missing_dates_are_zero_without_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        days = days_since(VALUES, NOW)
+        days_since([None, None], NOW)
+    np.testing.assert_array_equal(days, [438, 0, 0, 0, 0, 1, -1])
+
+
+def test_list_and_datetime64_paths_match():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        columnar = days_since_column(parse_dates(VALUES), NOW, len(VALUES))
+    np.testing.assert_array_equal(columnar, days_since(VALUES, NOW))
@@ -0,0 +1,68 @@
+"""
+ml_engine.encoders - unknown source/agent labels
+سياسة القيم غير المعروفة: default يرمّزها كأول class، و error يجعلها خطأ لهذا الصف فقط
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_engine.encoders import UNKNOWN_CODE, CategoricalEncoder
+from ml_engine.features import Categorical, lead_features, record_columns
+
+NOW = pd.Timestamp('2026-03-15 13:45:10')
+SOURCES = ['Facebook', 'Google', 'الموقع الإلكتروني']
+AGENTS = ['Ahmed', 'Sara', 'غير محدد']
+LEADS = [
+    {'source': 'Google', 'agent': 'Sara', 'budget': 100},
+    {'source': 'TikTok', 'agent': 'Sara', 'budget': 100},
+    {'source': 'Facebook', 'agent': ['x'], 'budget': 100},
+    {'budget': 100},
+    {'source': 'TikTok', 'budget': 'n/a'},
+]
+
+
+def encoders(on_unknown):
+    return CategoricalEncoder(SOURCES, 'source', on_unknown), CategoricalEncoder(AGENTS, 'agent', on_unknown)
+
+
+def test_default_policy_encodes_unknown_as_first_class():
+    source_encoder, agent_encoder = encoders('default')
+    features, valid, errors = lead_features(record_columns(LEADS), source_encoder, agent_encoder, NOW)
+    np.testing.assert_array_equal(features[:4, 0], [1, 0, 0, 2])
+    assert valid.tolist() == [True, True, True, True, False]
+    assert source_encoder.stats()['unknown_hits'] == 2
+
+
+def test_error_policy_fails_only_unknown_rows():
+    source_encoder, agent_encoder = encoders('error')
+    features, valid, errors = lead_features(record_columns(LEADS), source_encoder, agent_encoder, NOW)
+    assert valid.tolist() == [True, False, False, True, False]
+    assert errors[:4] == [None, "Unknown source label: 'TikTok'", "Unknown agent label: ['x']", None]
+    # الميزانية غير الصالحة تبقى رسالة الصف
+    assert errors[4] == "could not convert string to float: 'n/a'"
+    np.testing.assert_array_equal(features[[0, 3], 0], [1, 2])
+
+
+def test_error_policy_categorical_columns():
+    source_encoder, agent_encoder = encoders('error')
+    columns = {
+        'source': Categorical(np.array([0, 1, -1, 1], dtype=np.int32), ['Google', 'TikTok']),
+        'agent': Categorical(np.array([0, 0, 0, 0], dtype=np.int32), ['Ahmed']),
+        'budget': np.full(4, 100.0),
+    }
+    _, valid, errors = lead_features(columns, source_encoder, agent_encoder, NOW)
+    assert valid.tolist() == [True, False, True, False]
+    assert errors[1] == errors[3] == "Unknown source label: 'TikTok'"
+
+
+def test_error_policy_codes_and_single_value():
+    source_encoder, _ = encoders('error')
+    np.testing.assert_array_equal(source_encoder.encode_many(['Google', 'TikTok']), [1, UNKNOWN_CODE])
+    assert source_encoder.encode('Facebook') == 0
+    with pytest.raises(ValueError, match='TikTok'):
+        source_encoder.encode('TikTok')
+
+
+def test_invalid_policy_rejected():
+    with pytest.raises(ValueError):
+        CategoricalEncoder(SOURCES, 'source', 'ignore')
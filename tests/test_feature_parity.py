@@ -0,0 +1,255 @@
+"""
+Parity: features.lead_features vs the previous per-endpoint feature code
+مقارنة مسار الميزات الموحّد مع الكود السابق على مدخلات عشوائية (قيم صحيحة، غائبة، وخاطئة):
+
+    عميل واحد (Flask /api/lead-scoring)   <- الحساب القديم صفاً بصف (pd.to_datetime، encode، float)
+    دفعة JSON / stream                     <- build_lead_features القديم (float64)
+    الصيغة الثنائية                         <- نفس الدفعة كأعمدة Categorical / datetime64 / float64
+
+لكل مقارنة: نفس الميزات (بعد float32 الذي تحوّل إليه الـ backends)، نفس الصفوف الصالحة، ونفس الدرجات.
+"""
+import random
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import load
+from ml_engine.encoders import CategoricalEncoder
+from ml_engine.features import DEFAULT_AGENT, DEFAULT_SOURCE, Categorical, lead_features, record_columns
+from ml_engine.inference import make_backend
+from ml_engine.lead_scoring import score_features, score_leads
+
+# كل seed يولّد ROUNDS دفعات من ROWS عميلاً
+SEEDS = range(20)
+ROUNDS = 5
+ROWS = 64
+
+NOW = pd.Timestamp('2026-03-15 13:45:10')
+
+
+def random_value(rng, choices):
+    value = rng.choice(choices)
+    return value(rng) if callable(value) else value
+
+
+def random_record(rng, classes, clean=False):
+    """عميل عشوائي - clean=True: فقط القيم التي يمكن تمثيلها في الصيغة الثنائية"""
+    day = NOW - timedelta(days=rng.randint(-30, 900), seconds=rng.randint(0, 86399))
+    sources = classes['source'] + ['Unknown-X', DEFAULT_SOURCE, '']
+    agents = classes['agent'] + ['Somebody', DEFAULT_AGENT]
+    created = [day.strftime('%Y-%m-%d'), day.isoformat(), day.strftime('%Y-%m-%dT%H:%M:%S'), None]
+    budgets = [lambda r: r.randint(0, 5_000_000), lambda r: r.uniform(0, 1e7), 0, 1e12, float('nan'), float('inf')]
+    if not clean:
+        sources += [None, 7, ['a']]
+        agents += [None, 3.5]
+        created += ['not a date', '', day.strftime('%d/%m/%Y'), day.strftime('%Y-%m-%dT%H:%M:%SZ'), 20250101]
+        created += [day.strftime('%Y-%m-%d %H:%M'), day.strftime('%Y-%m-%dT%H:%M:%S.%f'),
+                    day.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + '+03:00', day.strftime('%Y-%m-%dT%H:%M:%S-05:30'),
+                    '2025-02-30', '2025-01-01T24:00', '1600-01-01', day.strftime('%Y-%m-%dT%H')]
+        budgets += ['12.5', 'n/a', None, True, [1], 1e40]
+    record = {
+        'source': random_value(rng, sources),
+        'agent': random_value(rng, agents),
+        'tags': random_value(rng, [[], ['VIP'], ['a', 'b', 'c']] + ([] if clean else ['VIP', None, 3])),
+        'createdAt': random_value(rng, created),
+        'budget': random_value(rng, budgets)
+    }
+    # الحقول الغائبة تأخذ القيم الافتراضية
+    for key in rng.sample(sorted(record), rng.randint(0, 2)):
+        if clean and key in ('source', 'agent'):
+            continue
+        del record[key]
+    return record
+
+
+# === الكود السابق (مرجع) ===
+
+def legacy_days(values, now):
+    """days_since_created السابق كما هو"""
+    def scalar(value):
+        try:
+            return (now - pd.to_datetime(value)).days
+        except Exception:
+            return 0
+    try:
+        parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='mixed')
+        return (now - parsed).dt.days.fillna(0).to_numpy(dtype=np.float64)
+    except Exception:
+        return np.array([scalar(v) for v in values], dtype=np.float64)
+
+
+def legacy_budgets(values):
+    """to_float_column السابق كما هو"""
+    errors = [None] * len(values)
+    column = np.zeros(len(values), dtype=np.float64)
+    for i, value in enumerate(values):
+        try:
+            column[i] = float(value)
+        except Exception as e:
+            errors[i] = str(e)
+            continue
+        if not np.isfinite(column[i]):
+            errors[i] = 'budget must be a finite number'
+            column[i] = 0
+    return column, errors
+
+
+def aware_days(value):
+    """الأيام لتاريخ بمنطقة زمنية (Z أو ±HH:MM) بعد تحويله إلى UTC - None لغيره"""
+    try:
+        parsed = pd.to_datetime(value)
+    except Exception:
+        return None
+    if getattr(parsed, 'tzinfo', None) is None:
+        return None
+    return (NOW - parsed.tz_convert('UTC').tz_localize(None)).days
+
+
+def known_fixes(features, valid, records):
+    """فروق مقصودة عن الكود السابق:
+    - تاريخ '' أو None في المسار صفاً بصف كان يعطي NaN فيفشل الطلب كاملاً (500) - الآن 0 مثل أي تاريخ غير صالح
+    - ميزانية أكبر من مدى float32 كانت تصل للنموذج كـ inf - الآن خطأ لهذا الصف فقط
+    - تاريخ بمنطقة زمنية ('...Z') كان يعطي 0 (طرح naive - aware) - الآن يُحسب بعد التحويل إلى UTC
+    """
+    features = np.array(features, dtype=np.float64)
+    features[:, 3] = np.nan_to_num(features[:, 3], nan=0)
+    for i, record in enumerate(records):
+        days = aware_days(record.get('createdAt'))
+        if days is not None:
+            features[i, 3] = days
+    with np.errstate(over='ignore'):
+        valid = valid & np.isfinite(features[:, 4].astype(np.float32))
+    return features, valid
+
+
+def legacy_single(record, source_encoder, agent_encoder):
+    """Flask /api/lead-scoring قبل التوحيد - (features، خطأ)"""
+    try:
+        created = pd.to_datetime(record.get('createdAt', NOW.strftime('%Y-%m-%d')))
+        days = (NOW - created).days
+    except:  # noqa: E722 - كما في الكود السابق
+        days = 0
+    tags = record.get('tags', [])
+    features = [
+        source_encoder.encode(record.get('source', DEFAULT_SOURCE)),
+        agent_encoder.encode(record.get('agent', DEFAULT_AGENT)),
+        len(tags) if isinstance(tags, list) else 0,
+        days
+    ]
+    try:
+        budget = float(record.get('budget', 0))
+    except Exception as e:
+        return features + [0], str(e)
+    if not np.isfinite(budget):
+        return features + [0], 'budget must be a finite number'
+    return features + [budget], None
+
+
+def legacy_batch(records, source_encoder, agent_encoder):
+    """build_lead_features قبل التوحيد (float64) - (features، valid)"""
+    budget_column, errors = legacy_budgets([r.get('budget', 0) for r in records])
+    features = np.empty((len(records), 5), dtype=np.float64)
+    features[:, 0] = source_encoder.encode_many([r.get('source', DEFAULT_SOURCE) for r in records])
+    features[:, 1] = agent_encoder.encode_many([r.get('agent', DEFAULT_AGENT) for r in records])
+    features[:, 2] = [len(t) if isinstance(t, list) else 0 for t in [r.get('tags', []) for r in records]]
+    features[:, 3] = legacy_days([r.get('createdAt') for r in records], NOW)
+    features[:, 4] = budget_column
+    return features, np.array([e is None for e in errors])
+
+
+def to_columnar(records):
+    """نفس العملاء كأعمدة الصيغة الثنائية"""
+    created = pd.to_datetime(pd.Series([r.get('createdAt') for r in records], dtype=object), format='mixed')
+    return {
+        'source': Categorical.from_values([r.get('source', DEFAULT_SOURCE) for r in records]),
+        'agent': Categorical.from_values([r.get('agent', DEFAULT_AGENT) for r in records]),
+        'tags_count': np.array([len(r.get('tags', [])) for r in records], dtype=np.int32),
+        'created_at': created.to_numpy(dtype='datetime64[ns]'),
+        'budget': np.array([r.get('budget', 0) for r in records], dtype=np.float64)
+    }
+
+
+def assert_parity(records, features, valid, expected, expected_valid):
+    expected, expected_valid = known_fixes(expected, expected_valid, records)
+    np.testing.assert_array_equal(valid, expected_valid)
+    # الصفوف غير الصالحة لا تصل للنموذج: الميزات تُقارن للصالحة فقط
+    np.testing.assert_array_equal(features[valid], expected[valid].astype(np.float32))
+
+
+@pytest.fixture(scope='module')
+def encoders():
+    le_source = load('Lead_scoring/le_source.pkl')
+    le_agent = load('Lead_scoring/le_agent.pkl')
+    classes = {'source': le_source.classes_.tolist(), 'agent': le_agent.classes_.tolist()}
+    return (
+        CategoricalEncoder.from_label_encoder(le_source, 'source'),
+        CategoricalEncoder.from_label_encoder(le_agent, 'agent'),
+        classes
+    )
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_single_lead_matches_legacy(encoders, seed):
+    source_encoder, agent_encoder, classes = encoders
+    rng = random.Random(seed)
+    for _ in range(ROUNDS * 8):
+        record = random_record(rng, classes)
+        expected, error = legacy_single(record, source_encoder, agent_encoder)
+        features, valid, _ = lead_features(record_columns([record]), source_encoder, agent_encoder, NOW)
+        assert_parity([record], features, valid, [expected], np.array([error is None]))
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_batch_matches_legacy(encoders, seed):
+    source_encoder, agent_encoder, classes = encoders
+    rng = random.Random(seed)
+    for _ in range(ROUNDS):
+        records = [random_record(rng, classes) for _ in range(ROWS)]
+        expected, expected_valid = legacy_batch(records, source_encoder, agent_encoder)
+        features, valid, _ = lead_features(record_columns(records), source_encoder, agent_encoder, NOW)
+        assert_parity(records, features, valid, expected, expected_valid)
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_columnar_matches_legacy(encoders, seed):
+    source_encoder, agent_encoder, classes = encoders
+    rng = random.Random(seed)
+    for _ in range(ROUNDS):
+        records = [random_record(rng, classes, clean=True) for _ in range(ROWS)]
+        expected, expected_valid = legacy_batch(records, source_encoder, agent_encoder)
+        features, valid, _ = lead_features(to_columnar(records), source_encoder, agent_encoder, NOW)
+        assert_parity(records, features, valid, expected, expected_valid)
+
+
+@pytest.mark.parametrize('seed', SEEDS[:5])
+def test_scores_match_legacy(lead_model, encoders, seed):
+    """الدرجات: نفس المصفوفة float64 القديمة عبر الـ backend - NaN للصفوف غير الصالحة"""
+    source_encoder, agent_encoder, classes = encoders
+    backend = make_backend(lead_model)
+    rng = random.Random(seed)
+    for _ in range(ROUNDS):
+        records = [random_record(rng, classes) for _ in range(ROWS)]
+        scores, errors = score_leads(backend, record_columns(records), source_encoder, agent_encoder, NOW)
+        expected, expected_valid = known_fixes(*legacy_batch(records, source_encoder, agent_encoder), records)
+        expected_scores = np.full(len(records), np.nan)
+        expected_scores[expected_valid] = score_features(backend, expected[expected_valid])
+        np.testing.assert_array_equal(scores, expected_scores)
+        assert [e is None for e in errors] == expected_valid.tolist()
+
+
+def test_known_fixes(encoders):
+    """الفروق المقصودة عن الكود السابق على قيم ثابتة"""
+    source_encoder, agent_encoder, _ = encoders
+    records = [
+        {'createdAt': '', 'budget': 100},
+        {'createdAt': None, 'budget': 100},
+        {'createdAt': '2026-03-14T13:45:10Z', 'budget': 100},
+        {'createdAt': '2026-03-14', 'budget': 1e40},
+        {'createdAt': 'not a date', 'budget': 'n/a'},
+    ]
+    features, valid, errors = lead_features(record_columns(records), source_encoder, agent_encoder, NOW)
+    np.testing.assert_array_equal(features[:3, 3], [0, 0, 1])
+    assert valid.tolist() == [True, True, True, False, False]
+    assert errors[:3] == [None, None, None] and errors[3] and errors[4]
@@ -0,0 +1,29 @@
+"""
+ml_engine.segmentation - segment names must cover every KMeans cluster
+نموذج بمراكز أكثر من أسماء SEGMENT_NAMES يُرفض عند التحميل
+"""
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+
+from conftest import load
+from ml_engine.segmentation import SEGMENT_LABELS, make_segmenter, segment_rows
+
+
+@pytest.fixture(scope='module')
+def scaler():
+    return load('Customer_segmentation/customer_segmentation_scaler.pkl')
+
+
+def test_shipped_model_loads(scaler):
+    segmenter = make_segmenter(load('Customer_segmentation/customer_segmentation_model.pkl'), scaler)
+    results = segment_rows(segmenter, [{'id': 1, 'recency': 10}, {'id': 2, 'monetary': 'x'}])
+    assert results[0]['segment_name'] in SEGMENT_LABELS
+    assert 'error' in results[1]
+
+
+def test_more_clusters_than_names_rejected(scaler):
+    X = np.random.default_rng(0).normal(size=(200, scaler.n_features_in_))
+    model = KMeans(len(SEGMENT_LABELS) + 1, n_init=1, random_state=0).fit(X)
+    with pytest.raises(ValueError, match='clusters'):
+        make_segmenter(model, scaler)